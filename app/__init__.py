@@ -1,29 +1,57 @@
+import atexit
+import hashlib
+import json
 import logging
 import os
+import random
+import threading
+import time
 import traceback
-from datetime import datetime, timezone
+import uuid
+from datetime import datetime
 from http import HTTPStatus
 from pathlib import Path
 
-from flask import Flask, Blueprint, g, request
+from flask import Flask, Blueprint, Response, g, request
 from flask_babel import Babel, gettext
 from flask_jwt_extended import JWTManager
 from flask_jwt_extended.exceptions import NoAuthorizationError, UserLookupError, WrongTokenError
 from flask_restx import Api, apidoc
 from jwt.exceptions import ExpiredSignatureError
-from werkzeug.exceptions import BadRequest, RequestEntityTooLarge, MethodNotAllowed, NotFound, Unauthorized, Forbidden
+from werkzeug.exceptions import InternalServerError, BadRequest, RequestEntityTooLarge, MethodNotAllowed, NotFound, Unauthorized, Forbidden, Conflict, RequestedRangeNotSatisfiable, ServiceUnavailable
 
-from .configs import PROJECT_ID
+from .configs import PROJECT_ID, TIME_ZONE, JobConfig, ReaperConfig, MetricsConfig, ProfileConfig
 from .schemas import default_error_model as default_error
-from .services import Sqlite3Service, UsersService
-from .utils import err_log, make_default_error_response, IntListConverter, AuthCodeConverter, BoardsCodeConverter
+from .services import Sqlite3Service, UsersService, JobWorker, TmpFileReaper
+from .utils import err_log, access_log, make_default_error_response, start_queue_logging, metrics, sql_fingerprint, password_hasher, install_marshal_timing, timed_output_json, make_server_timing, check_query_budget, RequestProfiler, PROFILE_MODES, IntListConverter, AuthCodeConverter, BoardsCodeConverter, FileStreamRequest
 
 # env 설정
 env_val = None
+# 백그라운드 작업 Worker
+job_worker = None
+# 임시파일 정리
+tmp_reaper = None
+# 로그 queue Handler(버린 로그 수 확인), 파일 쓰기 Thread
+log_handler = None
+log_listener = None
+access_log_handler = None
+access_log_listener = None
+# 요청 단위 성능 분석 결과 저장 경로
+profile_path = None
+# OpenAPI(swagger.json) 직렬화 결과 : (body, etag)
+api_spec = None
+api_spec_lock = threading.Lock()
+# Resource 클래스 : Namespace 이름(접근로그용)
+resource_namespaces = {}
 # logger 설정
 logger = logging.getLogger(PROJECT_ID)
+# 접근로그 logger 설정 : 별도 파일에만 기록
+access_logger = logging.getLogger(f'{PROJECT_ID}.access')
+access_logger.propagate = False
 # Flask 생성
 app = Flask(__name__)
+# multipart 업로드 파일을 stream factory 로 바로 저장할 수 있도록 Request 클래스 변경
+app.request_class = FileStreamRequest
 # Babel 생성
 babel = Babel()
 # Babel locale 기본값을 한국어(ko)로 설정
@@ -55,6 +83,9 @@ api = Api(
     doc='/docs',
     authorizations=authorizations
 )
+# marshal_with 의 Model 변환, JSON 응답 변환 시간 기록(Server-Timing 의 serialize)
+install_marshal_timing()
+api.representation('application/json')(timed_output_json)
 # Flask에 Blueprint 등록
 app.register_blueprint(api_path)
 # 파일업로드 크기 설정(50MB)
@@ -90,6 +121,174 @@ def init_global():
     """
     if 'env_val' not in g:
         g.env_val = env_val
+    # 접근로그 처리시간 기준
+    g.request_started = time.perf_counter()
+    # 처리중인 요청 수 지표 : restx Resource 가 아닌 경우 endpoint, URL 이 없는 경우 unmatched
+    view_class = getattr(app.view_functions.get(request.endpoint), 'view_class', None)
+    g.metric_labels = (('resource', view_class.__name__ if view_class else request.endpoint or 'unmatched'), ('method', request.method))
+    metrics.inc('http_requests_in_flight', g.metric_labels)
+    # 운영이 아닌 경우 요청 단위 성능 분석
+    start_profiler()
+
+
+def start_profiler():
+    """
+    X-Profile Header 또는 _profile 파라메터로 요청한 경우 해당 요청을 분석
+    요청하지 않은 경우에도 sample_rate 비율만큼 sample 방식으로 분석
+    api_doc 과 같이 운영(prd)에서는 사용하지 않음
+    """
+    profile_config = ProfileConfig.get(g.env_val)
+    if g.env_val == 'prd' or not profile_config or not profile_config['enabled']:
+        return
+    profile_value = request.headers.get('X-Profile') or request.args.get('_profile')
+    if profile_value:
+        (mode, _, option) = profile_value.partition(':')
+        if mode not in PROFILE_MODES:
+            return
+        g.profiler = RequestProfiler(mode, profile_config['interval'], is_inline=option == 'inline')
+    elif profile_config['sample_rate'] and random.random() < profile_config['sample_rate']:
+        g.profiler = RequestProfiler('sample', profile_config['interval'], is_continuous=True)
+    else:
+        return
+    g.profiler.start()
+
+
+@app.after_request
+def check_request_timing(response):
+    """
+    운영이 아닌 경우 Server-Timing Header 추가 및 요청 단위 SQL 실행 수 제한 초과 경고 로그 기록
+    응답을 바꾸지 않으므로 접근로그, 지표와 상태코드가 같음(제한 초과 오류는 SQL 실행 전 Sqlite3 에서 발생)
+    :param response:
+    :return:
+    """
+    if 'metric_labels' in g:
+        if g.env_val != 'prd':
+            response.headers['Server-Timing'] = make_server_timing(g.request_started)
+        check_query_budget(logger, g.metric_labels[0][1])
+    return response
+
+
+@app.after_request
+def write_access_log(response):
+    """
+    요청 단위 접근로그 기록
+    app 에 등록되어 있으므로 api Blueprint 의 요청과 오류 응답도 모두 기록됨
+    :param response:
+    :return:
+    """
+    if 'request_started' in g:
+        view_class = getattr(app.view_functions.get(request.endpoint), 'view_class', None)
+        access_log(access_logger, response, g.request_started, resource_namespaces.get(view_class))
+    return response
+
+
+@app.after_request
+def record_request_metrics(response):
+    """
+    restx Resource, method 별 요청 수, 처리시간 지표 기록
+    :param response:
+    :return:
+    """
+    if 'metric_labels' in g:
+        metrics.observe('http_request_duration_seconds', g.metric_labels, time.perf_counter() - g.request_started)
+        metrics.inc('http_requests_total', g.metric_labels + (('status', response.status_code),))
+    return response
+
+
+@app.after_request
+def finish_profiler(response):
+    """
+    요청 단위 성능 분석 종료 및 결과 저장
+    after_request 중 가장 먼저 호출되도록 마지막에 등록함
+    stream 응답(ZIP 등)은 본문을 만드는 시간이 포함되지 않음
+    :param response:
+    :return: inline 인 경우 분석 결과를 본문으로 하는 응답
+    """
+    if 'profiler' not in g:
+        return response
+    profiler = g.profiler
+    profiler.stop()
+    if profiler.is_inline:
+        response.direct_passthrough = False
+        response.set_data(profiler.report(ProfileConfig[g.env_val]['stats_limit']))
+        response.mimetype = 'text/plain'
+        for header in ('Content-Disposition', 'Content-Range', 'ETag'):
+            response.headers.pop(header, None)
+    else:
+        file_path = profiler.save(profile_path, f'{datetime.now(TIME_ZONE):%Y%m%d%H%M%S}-{request.method}-{g.metric_labels[0][1]}-{uuid.uuid4().hex[:8]}')
+        if not profiler.is_continuous:
+            response.headers['X-Profile-File'] = file_path
+    return response
+
+
+@app.teardown_request
+def stop_profiler(_error):
+    """
+    오류로 after_request 가 호출되지 않은 경우 성능 분석 종료
+    :param _error:
+    """
+    if 'profiler' in g:
+        g.profiler.stop()
+
+
+@app.teardown_request
+def release_request_metrics(_error):
+    """
+    처리중인 요청 수 감소 : 오류로 after_request 가 호출되지 않는 경우에도 호출됨
+    :param _error:
+    """
+    if 'metric_labels' in g:
+        metrics.inc('http_requests_in_flight', g.metric_labels, -1)
+
+
+@app.route('/metrics')
+def metrics_view():
+    """
+    Prometheus text 형식의 지표
+    multiproc_dir 이 설정된 경우 모든 worker 프로세스의 지표를 합산
+    :return:
+    """
+    if not MetricsConfig['enabled']:
+        raise NotFound()
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+def build_api_spec():
+    """
+    OpenAPI(swagger.json) 직렬화
+    restx 는 schema dict 만 보관하고 요청마다 JSON 으로 변환하므로 변환 결과를 프로세스마다 한번만 만들어 보관
+    preload 인 경우 master 에서 만들어 worker 가 fork 로 공유
+    :return: (body, etag), schema 생성 오류인 경우 None
+    """
+    global api_spec
+    if api_spec is None:
+        with api_spec_lock:
+            if api_spec is None:
+                # basePath 를 만들기 위해 Request context 필요
+                with app.test_request_context():
+                    schema = api.__schema__
+                if 'error' in schema:
+                    return None
+                body = (json.dumps(schema, **app.config.get('RESTX_JSON', {})) + '\n').encode('utf-8')
+                api_spec = (body, hashlib.sha256(body).hexdigest())
+    return api_spec
+
+
+def api_specs():
+    """
+    swagger.json : restx 의 SwaggerView 대신 직렬화된 결과를 응답, ETag 가 같으면 304
+    :return:
+    """
+    spec = build_api_spec()
+    if spec is None:
+        raise InternalServerError()
+    response = Response(spec[0], mimetype='application/json')
+    response.set_etag(spec[1])
+    return response.make_conditional(request)
+
+
+# restx 가 Blueprint 에 등록한 swagger.json endpoint 교체(문서 화면은 restx 그대로 사용)
+app.view_functions[f'{api_path.name}.specs'] = api_specs
 
 
 # Flask 오류 설정
@@ -102,7 +301,7 @@ def handle_404_error(error):
     :return:
     :rtype:
     """
-    err_log(logger, error, __name__, traceback.format_exc(), HTTPStatus.NOT_FOUND.description)
+    err_log(logger, error, __name__, msg=HTTPStatus.NOT_FOUND.description, status=HTTPStatus.NOT_FOUND)
     return make_default_error_response(HTTPStatus.NOT_FOUND, str(error))
 
 
@@ -115,7 +314,7 @@ def handle_500_error(error):
     :return:
     :rtype:
     """
-    err_log(logger, error, __name__, traceback.format_exc(), HTTPStatus.INTERNAL_SERVER_ERROR.description)
+    err_log(logger, error, __name__, traceback.format_exc(), HTTPStatus.INTERNAL_SERVER_ERROR.description, HTTPStatus.INTERNAL_SERVER_ERROR)
     return make_default_error_response(HTTPStatus.INTERNAL_SERVER_ERROR, str(error))
 
 
@@ -124,7 +323,7 @@ def handle_500_error(error):
 @api.errorhandler(BadRequest)
 @api.marshal_with(default_error_model, code=int(HTTPStatus.BAD_REQUEST), description='400 오류')
 def handle_400_exception(error):
-    err_log(logger, error, __name__, traceback.format_exc(), HTTPStatus.BAD_REQUEST.description)
+    err_log(logger, error, __name__, msg=HTTPStatus.BAD_REQUEST.description, status=HTTPStatus.BAD_REQUEST)
     return make_default_error_response(HTTPStatus.BAD_REQUEST, str(error))
 
 
@@ -136,14 +335,14 @@ def handle_400_exception(error):
 @api.errorhandler(UserLookupError)
 @api.marshal_with(default_error_model, code=int(HTTPStatus.UNAUTHORIZED), description='401 오류')
 def handle_401_exception(error):
-    err_log(logger, error, __name__, traceback.format_exc(), HTTPStatus.UNAUTHORIZED.description)
+    err_log(logger, error, __name__, msg=HTTPStatus.UNAUTHORIZED.description, status=HTTPStatus.UNAUTHORIZED)
     return make_default_error_response(HTTPStatus.UNAUTHORIZED, str(error))
 
 
 @api.errorhandler(Forbidden)
 @api.marshal_with(default_error_model, code=int(HTTPStatus.FORBIDDEN), description='403 오류')
 def handle_403_exception(error):
-    err_log(logger, error, __name__, traceback.format_exc(), HTTPStatus.FORBIDDEN.description)
+    err_log(logger, error, __name__, msg=HTTPStatus.FORBIDDEN.description, status=HTTPStatus.FORBIDDEN)
     return make_default_error_response(HTTPStatus.FORBIDDEN, str(error))
 
 
@@ -157,28 +356,53 @@ def handle_404_exception(error):
     :return:
     :rtype:
     """
-    err_log(logger, error, __name__, traceback.format_exc(), HTTPStatus.NOT_FOUND.description)
+    err_log(logger, error, __name__, msg=HTTPStatus.NOT_FOUND.description, status=HTTPStatus.NOT_FOUND)
     return make_default_error_response(HTTPStatus.NOT_FOUND, str(error))
 
 
 @api.errorhandler(MethodNotAllowed)
 @api.marshal_with(default_error_model, code=int(HTTPStatus.METHOD_NOT_ALLOWED), description='405 오류')
 def handle_405_exception(error):
-    err_log(logger, error, __name__, traceback.format_exc(), HTTPStatus.METHOD_NOT_ALLOWED.description)
+    err_log(logger, error, __name__, msg=HTTPStatus.METHOD_NOT_ALLOWED.description, status=HTTPStatus.METHOD_NOT_ALLOWED)
     return make_default_error_response(HTTPStatus.METHOD_NOT_ALLOWED, str(error))
 
 
+@api.errorhandler(Conflict)
+@api.marshal_with(default_error_model, code=int(HTTPStatus.CONFLICT), description='409 오류')
+def handle_409_exception(error):
+    err_log(logger, error, __name__, msg=HTTPStatus.CONFLICT.description, status=HTTPStatus.CONFLICT)
+    return make_default_error_response(HTTPStatus.CONFLICT, str(error))
+
+
 @api.errorhandler(RequestEntityTooLarge)
 @api.marshal_with(default_error_model, code=int(HTTPStatus.REQUEST_ENTITY_TOO_LARGE), description='413 오류')
 def handle_413_exception(error):
-    err_log(logger, error, __name__, traceback.format_exc(), HTTPStatus.REQUEST_ENTITY_TOO_LARGE.description)
+    err_log(logger, error, __name__, msg=HTTPStatus.REQUEST_ENTITY_TOO_LARGE.description, status=HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
     return make_default_error_response(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, str(error))
 
 
+@api.errorhandler(RequestedRangeNotSatisfiable)
+@api.marshal_with(default_error_model, code=int(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE), description='416 오류')
+def handle_416_exception(error):
+    err_log(logger, error, __name__, msg=HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE.description, status=HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+    (response, status) = make_default_error_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, str(error))
+    # 전체 크기를 알 수 있도록 Content-Range 설정
+    return response, status, {'Content-Range': f'bytes */{error.length}'} if error.length is not None else {}
+
+
+@api.errorhandler(ServiceUnavailable)
+@api.marshal_with(default_error_model, code=int(HTTPStatus.SERVICE_UNAVAILABLE), description='503 오류')
+def handle_503_exception(error):
+    err_log(logger, error, __name__, msg=HTTPStatus.SERVICE_UNAVAILABLE.description, status=HTTPStatus.SERVICE_UNAVAILABLE)
+    (response, status) = make_default_error_response(HTTPStatus.SERVICE_UNAVAILABLE, str(error))
+    # 다시 요청할 수 있는 시간 설정
+    return response, status, {'Retry-After': str(error.retry_after)} if error.retry_after is not None else {}
+
+
 @api.errorhandler(Exception)
 @api.marshal_with(default_error_model, code=int(HTTPStatus.INTERNAL_SERVER_ERROR), description='500 오류')
 def handle_500_exception(error):
-    err_log(logger, error, __name__, traceback.format_exc(), HTTPStatus.INTERNAL_SERVER_ERROR.description)
+    err_log(logger, error, __name__, traceback.format_exc(), HTTPStatus.INTERNAL_SERVER_ERROR.description, HTTPStatus.INTERNAL_SERVER_ERROR)
     return make_default_error_response(HTTPStatus.INTERNAL_SERVER_ERROR, str(error))
 
 
@@ -219,8 +443,8 @@ def user_lookup_loader(_jwt_header, jwt_data):
     """
     # 만료시간 확인
     exp_timestamp = jwt_data['exp']
-    now = datetime.now(timezone.utc)
-    logger.info(f'now: {now}, exp: {datetime.utcfromtimestamp(exp_timestamp)}')
+    now = datetime.now(TIME_ZONE)
+    logger.info(f'now: {now}, exp: {datetime.fromtimestamp(exp_timestamp, TIME_ZONE)}')
     # sub 정보에는 user_identity_loader에서 반환된 SEQ 값이 저장되어 있음
     identity = jwt_data['sub']
     user_info = UsersService().get_user_by_seq(identity)
@@ -255,11 +479,111 @@ def register_router(api_param):
     api_param.add_namespace(refresh_sample)
     api_param.add_namespace(board_sample)
     api_param.add_namespace(user_sample)
+    # 접근로그에 기록할 Namespace 이름 : 'Board Sample' -> 'board_sample'
+    for namespace in api_param.namespaces:
+        for resource in namespace.resources:
+            resource_namespaces[resource.resource] = namespace.name.replace(' ', '_').lower()
+
+
+def get_log_path():
+    """
+    Log 디렉토리 생성 및 반환
+    :return:
+    """
+    home = str(Path(os.path.expanduser('~')))
+    log_path = f'{home}/logs/{PROJECT_ID}'
+    if not os.path.exists(log_path):
+        os.makedirs(log_path)
+    return log_path
+
+
+def init_logging():
+    """
+    Logger 설정
+    요청 Thread 에서는 queue 에만 넣고 파일 쓰기는 별도 Thread(QueueListener)에서 처리
+    fork 된 worker 프로세스에는 부모의 QueueListener Thread 가 없으므로 init_worker 에서 다시 호출하여 Handler 와 Thread 를 새로 만듦
+    """
+    global log_handler, log_listener, access_log_handler, access_log_listener
+    # 이전 Handler 제거 : fork 된 프로세스에는 Thread 가 없으므로 stop 하지 않음
+    for target, handler, listener in ((logger, log_handler, log_listener), (access_logger, access_log_handler, access_log_listener)):
+        if handler:
+            target.removeHandler(handler)
+            atexit.unregister(listener.stop)
+    log_path = get_log_path()
+    formatter = logging.Formatter('[%(levelname)s] [%(asctime)s] %(filename)s(%(lineno)d) : %(message)s')
+    (log_handler, log_listener) = start_queue_logging(logger, f'{log_path + os.sep + PROJECT_ID}.log', formatter)
+    atexit.register(log_listener.stop)
+    # 접근로그도 별도 파일에 같은 방식으로 기록
+    (access_log_handler, access_log_listener) = start_queue_logging(access_logger, f'{log_path + os.sep + PROJECT_ID}-access.log', logging.Formatter('[%(asctime)s] %(message)s'))
+    atexit.register(access_log_listener.stop)
+
+
+def start_background():
+    """
+    백그라운드 Thread 시작 : 작업(파일 이동, 삭제) Worker, 지표 기록, 임시파일 정리
+    Thread 는 fork 된 프로세스로 복사되지 않으므로 여러 worker 프로세스로 실행하는 경우 init_worker 에서 worker 마다 시작
+    """
+    global job_worker, tmp_reaper
+    job_worker = JobWorker(env_val)
+    job_worker.start()
+    # 여러 worker 프로세스 지표 합산용 공유 디렉토리 기록 시작
+    metrics.start()
+    atexit.register(metrics.stop)
+    # 저장되지 않은 임시파일 정리 시작 : 여러 프로세스 중 파일 lock 을 얻은 프로세스만 정리함
+    tmp_reaper = TmpFileReaper(env_val)
+    tmp_reaper.start()
+
+
+def stop_background():
+    """
+    백그라운드 Thread 종료(worker 프로세스 종료시)
+    로그 QueueListener 는 atexit 에서 종료되며 남은 로그가 기록됨
+    """
+    if job_worker:
+        job_worker.stop(JobConfig['poll_interval'] * 2)
+    if tmp_reaper:
+        tmp_reaper.stop(ReaperConfig['step_interval'] * 2)
+    password_hasher.shutdown()
+    metrics.stop()
+
+
+def init_worker():
+    """
+    fork 된 worker 프로세스 초기화(gunicorn post_worker_init)
+    부모(master)에서 preload 한 app 을 그대로 사용하고 프로세스별로 필요한 것만 새로 만듦
+    - 로그 Handler, QueueListener Thread
+    - 지표 : master 에서 기록된 값을 worker 마다 중복 합산하지 않도록 초기화, SQL fingerprint cache 초기화
+    - bcrypt Thread pool : master 에서 관리자 생성시 만들어진 경우 Thread 가 없으므로 새로 생성
+    - 백그라운드 Thread
+    Sqlite3 는 호출마다 Connection 을 열고 닫으므로 fork 전에 열린 Connection 은 없음
+    """
+    init_logging()
+    metrics.reset()
+    sql_fingerprint.cache_clear()
+    password_hasher.reset()
+    start_background()
+    logger.info(f'Worker initialized : pid={os.getpid()}')
+
+
+def create_app(env, is_preload=False):
+    """
+    App factory
+    :param env:
+    :param is_preload: True 인 경우 여러 worker 에서 공유하는 설정(router, 테이블 확인, swagger.json 직렬화)만 처리하고
+                       백그라운드 Thread 는 시작하지 않음, worker 프로세스에서 init_worker 를 호출해야 함
+    :return:
+    """
+    init_app(env, is_preload)
+    if is_preload:
+        build_api_spec()
+    return app
 
 
-def init_app(env):
+def init_app(env, is_preload=False):
     """
     App 초기 설정
+    :param env:
+    :param is_preload: True 인 경우 백그라운드 Thread 를 시작하지 않음(create_app 참고)
     :return:
     :rtype:
     """
@@ -269,23 +593,21 @@ def init_app(env):
         if not env:
             raise ValueError('env is empty.')
         env_val = env
-        # Log 디렉토리 생성
-        home = str(Path(os.path.expanduser('~')))
-        log_path = f'{home}/logs/{PROJECT_ID}'
-        if not os.path.exists(log_path):
-            os.makedirs(log_path)
+        # 요청 단위 성능 분석 결과 저장 경로
+        global profile_path
+        profile_path = f'{get_log_path()}/profiles'
         # Logger 설정
-        formatter = logging.Formatter('[%(levelname)s] [%(asctime)s] %(filename)s(%(lineno)d) : %(message)s')
-        file_handler = logging.FileHandler(f'{log_path + os.sep + PROJECT_ID}.log')
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        init_logging()
+        access_logger.setLevel(logging.INFO)
         logger.setLevel(logging.DEBUG if env == 'local' else logging.INFO)
         # Flask-Babel 초기화 및 locale_selector 설정
         babel.init_app(app)
         babel.localeselector(get_locale)
         # router 설정
         register_router(api)
-        # Sqlite 초기 설정
+        # Sqlite 초기 설정 : preload 인 경우 master 에서 한번만 실행됨
         Sqlite3Service()
+        if not is_preload:
+            start_background()
     except Exception as e:
         err_log(logger, e, __name__, traceback.format_exc(), 'App start error!!!')
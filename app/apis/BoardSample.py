@@ -1,20 +1,20 @@
 import logging
 import os
-import uuid
 from http import HTTPStatus
 
-from flask import g
+from flask import Response, g, request
 from flask_babel import gettext
 from flask_jwt_extended import jwt_required, current_user, get_jwt_identity
 from flask_restx import Namespace, Resource
 from werkzeug.datastructures import FileStorage
-from werkzeug.exceptions import NotFound
+from werkzeug.exceptions import BadRequest, NotFound
 
 import app
-from ..configs import PathConfig, PROJECT_ID
+from ..configs import PathConfig, PROJECT_ID, UploadConfig, DownloadConfig, ZipConfig
 from ..enums import BoardsCode
-from ..schemas import common_list_params, BoardSchemas
-from ..services import BoardService
+from ..schemas import board_list_params, board_include_params, BoardSchemas
+from ..services import BoardService, UploadService
+from ..utils import UploadStreamFactory, send_stored_file, iter_zip_stream, timed_marshal
 
 # path에 설정된 URL을 기준으로 각 Namespace가 구분됨
 # path에 설정된값은 Namespace가 가지는 URL prefix로 설정됨
@@ -49,6 +49,10 @@ class _Schema:
     board_sample.add_model(BoardSchemas.wildcard_multi_model.name, BoardSchemas.wildcard_multi_model)
     board_save_model = board_sample.add_model(BoardSchemas.board_save_model.name, BoardSchemas.board_save_model)
     board_detail_model = board_sample.add_model(BoardSchemas.board_detail_model.name, BoardSchemas.board_detail_model)
+    board_include_model = board_sample.add_model(BoardSchemas.board_include_model.name, BoardSchemas.board_include_model)
+    board_detail_include_model = board_sample.add_model(BoardSchemas.board_detail_include_model.name, BoardSchemas.board_detail_include_model)
+    # 게시물 부분수정 모델
+    board_patch_model = board_sample.add_model(BoardSchemas.board_patch_model.name, BoardSchemas.board_patch_model)
     # 게시물 등록 결과
     board_save_result_model = board_sample.add_model(BoardSchemas.board_save_result_model.name, BoardSchemas.board_save_result_model)
     # 게시물 삭제 결과
@@ -61,8 +65,11 @@ class _Schema:
     file_upload_params = board_sample.parser()
     file_upload_params.add_argument('file', location='files', type=FileStorage, required=True, help='업로드 파일', action='append')
     # 파일 업로드 결과 모델
-    board_sample.add_model(BoardSchemas.file_model.name, BoardSchemas.file_model)
+    file_model = board_sample.add_model(BoardSchemas.file_model.name, BoardSchemas.file_model)
     file_upload_result_model = board_sample.add_model(BoardSchemas.file_upload_result_model.name, BoardSchemas.file_upload_result_model)
+    # 이어올리기 업로드 세션 모델
+    upload_session_save_model = board_sample.add_model(BoardSchemas.upload_session_save_model.name, BoardSchemas.upload_session_save_model)
+    upload_session_model = board_sample.add_model(BoardSchemas.upload_session_model.name, BoardSchemas.upload_session_model)
     # 업로드된 파일정보 저장 모델
     file_save_model = board_sample.add_model(BoardSchemas.file_save_model.name, BoardSchemas.file_save_model)
     # 파일정보 상세
@@ -88,7 +95,7 @@ class BoardPost(Resource):
     """
     # request : query 파라메터에서도 validate 옵션을 사용하면 설정된 유효성 검사가 function 진입전에 실행됨
     @jwt_required(optional=True)
-    @board_sample.expect(common_list_params, validate=True)
+    @board_sample.expect(board_list_params, validate=True)
     # response : marshal_with를 사용하면 결과값에 대한 모델매핑과 apidoc을 한번에 작성 할 수 있음
     @board_sample.marshal_with(_Schema.board_list_model, code=int(HTTPStatus.OK), description='게시물 목록')
     @board_sample.response(int(HTTPStatus.UNAUTHORIZED), '인증 오류', app.default_error_model)
@@ -104,8 +111,11 @@ class BoardPost(Resource):
             # Namespace logger 사용
             board_sample.logger.info(f'게시물 조회 접근자 : {current_user["USER_ID"]}')
         # query 파라메터의 경우 parse_args() 실행시 설정된 유효성 검사가 별도로 진행됨
-        args = common_list_params.parse_args()
-        (board_list, totalcount) = BoardService().get_board_list(args['start_row'], args['row_per_page'])
+        args = board_list_params.parse_args()
+        board_service = BoardService()
+        (board_list, totalcount) = board_service.get_board_list(args['start_row'], args['row_per_page'])
+        # include 에 따라 파일목록, 파일수 추가
+        board_service.set_board_files(board_list, args['include'])
         # marshal_with 에 등록된 모델과 일치하지 않는 필드는 매핑되지 않음
         return {'totalcount': totalcount, 'board_list': board_list}, int(HTTPStatus.OK)
 
@@ -125,7 +135,7 @@ class BoardPost(Resource):
         args = board_sample.payload
         # user_id 정보는 파라메터가 아닌 flask_jwt_extended 모듈의 current_user 정보에서 가져옮
         result = BoardService().save_board(None, args['boards_code'], args['title'], args['contents'], args['add_fields'], current_user['USER_ID'])
-        return {'result': 'Success', 'board_seq': result}, int(HTTPStatus.OK)
+        return {'result': 'Success', 'board_seq': result['SEQ']}, int(HTTPStatus.OK)
 
 
 @board_sample.route('/<int:board_seq>')
@@ -137,10 +147,11 @@ class BoardPost(Resource):
 @board_sample.response(int(HTTPStatus.INTERNAL_SERVER_ERROR), '시스템 오류', app.default_error_model)
 class BoardSample(Resource):
     """
-    게시물 한건에 대한 조회, 수정, 삭제
+    게시물 한건에 대한 조회, 수정, 부분수정, 삭제
     """
     @jwt_required(optional=True)
-    @board_sample.marshal_with(_Schema.board_detail_model, code=int(HTTPStatus.OK), description='게시물 상세정보')
+    @board_sample.expect(board_include_params, validate=True)
+    @board_sample.response(int(HTTPStatus.OK), '게시물 상세정보(include 항목은 요청한 경우에만 포함)', _Schema.board_detail_include_model)
     def get(self, board_seq):
         """
         게시물 상세조회
@@ -149,10 +160,17 @@ class BoardSample(Resource):
         :return:
         :rtype:
         """
-        result = BoardService().get_board_by_seq(board_seq)
+        args = board_include_params.parse_args()
+        board_service = BoardService()
+        result = board_service.get_board_by_seq(board_seq)
         if not result:
             raise NotFound(gettext(u'게시물이 존재하지 않습니다.'))
-        return result, int(HTTPStatus.OK)
+        board_service.set_board_files([result], args['include'])
+        response = timed_marshal(result, _Schema.board_detail_model)
+        if args['include']:
+            # include 로 요청한 항목만 추가
+            response.update(timed_marshal(result, _Schema.board_include_model, skip_none=True))
+        return response, int(HTTPStatus.OK)
 
     @jwt_required()
     @board_sample.expect(_Schema.board_save_model, validate=True)
@@ -166,9 +184,24 @@ class BoardSample(Resource):
         :rtype:
         """
         args = board_sample.payload
-        board_service = BoardService()
-        board_service.save_board(board_seq, args['boards_code'], args['title'], args['contents'], args['add_fields'], current_user['USER_ID'])
-        result = board_service.get_board_by_seq(board_seq)
+        # 저장 결과로 반환된 행을 그대로 사용
+        result = BoardService().save_board(board_seq, args['boards_code'], args['title'], args['contents'], args['add_fields'], current_user['USER_ID'])
+        return result, int(HTTPStatus.OK)
+
+    @jwt_required()
+    @board_sample.expect(_Schema.board_patch_model, validate=True)
+    @board_sample.marshal_with(_Schema.board_detail_model, code=int(HTTPStatus.OK), description='게시물 부분수정결과')
+    def patch(self, board_seq):
+        """
+        게시물 부분수정
+        전달된 항목만 수정하며, add_fields 는 기존 값에 병합됨
+        :param board_seq:
+        :type board_seq:
+        :return:
+        :rtype:
+        """
+        args = board_sample.payload
+        result = BoardService().patch_board(board_seq, current_user['USER_ID'], args.get('boards_code'), args.get('title'), args.get('contents'), args.get('add_fields'))
         return result, int(HTTPStatus.OK)
 
     @jwt_required()
@@ -200,7 +233,7 @@ class BoardListByBoardsCode(Resource):
     게시물 BOARDS_CODE 별 목록 조회
     """
     @jwt_required(optional=True)
-    @board_sample.expect(common_list_params, validate=True)
+    @board_sample.expect(board_list_params, validate=True)
     @board_sample.marshal_with(_Schema.board_list_model, code=int(HTTPStatus.OK), description='게시물 목록')
     def get(self, boards_code):
         """
@@ -214,8 +247,10 @@ class BoardListByBoardsCode(Resource):
         current_identity = get_jwt_identity()
         if current_identity:
             board_sample.logger.info(f'게시물 BOARDS_CODE 별 목록 조회 접근자 : {current_user["USER_ID"]}')
-        args = common_list_params.parse_args()
-        (board_list, totalcount) = BoardService().get_board_list_by_boards_code(args['start_row'], args['row_per_page'], boards_code)
+        args = board_list_params.parse_args()
+        board_service = BoardService()
+        (board_list, totalcount) = board_service.get_board_list_by_boards_code(args['start_row'], args['row_per_page'], boards_code)
+        board_service.set_board_files(board_list, args['include'])
         return {'totalcount': totalcount, 'board_list': board_list}, int(HTTPStatus.OK)
 
 
@@ -231,6 +266,7 @@ class BoardListByBoardSeqs(Resource):
     선택된 BOARD_SEQ에 따른 목록 조회, 삭제
     """
     @jwt_required(optional=True)
+    @board_sample.expect(board_include_params, validate=True)
     @board_sample.marshal_with(_Schema.board_list_model, code=int(HTTPStatus.OK), description='게시물 목록')
     def get(self, board_seqs):
         """
@@ -244,7 +280,10 @@ class BoardListByBoardSeqs(Resource):
         current_identity = get_jwt_identity()
         if current_identity:
             board_sample.logger.info(f'게시물 BOARD_SEQ에 따른 목록 조회 접근자 : {current_user["USER_ID"]}')
-        (board_list, totalcount) = BoardService().get_board_list_by_board_seqs(board_seqs)
+        args = board_include_params.parse_args()
+        board_service = BoardService()
+        (board_list, totalcount) = board_service.get_board_list_by_board_seqs(board_seqs)
+        board_service.set_board_files(board_list, args['include'])
         return {'totalcount': totalcount, 'board_list': board_list}, int(HTTPStatus.OK)
 
     @jwt_required()
@@ -285,28 +324,157 @@ class FileUploadPost(Resource):
         :return:
         :rtype:
         """
-        args = _Schema.file_upload_params.parse_args()
+        # 임시저장 디렉토리 설정
+        file_tmp_path = PathConfig[g.env_val]['file_tmp_path']
+        file_full_path = PathConfig[g.env_val]['file_upload_home'] + os.path.sep + file_tmp_path
+        os.makedirs(file_full_path, exist_ok=True)
+        # 파라메터 파싱 전에 설정 : multipart 파싱 중 업로드 파일을 임시파일로 바로 저장하면서 크기와 SHA-256 계산
+        stream_factory = UploadStreamFactory(file_full_path, UploadConfig['max_file_size'])
+        request.file_stream_factory = stream_factory
+        try:
+            args = _Schema.file_upload_params.parse_args()
+        except Exception:
+            stream_factory.discard_all()
+            raise
         uploaded_file = args['file']
         uploaded_file_list = []
         for file_obj in uploaded_file:
-            uploaded_file_list.append(self._file_save(file_obj))
+            uploaded_file_list.append(self._file_info(file_obj, file_tmp_path))
+        # 업로드 중 계산한 SHA-256, 크기 보관 : 게시물 파일저장시 다시 계산하지 않음
+        UploadService().save_tmp_files(uploaded_file_list, current_user['USER_ID'])
         return {'result': 'Success', 'files': uploaded_file_list}, int(HTTPStatus.OK)
 
     @staticmethod
-    def _file_save(uploaded_file):
-        # 원본파일명
-        filename = uploaded_file.filename
-        # 임시저장 디렉토리 설정
-        file_tmp_path = PathConfig[g.env_val]['file_tmp_path']
-        file_full_path = PathConfig[g.env_val]['file_upload_home'] + os.path.sep + file_tmp_path
-        os.makedirs(file_full_path, exist_ok=True)
-        # 임시파일명
-        file_ext = filename.split('.')[(len(filename.split('.')) - 1)] if len(filename.split('.')) > 1 else ''
-        file_tmp_name = str(uuid.uuid4().hex) + '.' + file_ext
-        # 업로드 파일 임시저장
-        tmp_file_full_path = os.path.join(file_full_path, file_tmp_name)
-        uploaded_file.save(tmp_file_full_path)
-        return {'file_org_name': filename, 'file_tmp_path': file_tmp_path, 'file_tmp_name': file_tmp_name}
+    def _file_info(uploaded_file, file_tmp_path):
+        # 파싱이 끝난 파일은 이미 임시파일로 저장되어 있으므로 닫고 정보만 반환
+        writer = uploaded_file.stream
+        writer.close()
+        return {
+            'file_org_name': uploaded_file.filename,
+            'file_tmp_path': file_tmp_path,
+            'file_tmp_name': writer.tmp_name,
+            'file_size': writer.size,
+            'file_hash': writer.sha256
+        }
+
+
+@board_sample.route('/fileupload/session')
+@board_sample.doc(security='bearer_auth')
+@board_sample.response(int(HTTPStatus.BAD_REQUEST), '파라메터 오류', app.default_error_model)
+@board_sample.response(int(HTTPStatus.UNAUTHORIZED), '인증 오류', app.default_error_model)
+@board_sample.response(int(HTTPStatus.METHOD_NOT_ALLOWED), 'METHOD 오류', app.default_error_model)
+@board_sample.response(int(HTTPStatus.REQUEST_ENTITY_TOO_LARGE), '파일 업로드 용량 초과', app.default_error_model)
+@board_sample.response(int(HTTPStatus.INTERNAL_SERVER_ERROR), '시스템 오류', app.default_error_model)
+class FileUploadSessionPost(Resource):
+    """
+    이어올리기 업로드 세션 생성
+    """
+    @jwt_required()
+    @board_sample.expect(_Schema.upload_session_save_model, validate=True)
+    @board_sample.marshal_with(_Schema.upload_session_model, code=int(HTTPStatus.CREATED), description='업로드 세션')
+    def post(self):
+        """
+        이어올리기 업로드 세션 생성
+        생성된 upload_id 로 PATCH 요청을 나누어 보낸 후 POST 로 완료
+        :return:
+        :rtype:
+        """
+        args = board_sample.payload
+        result = UploadService().create_session(args['file_org_name'], args['file_size'], current_user['USER_ID'])
+        return result, int(HTTPStatus.CREATED), {'Upload-Offset': str(result['OFFSET']), 'Upload-Length': str(result['FILE_SIZE'])}
+
+
+@board_sample.route('/fileupload/session/<string:upload_id>')
+@board_sample.doc(security='bearer_auth')
+@board_sample.doc(params={'upload_id': {'description': '업로드 세션 ID', 'in': 'path', 'type': 'string', 'example': '0f8e2a6c1b1d4c5e9a7b3d2f1e0c9b8a'}})
+@board_sample.response(int(HTTPStatus.BAD_REQUEST), '파라메터 오류', app.default_error_model)
+@board_sample.response(int(HTTPStatus.UNAUTHORIZED), '인증 오류', app.default_error_model)
+@board_sample.response(int(HTTPStatus.NOT_FOUND), '업로드 세션 없음', app.default_error_model)
+@board_sample.response(int(HTTPStatus.METHOD_NOT_ALLOWED), 'METHOD 오류', app.default_error_model)
+@board_sample.response(int(HTTPStatus.CONFLICT), '업로드 위치 오류', app.default_error_model)
+@board_sample.response(int(HTTPStatus.INTERNAL_SERVER_ERROR), '시스템 오류', app.default_error_model)
+class FileUploadSession(Resource):
+    """
+    이어올리기 업로드 상태 조회, 나누어 업로드, 완료, 취소
+    업로드된 크기는 Upload-Offset Header 로 전달됨
+    """
+    @staticmethod
+    def _get_session(upload_id):
+        session = UploadService().get_session(upload_id, current_user['USER_ID'])
+        if not session:
+            raise NotFound(gettext(u'업로드 세션이 존재하지 않습니다.'))
+        return session
+
+    @staticmethod
+    def _offset_headers(session):
+        return {'Upload-Offset': str(session['OFFSET']), 'Upload-Length': str(session['FILE_SIZE']), 'Cache-Control': 'no-store'}
+
+    @jwt_required()
+    def head(self, upload_id):
+        """
+        업로드 상태 조회 : 연결이 끊긴 경우 Upload-Offset 부터 다시 업로드
+        :param upload_id:
+        :return:
+        :rtype:
+        """
+        session = self._get_session(upload_id)
+        return None, int(HTTPStatus.OK), self._offset_headers(session)
+
+    @jwt_required()
+    @board_sample.marshal_with(_Schema.upload_session_model, code=int(HTTPStatus.OK), description='업로드 세션')
+    def get(self, upload_id):
+        """
+        업로드 세션 조회
+        :param upload_id:
+        :return:
+        :rtype:
+        """
+        session = self._get_session(upload_id)
+        return session, int(HTTPStatus.OK), self._offset_headers(session)
+
+    @jwt_required()
+    @board_sample.doc(params={'Upload-Offset': {'description': '업로드 시작 위치(byte), 서버의 업로드된 크기와 같아야 함', 'in': 'header', 'type': 'integer', 'required': True}})
+    @board_sample.marshal_with(_Schema.upload_session_model, code=int(HTTPStatus.OK), description='업로드 세션')
+    def patch(self, upload_id):
+        """
+        나누어 업로드 : 요청 body 전체를 Upload-Offset 위치부터 저장
+        Content-Type 은 application/offset+octet-stream 을 사용
+        :param upload_id:
+        :return:
+        :rtype:
+        """
+        offset = request.headers.get('Upload-Offset', type=int)
+        if offset is None or request.content_length is None:
+            raise BadRequest(gettext(u'Upload-Offset, Content-Length Header 가 필요합니다.'))
+        session = self._get_session(upload_id)
+        session = UploadService().write_chunk(session, offset, request.stream, request.content_length)
+        return session, int(HTTPStatus.OK), self._offset_headers(session)
+
+    @jwt_required()
+    @board_sample.marshal_with(_Schema.file_model, code=int(HTTPStatus.OK), description='업로드 파일정보')
+    def post(self, upload_id):
+        """
+        업로드 완료
+        반환된 파일정보는 파일 업로드 결과와 같으므로 게시물 파일정보 저장에 사용
+        :param upload_id:
+        :return:
+        :rtype:
+        """
+        session = self._get_session(upload_id)
+        return UploadService().finalize_session(session), int(HTTPStatus.OK)
+
+    @jwt_required()
+    @board_sample.response(int(HTTPStatus.NO_CONTENT), '업로드 취소')
+    def delete(self, upload_id):
+        """
+        업로드 취소
+        :param upload_id:
+        :return:
+        :rtype:
+        """
+        session = self._get_session(upload_id)
+        UploadService().delete_session(session)
+        return None, int(HTTPStatus.NO_CONTENT)
 
 
 @board_sample.route('/<int:board_seq>/file')
@@ -366,3 +534,77 @@ class BoardFilePost(Resource):
         # 파일 목록 조회
         result = BoardService().get_board_file_list(board_seq)
         return {'result': 'Success', 'board_seq': board_seq, 'file_list': result}, int(HTTPStatus.OK)
+
+
+@board_sample.route('/<int:board_seq>/file/<int:file_seq>')
+@board_sample.doc(security='bearer_auth')
+@board_sample.response(int(HTTPStatus.PARTIAL_CONTENT), 'Range 요청의 파일 일부')
+@board_sample.response(int(HTTPStatus.NOT_MODIFIED), 'ETag, Last-Modified 가 같은 경우')
+@board_sample.response(int(HTTPStatus.UNAUTHORIZED), '인증 오류', app.default_error_model)
+@board_sample.response(int(HTTPStatus.NOT_FOUND), '파일 없음', app.default_error_model)
+@board_sample.response(int(HTTPStatus.METHOD_NOT_ALLOWED), 'METHOD 오류', app.default_error_model)
+@board_sample.response(int(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE), 'Range 오류', app.default_error_model)
+@board_sample.response(int(HTTPStatus.INTERNAL_SERVER_ERROR), '시스템 오류', app.default_error_model)
+class BoardFileDownload(Resource):
+    """
+    첨부파일 다운로드
+    전송 방식은 DownloadConfig 의 mode 로 설정
+    """
+    @jwt_required(optional=True)
+    @board_sample.produces(['application/octet-stream'])
+    @board_sample.response(int(HTTPStatus.OK), '파일')
+    def get(self, board_seq, file_seq):
+        """
+        첨부파일 다운로드
+        Content-Disposition 의 파일명은 원본 파일명을 사용함
+        :param board_seq:
+        :type board_seq:
+        :param file_seq:
+        :type file_seq:
+        :return:
+        :rtype:
+        """
+        file_info = BoardService.get_file_by_seq(file_seq)
+        if not file_info or file_info['BOARD_SEQ'] != board_seq:
+            raise NotFound(gettext(u'파일이 존재하지 않습니다.'))
+        full_path = BoardService.get_file_full_path(file_info)
+        # 파일 이동 작업이 처리되기 전인 경우에도 파일이 없음
+        if not os.path.isfile(full_path):
+            raise NotFound(gettext(u'파일이 존재하지 않습니다.'))
+        download_config = DownloadConfig[g.env_val]
+        # 내용으로 만든 파일명인 경우 FILE_HASH 를 ETag 로 사용
+        return send_stored_file(full_path, file_info['ONAME'], file_info['FILE_HASH'] or True, download_config['mode'],
+                                f'{download_config["accel_prefix"]}/{file_info["PATH"]}/{file_info["FNAME"]}')
+
+
+@board_sample.route('/<int:board_seq>/files.zip')
+@board_sample.doc(security='bearer_auth')
+@board_sample.response(int(HTTPStatus.UNAUTHORIZED), '인증 오류', app.default_error_model)
+@board_sample.response(int(HTTPStatus.NOT_FOUND), '게시물 또는 파일 없음', app.default_error_model)
+@board_sample.response(int(HTTPStatus.METHOD_NOT_ALLOWED), 'METHOD 오류', app.default_error_model)
+@board_sample.response(int(HTTPStatus.INTERNAL_SERVER_ERROR), '시스템 오류', app.default_error_model)
+class BoardFileZipDownload(Resource):
+    """
+    게시물의 모든 첨부파일을 ZIP 으로 다운로드
+    """
+    @jwt_required(optional=True)
+    @board_sample.produces(['application/zip'])
+    @board_sample.response(int(HTTPStatus.OK), 'ZIP 파일')
+    def get(self, board_seq):
+        """
+        게시물의 모든 첨부파일을 ZIP 으로 다운로드
+        ZIP 은 만들면서 바로 전송하므로 Content-Length 가 없으며, 이미 압축된 형식의 파일은 압축하지 않음
+        :param board_seq:
+        :type board_seq:
+        :return:
+        :rtype:
+        """
+        board_service = BoardService()
+        if not board_service.get_board_by_seq(board_seq):
+            raise NotFound(gettext(u'게시물이 존재하지 않습니다.'))
+        entries = board_service.get_board_zip_entries(board_seq)
+        if not entries:
+            raise NotFound(gettext(u'파일이 존재하지 않습니다.'))
+        response = Response(iter_zip_stream(entries, ZipConfig['stored_extensions']), mimetype='application/zip', direct_passthrough=True)
+        response.headers.set('Content-Disposition', 'attachment', filename=f'board_{board_seq}.zip')
+        return response
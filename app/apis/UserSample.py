@@ -2,7 +2,6 @@ import logging
 from datetime import timedelta
 from http import HTTPStatus
 
-import bcrypt
 from flask_babel import gettext
 from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, current_user, get_jwt
 from flask_restx import Namespace, Resource
@@ -13,7 +12,7 @@ from ..configs import PROJECT_ID
 from ..enums import AuthCode
 from ..schemas import common_list_params, UserSchemas
 from ..services import UsersService
-from ..utils import admin_required
+from ..utils import admin_required, check_password
 
 login_sample = Namespace(
     path='/login',
@@ -43,6 +42,8 @@ class _Schema:
     # 사용자 상세 모델
     user_save_model = user_sample.add_model(UserSchemas.user_save_model.name, UserSchemas.user_save_model)
     user_detail_model = user_sample.add_model(UserSchemas.user_detail_model.name, UserSchemas.user_detail_model)
+    # 사용자 부분수정 모델
+    user_patch_model = user_sample.add_model(UserSchemas.user_patch_model.name, UserSchemas.user_patch_model)
     # 사용자 등록 결과
     user_save_result_model = user_sample.add_model(UserSchemas.user_save_result_model.name, UserSchemas.user_save_result_model)
     # 사용자 삭제 결과
@@ -74,7 +75,7 @@ class LoginPost(Resource):
         user_info = UsersService().get_user_by_id(args['user_id'])
         if user_info:
             # BCrypt를 사용한 비밀번호 확인
-            if not bcrypt.checkpw(args['password'].encode('utf-8'), user_info['USER_PW']):
+            if not check_password(args['password'], user_info['USER_PW']):
                 raise Unauthorized(gettext(u'사용자 정보가 일치하지 않습니다.'))
             else:
                 # 권한정보 추가
@@ -178,7 +179,7 @@ class UserPost(Resource):
         """
         args = user_sample.payload
         result = UsersService().save_user(args['user_id'], args['password'], args['user_name'], None, args['auth_code'])
-        return {'result': 'Success', 'user_seq': result}, int(HTTPStatus.OK)
+        return {'result': 'Success', 'user_seq': result['SEQ']}, int(HTTPStatus.OK)
 
 
 @user_sample.route('/<int:user_seq>')
@@ -189,7 +190,7 @@ class UserPost(Resource):
 @user_sample.response(int(HTTPStatus.INTERNAL_SERVER_ERROR), '시스템 오류', app.default_error_model)
 class UserSample(Resource):
     """
-    사용자 상세보기, 수정, 삭제
+    사용자 상세보기, 수정, 부분수정, 삭제
     """
     @jwt_required()
     @user_sample.marshal_with(_Schema.user_detail_model, code=int(HTTPStatus.OK), description='사용자 상세정보')
@@ -224,9 +225,28 @@ class UserSample(Resource):
         if user_seq != current_user['SEQ']:
             raise Unauthorized(gettext(u'로그인한 사용자의 정보만 수정 할 수 있습니다.'))
         args = user_sample.payload
-        user_service = UsersService()
-        user_service.save_user(args['user_id'], args['password'], args['user_name'], user_seq, args['auth_code'])
-        result = user_service.get_user_by_seq(user_seq)
+        # 저장 결과로 반환된 행을 그대로 사용
+        result = UsersService().save_user(args['user_id'], args['password'], args['user_name'], user_seq, args['auth_code'])
+        return result, int(HTTPStatus.OK)
+
+    @jwt_required()
+    @user_sample.expect(_Schema.user_patch_model, validate=True)
+    @user_sample.marshal_with(_Schema.user_detail_model, code=int(HTTPStatus.OK), description='사용자 상세정보')
+    @user_sample.response(int(HTTPStatus.BAD_REQUEST), '파라메터 오류', app.default_error_model)
+    @user_sample.response(int(HTTPStatus.FORBIDDEN), '권한 오류', app.default_error_model)
+    def patch(self, user_seq):
+        """
+        사용자 정보 부분수정
+        전달된 항목만 수정하며, password 가 없는 경우 비밀번호는 변경하지 않음
+        :param user_seq:
+        :type user_seq:
+        :return:
+        :rtype:
+        """
+        if user_seq != current_user['SEQ']:
+            raise Unauthorized(gettext(u'로그인한 사용자의 정보만 수정 할 수 있습니다.'))
+        args = user_sample.payload
+        result = UsersService().patch_user(user_seq, args.get('user_id'), args.get('password'), args.get('user_name'), args.get('auth_code'))
         return result, int(HTTPStatus.OK)
 
     @admin_required()
@@ -1,6 +1,11 @@
 # 전역상수가 필요한 경우 가급적 별도 상수 파일에 작성하여 모든 파일에서 사용가능하게 할것!!
+from datetime import timezone, timedelta
+
 # 프로젝트 ID
 PROJECT_ID = 'flask-restx-test'
+# 응답에 사용하는 시간대
+# DB에는 RDATE, MDATE 를 UTC epoch(초)로 저장하고 응답 시 이 시간대로 변환하여 ISO8601 형식으로 출력
+TIME_ZONE = timezone(timedelta(hours=9), 'KST')
 # 파일경로
 PathConfig = {
     'local': {
@@ -14,3 +19,151 @@ PathConfig = {
         'file_path': 'upload'
     }
 }
+# 게시물 내용(BOARD_BODIES) 저장 설정
+# compress_min_size 이상(byte)의 CONTENTS 는 zlib 으로 압축하여 저장, 0 이면 압축하지 않음
+BoardBodyConfig = {
+    'compress_min_size': 4 * 1024,
+    'compress_level': 6
+}
+# 백그라운드 작업(JOBS) 설정
+# worker_count : 작업 처리 Thread 수, 0 이면 Worker 를 시작하지 않음
+# poll_interval : 대기중인 작업 확인 주기(초)
+# max_retry : 실패시 재시도 횟수, retry_backoff : 재시도 대기시간(초) = retry_backoff ** 재시도 횟수
+# done_retention : 완료된 작업 보관기간(초), stale_running : 처리중 상태로 이 시간(초)이 지난 작업은 다시 처리
+JobConfig = {
+    'worker_count': 2,
+    'poll_interval': 1.0,
+    'max_retry': 5,
+    'retry_backoff': 2,
+    'done_retention': 24 * 60 * 60,
+    'stale_running': 5 * 60
+}
+# 파일 업로드 설정
+# max_file_size : 파일 하나의 최대 크기(byte), 요청 전체 크기는 MAX_CONTENT_LENGTH 로 제한됨
+# shard_depth : 저장 디렉토리 단계 수, 파일명 앞에서부터 2자씩 사용(2 인 경우 upload/ab/cd/abcd...), 0 이면 file_path 에 바로 저장
+UploadConfig = {
+    'max_file_size': 50 * 1024 * 1024,
+    'shard_depth': 2
+}
+# 첨부파일 다운로드 설정
+# mode : 'send_file' - app 에서 전송(WSGI 서버가 wsgi.file_wrapper 를 지원하면 sendfile 사용), Range, ETag, Last-Modified 를 app 에서 처리
+#        'x-sendfile' - X-Sendfile Header 만 반환하고 전송은 앞단 서버(apache, lighttpd)에서 처리
+#        'x-accel' - X-Accel-Redirect Header 만 반환하고 전송은 nginx 에서 처리
+# accel_prefix : x-accel 모드에서 file_upload_home 에 매핑된 nginx internal location 경로
+DownloadConfig = {
+    'local': {
+        'mode': 'send_file',
+        'accel_prefix': '/protected'
+    },
+    'dev': {
+        'mode': 'send_file',
+        'accel_prefix': '/protected'
+    }
+}
+# 첨부파일 ZIP 다운로드 설정
+# stored_extensions : 이미 압축된 형식으로 압축하지 않고 저장(ZIP_STORED)하는 확장자, 나머지는 ZIP_DEFLATED
+ZipConfig = {
+    'stored_extensions': ('zip', 'gz', 'tgz', 'bz2', 'xz', '7z', 'rar', 'jpg', 'jpeg', 'png', 'gif', 'webp',
+                          'mp3', 'mp4', 'm4a', 'mov', 'avi', 'mkv', 'docx', 'xlsx', 'pptx', 'hwpx')
+}
+# 임시파일(file_tmp_path) 정리 설정
+# interval : 전체 확인 주기(초), 0 이면 정리하지 않음
+# ttl : 마지막으로 수정된 후 이 시간(초)이 지난 임시파일 삭제
+# batch_size : 한번에 확인하는 파일 수, step_interval : batch 사이 대기시간(초)
+# max_deletes_per_sec : 초당 최대 삭제 수
+# dry_run : True 인 경우 삭제하지 않고 로그와 통계만 기록
+ReaperConfig = {
+    'interval': 60 * 60,
+    'ttl': 24 * 60 * 60,
+    'batch_size': 1000,
+    'step_interval': 0.5,
+    'max_deletes_per_sec': 100,
+    'dry_run': False
+}
+# 로그 설정
+# 요청 Thread 에서는 queue 에 넣기만 하고 파일 쓰기, 파일 교체(rotation)는 QueueListener Thread 에서 처리
+# queue_size : queue 최대 크기, policy : queue 가 가득 찬 경우 'drop'(버림) 또는 'block'(block_timeout 초 동안 대기 후 버림)
+# max_bytes : 로그 파일 최대 크기(byte), backup_count : 보관할 이전 로그 파일 수
+LogConfig = {
+    'queue_size': 10000,
+    'policy': 'drop',
+    'block_timeout': 1.0,
+    'max_bytes': 50 * 1024 * 1024,
+    'backup_count': 10
+}
+# 오류 로그 설정
+# max_body : 오류 로그에 기록하는 요청 FORM, JSON 의 최대 길이(문자)
+# dedup_window : 같은 오류(fingerprint)는 이 시간(초) 동안 한번만 기록하고, 다음 기록에 생략된 수를 함께 기록
+# dedup_max_keys : 기억하는 fingerprint 최대 수
+ErrorLogConfig = {
+    'max_body': 1024,
+    'dedup_window': 60,
+    'dedup_max_keys': 1000
+}
+# 접근 로그 설정
+# 요청마다 URL 규칙, Namespace, 상태, 처리시간, DB 시간, DB 호출 수, 응답 크기, 사용자 SEQ 를 JSON 한줄로 별도 파일에 기록
+# sample_rate : 기록할 요청 비율(0.0 ~ 1.0)
+# slow_ms : 처리시간이 이 값(ms) 이상인 요청은 sample_rate 와 관계없이 기록, 0 이면 사용하지 않음
+# always_log_errors : True 인 경우 4xx, 5xx 응답은 sample_rate 와 관계없이 기록
+AccessLogConfig = {
+    'sample_rate': 1.0,
+    'slow_ms': 1000,
+    'always_log_errors': True
+}
+# 지표(metrics) 설정 : Prometheus text 형식으로 /metrics 에서 제공
+# enabled : False 인 경우 /metrics 는 404
+# multiproc_dir : 여러 worker 프로세스의 지표를 합산하기 위한 공유 디렉토리, None 이면 프로세스 단독
+#   (환경변수 METRICS_MULTIPROC_DIR 가 있으면 우선 사용)
+# flush_interval : 공유 디렉토리에 현재 프로세스의 지표를 기록하는 주기(초)
+# latency_buckets : 요청, SQL 처리시간 histogram 구간(초)
+# bcrypt_buckets : bcrypt 처리시간 histogram 구간(초)
+MetricsConfig = {
+    'enabled': True,
+    'multiproc_dir': None,
+    'flush_interval': 5,
+    'latency_buckets': (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    'bcrypt_buckets': (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+}
+# 요청 단위 SQL 실행 수 제한(N+1 확인용)
+# default : endpoint 별 설정이 없는 경우의 최대 SQL 실행 수, 0 이면 확인하지 않음
+# endpoints : '{Resource 클래스명}.{method}' 별 최대 SQL 실행 수 예) 'BoardFilePost.post': 20
+# action : 초과한 경우 'log'(요청 완료 후 경고 로그) 또는 'raise'(제한을 넘는 SQL 실행 전 QueryBudgetExceeded 발생), app.testing 인 경우는 항상 'raise'
+QueryBudgetConfig = {
+    'default': 10,
+    'endpoints': {},
+    'action': 'log'
+}
+# 요청 단위 성능 분석(profiling) 설정 : 운영(prd)에서는 사용하지 않음
+# X-Profile Header 또는 _profile 파라메터로 요청한 경우 해당 요청만 분석
+#   cprofile : cProfile(모든 함수 호출 기록) 결과를 pstats 파일(.prof)로 저장
+#   sample : interval(초) 마다 요청 Thread 의 stack 을 기록하여 collapsed stack 파일(.collapsed, flamegraph 입력)로 저장
+#   뒤에 ':inline' 을 붙이면 파일로 저장하지 않고 결과를 응답 본문(text)으로 반환 예) X-Profile: cprofile:inline
+# enabled : False 인 경우 요청하더라도 분석하지 않음
+# sample_rate : 요청하지 않은 모든 요청 중 이 비율(0.0 ~ 1.0)만큼 sample 방식으로 분석하여 continuous-{pid}.collapsed 에 누적, 0 이면 사용하지 않음
+# stats_limit : inline pstats 결과의 최대 출력 함수 수
+ProfileConfig = {
+    'local': {
+        'enabled': True,
+        'interval': 0.005,
+        'sample_rate': 0.0,
+        'stats_limit': 50
+    },
+    'dev': {
+        'enabled': True,
+        'interval': 0.01,
+        'sample_rate': 0.0,
+        'stats_limit': 50
+    }
+}
+# 비밀번호 암호화(bcrypt) 전용 Thread pool : 로그인, 사용자 등록/수정이 몰려도 요청 Thread 를 모두 사용하지 않도록 제한
+# workers : bcrypt 처리 Thread 수(bcrypt 는 GIL 을 해제하므로 CPU core 수 이하로 설정)
+# max_queue : 처리중인 작업 외에 대기할 수 있는 작업 수, 초과한 요청은 기다리지 않고 503 응답
+# timeout : 요청 Thread 가 결과를 기다리는 최대 시간(초), 초과한 경우 503 응답
+# retry_after : 503 응답의 Retry-After(초)
+# 대기중인 요청도 요청 Thread 를 사용하므로 workers + max_queue 는 프로세스의 요청 Thread 수(gunicorn threads)보다 작게 설정
+PasswordHashConfig = {
+    'workers': 2,
+    'max_queue': 2,
+    'timeout': 5,
+    'retry_after': 1
+}
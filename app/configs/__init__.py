@@ -1 +1 @@
-from .Config import PROJECT_ID, PathConfig
+from .Config import PROJECT_ID, TIME_ZONE, PathConfig, BoardBodyConfig, JobConfig, UploadConfig, DownloadConfig, ZipConfig, ReaperConfig, LogConfig, ErrorLogConfig, AccessLogConfig, MetricsConfig, QueryBudgetConfig, ProfileConfig, PasswordHashConfig
@@ -1,7 +1,11 @@
 import logging
 import sqlite3
+import time
+
+from flask import g, has_app_context
 
 from ..configs import PROJECT_ID
+from ..utils import metrics, sql_fingerprint, enforce_query_budget
 
 
 def _dict_factory(cursor, row):
@@ -17,6 +21,22 @@ def _dict_factory(cursor, row):
     return new_row
 
 
+def _record_query(started, op, query):
+    """
+    SQL 처리시간을 statement fingerprint 별 지표로 기록
+    요청 처리 중인 경우 요청 단위 DB 호출 수(g.db_count)와 시간(g.db_time, 초) 누적
+    백그라운드 Thread 처럼 App Context 가 없는 경우는 요청 단위로 기록하지 않음
+    :param started: time.perf_counter() 시작값
+    :param op: execute, cmd, cmd_list
+    :param query:
+    """
+    elapsed = time.perf_counter() - started
+    metrics.observe('sqlite_query_duration_seconds', (('op', op), ('statement', sql_fingerprint(query))), elapsed)
+    if has_app_context():
+        g.db_count = g.get('db_count', 0) + 1
+        g.db_time = g.get('db_time', 0.0) + elapsed
+
+
 class Sqlite3:
     """
     Sqlite3 연동 Class
@@ -42,6 +62,7 @@ class Sqlite3:
         try:
             if self.db_conn is None:
                 self.db_conn = sqlite3.connect('sample.db')
+                metrics.inc('sqlite_connections_opened_total')
                 self.db_conn.row_factory = _dict_factory
         except Exception as e:
             raise SystemError(e)
@@ -65,6 +86,9 @@ class Sqlite3:
         :param is_one:
         :return:
         """
+        # 요청 단위 SQL 실행 수 제한 확인(제한을 넘는 경우 실행하지 않음)
+        enforce_query_budget()
+        started = time.perf_counter()
         try:
             self._get_conn()
             cur = self.db_conn.cursor()
@@ -81,24 +105,34 @@ class Sqlite3:
             raise SystemError(e)
         finally:
             self._close_conn()
+            _record_query(started, 'execute', query)
         return result
 
-    def cmd(self, query, params=None, is_lastrowid=False):
+    def cmd(self, query, params=None, is_lastrowid=False, is_returning=False):
         """
         INSERT, UPDATE, DELETE, CREATE 실행 및 결과반환
+        is_returning 인 경우 RETURNING 절의 결과 행 목록을 반환(3.35.0 이상이 필요함)
         :param query:
         :param params:
         :param is_lastrowid:
+        :param is_returning:
         :return:
         """
+        # 요청 단위 SQL 실행 수 제한 확인(제한을 넘는 경우 실행하지 않음)
+        enforce_query_budget()
+        started = time.perf_counter()
         try:
             self._get_conn()
             if params:
                 cursor = self.db_conn.execute(query, params)
             else:
                 cursor = self.db_conn.execute(query)
+            # RETURNING 결과는 commit 전에 모두 읽어야 함
+            rows = cursor.fetchall() if is_returning else None
             self.db_conn.commit()
-            if is_lastrowid:
+            if is_returning:
+                result = rows
+            elif is_lastrowid:
                 result = cursor.lastrowid
             else:
                 result = cursor.rowcount
@@ -106,4 +140,42 @@ class Sqlite3:
             raise SystemError(e)
         finally:
             self._close_conn()
+            _record_query(started, 'cmd', query)
+        return result
+
+    def cmd_list(self, query_list, is_lastrowid=False, is_returning=False):
+        """
+        여러 INSERT, UPDATE, DELETE 를 하나의 트랜잭션으로 실행 및 결과반환
+        이전 INSERT 의 SEQ 가 필요한 경우 SQL 에서 last_insert_rowid() 를 사용
+        is_returning 인 경우 RETURNING 절의 결과 행 목록을 반환(3.35.0 이상이 필요함)
+        :param query_list: (query, params) 목록
+        :param is_lastrowid:
+        :param is_returning:
+        :return: 실행된 query 순서대로의 결과 목록
+        """
+        result = []
+        # 요청 단위 SQL 실행 수 제한 확인(제한을 넘는 경우 실행하지 않음)
+        enforce_query_budget()
+        started = time.perf_counter()
+        try:
+            self._get_conn()
+            for query, params in query_list:
+                if params:
+                    cursor = self.db_conn.execute(query, params)
+                else:
+                    cursor = self.db_conn.execute(query)
+                if is_returning:
+                    result.append(cursor.fetchall())
+                elif is_lastrowid:
+                    result.append(cursor.lastrowid)
+                else:
+                    result.append(cursor.rowcount)
+            self.db_conn.commit()
+        except Exception as e:
+            if self.db_conn is not None:
+                self.db_conn.rollback()
+            raise SystemError(e)
+        finally:
+            self._close_conn()
+            _record_query(started, 'cmd_list', query_list[0][0] if query_list else '')
         return result
@@ -1,5 +1,6 @@
 from flask_restx import fields, Model
 
+from .CommonSchemas import EpochDateTime
 from ..enums import BoardsCode
 
 # JSON 객체를 위한 Wildcard 모델 설정
@@ -13,6 +14,18 @@ wildcard_multi_model = Model('WildcardMultiModel', {
     '*_list_str': fields.Wildcard(fields.List(fields.String, description='추가 목록 정보(문자)'))
     # '*': fields.Wildcard(fields.String(description='추가 정보(default type)'))  # 나머지 설정이 적용되지 않고 무조건 '*' 설정으로 매핑됨
 })
+# 파일정보 상세
+file_detail_model = Model('FileDetail', {
+    'file_seq': fields.Integer(description='파일 일련번호', example=1, attribute='SEQ'),
+    'board_seq': fields.Integer(description='게시물 번호', example=1, attribute='BOARD_SEQ'),
+    'file_path': fields.String(description='파일 경로', example='upload', attribute='PATH'),
+    'file_name': fields.String(description='파일명', example='beb7728bebcb430c9c63716caed6b808.txt', attribute='FNAME'),
+    'file_org_name': fields.String(description='원본 파일명', example='aaa.txt', attribute='ONAME'),
+    'file_size': fields.Integer(description='파일 크기(byte)', example=1024, attribute='FILE_SIZE'),
+    'file_hash': fields.String(description='파일의 SHA-256', example='9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08', attribute='FILE_HASH'),
+    'rdate': EpochDateTime(description='등록일시', example='2023-09-06T14:42:06+09:00', attribute='RDATE'),
+    'r_user_id': fields.String(description='작성자', example='UserId', attribute='RUSER')
+})
 # 게시물 상세 Model
 board_save_model = Model('BoardSave', {
     'boards_code': fields.String(description='게시물 구분', enum=list([v.name for v in BoardsCode]), attribute='BOARDS_CODE', required=True),
@@ -20,21 +33,39 @@ board_save_model = Model('BoardSave', {
     'contents': fields.String(description='게시물 내용', example='내용', attribute='CONTENTS', required=True, min_length=1),
     'add_fields': fields.Nested(wildcard_multi_model, description='추가 정보', attribute='ADD_FIELDS', skip_none=True)
 })
+# 게시물 부분수정 Model : 전달된 항목만 수정되므로 필수 항목이 없음
+# add_fields 는 기존 값에 병합됨(JSON Merge Patch)
+board_patch_model = Model('BoardPatch', {
+    'boards_code': fields.String(description='게시물 구분', enum=list([v.name for v in BoardsCode]), attribute='BOARDS_CODE'),
+    'title': fields.String(description='게시물 제목', example='제목', attribute='TITLE', min_length=1, max_length=200),
+    'contents': fields.String(description='게시물 내용', example='내용', attribute='CONTENTS', min_length=1),
+    'add_fields': fields.Nested(wildcard_multi_model, description='추가 정보(기존 값에 병합)', attribute='ADD_FIELDS', skip_none=True)
+})
 board_detail_model = board_save_model.inherit('BoardDetail', {
     'board_seq': fields.Integer(description='게시물 번호', example=1, attribute='SEQ'),
     'r_user_id': fields.String(description='작성자', example='UserId', attribute='RUSER'),
     'm_user_id': fields.String(description='수정자', example='UserId', attribute='MUSER'),
-    'rdate': fields.DateTime(description='등록일시', example='2023-09-06T14:42:06', attribute='RDATE'),
-    'mdate': fields.DateTime(description='수정일시', example='2023-09-06T14:42:06', attribute='MDATE')
+    'rdate': EpochDateTime(description='등록일시', example='2023-09-06T14:42:06+09:00', attribute='RDATE'),
+    'mdate': EpochDateTime(description='수정일시', example='2023-09-06T14:42:06+09:00', attribute='MDATE')
+})
+# 게시물 include 항목 Model : include 파라메터로 요청한 항목만 게시물 상세에 추가됨
+board_include_model = Model('BoardInclude', {
+    'file_count': fields.Integer(description='파일수(include=file_count)', example=1, attribute='FILE_COUNT'),
+    'file_list': fields.List(fields.Nested(file_detail_model, skip_none=True), description='파일목록(include=files)', attribute='FILE_LIST')
 })
+# 게시물 상세 + include 항목 Model(문서용)
+board_detail_include_model = board_detail_model.inherit('BoardDetailInclude', board_include_model)
 board_detail_model_for_list = Model('BoardDetailForList', {
     'board_seq': fields.Integer(description='게시물 번호', example=1, attribute='SEQ'),
     'boards_code': fields.String(description='게시물 구분', enum=list([v.name for v in BoardsCode]), attribute='BOARDS_CODE'),
     'title': fields.String(description='게시물 제목', example='제목', attribute='TITLE'),
     'r_user_id': fields.String(description='작성자', example='UserId', attribute='RUSER'),
     'm_user_id': fields.String(description='수정자', example='UserId', attribute='MUSER'),
-    'rdate': fields.DateTime(description='등록일시', example='2023-09-06T14:42:06', attribute='RDATE'),
-    'mdate': fields.DateTime(description='수정일시', example='2023-09-06T14:42:06', attribute='MDATE')
+    'rdate': EpochDateTime(description='등록일시', example='2023-09-06T14:42:06+09:00', attribute='RDATE'),
+    'mdate': EpochDateTime(description='수정일시', example='2023-09-06T14:42:06+09:00', attribute='MDATE'),
+    # include 파라메터로 요청한 경우에만 값이 있음(목록에서는 skip_none 으로 제외됨)
+    'file_count': fields.Integer(description='파일수(include=file_count)', example=1, attribute='FILE_COUNT'),
+    'file_list': fields.List(fields.Nested(file_detail_model, skip_none=True), description='파일목록(include=files)', attribute='FILE_LIST')
 })
 # 게시물 등록 결과
 board_save_result_model = Model('BoardSaveResult', {
@@ -56,12 +87,27 @@ board_list_model = Model('BoardListResult', {
 file_model = Model('File', {
     'file_org_name': fields.String(description='원본 파일명', example='aaa.txt'),
     'file_tmp_path': fields.String(description='파일의 임시 디렉토리', example='tmp'),
-    'file_tmp_name': fields.String(description='파일의 임시 파일명', example='beb7728bebcb430c9c63716caed6b808.txt')
+    'file_tmp_name': fields.String(description='파일의 임시 파일명', example='beb7728bebcb430c9c63716caed6b808.txt'),
+    'file_size': fields.Integer(description='파일 크기(byte)', example=1024),
+    'file_hash': fields.String(description='파일의 SHA-256', example='9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08')
 })
 file_upload_result_model = Model('FileUploadResult', {
     'result': fields.String(description='결과', example='Success'),
     'files': fields.List(fields.Nested(file_model))
 })
+# 이어올리기 업로드 세션 생성 Model
+upload_session_save_model = Model('UploadSessionSave', {
+    'file_org_name': fields.String(description='원본 파일명', example='aaa.txt', required=True, min_length=1, max_length=255),
+    'file_size': fields.Integer(description='파일 전체 크기(byte)', example=52428800, required=True, min=1)
+})
+# 이어올리기 업로드 세션 Model
+upload_session_model = Model('UploadSession', {
+    'upload_id': fields.String(description='업로드 세션 ID', example='0f8e2a6c1b1d4c5e9a7b3d2f1e0c9b8a', attribute='UPLOAD_ID'),
+    'file_org_name': fields.String(description='원본 파일명', example='aaa.txt', attribute='ONAME'),
+    'file_size': fields.Integer(description='파일 전체 크기(byte)', example=52428800, attribute='FILE_SIZE'),
+    'offset': fields.Integer(description='업로드된 크기(byte), 다음 업로드 시작 위치', example=1048576, attribute='OFFSET'),
+    'rdate': EpochDateTime(description='등록일시', example='2023-09-06T14:42:06+09:00', attribute='RDATE')
+})
 # 업로드된 파일정보 저장 Model
 file_save_model = Model('FileSave', {
     # fields 로 선언되는 모든 타입은 None을 하용하지 않음
@@ -70,16 +116,6 @@ file_save_model = Model('FileSave', {
     'file_tmp_name': fields.String(description='파일의 임시 파일명', example='beb7728bebcb430c9c63716caed6b808.txt', required=True, min_length=1, max_length=255),
     'file_tmp_path': fields.String(description='파일의 임시 디렉토리', example='tmp', required=True, min_length=1, max_length=255)
 })
-# 파일정보 상세
-file_detail_model = Model('FileDetail', {
-    'file_seq': fields.Integer(description='파일 일련번호', example=1, attribute='SEQ'),
-    'board_seq': fields.Integer(description='게시물 번호', example=1, attribute='BOARD_SEQ'),
-    'file_path': fields.String(description='파일 경로', example='upload', attribute='PATH'),
-    'file_name': fields.String(description='파일명', example='beb7728bebcb430c9c63716caed6b808.txt', attribute='FNAME'),
-    'file_org_name': fields.String(description='원본 파일명', example='aaa.txt', attribute='ONAME'),
-    'rdate': fields.DateTime(description='등록일시', example='2023-09-06T14:42:06', attribute='RDATE'),
-    'r_user_id': fields.String(description='작성자', example='UserId', attribute='RUSER')
-})
 # 실제 파라메터로 넘길 파일정보 목록 Model
 file_save_list_model = Model('FileSaveList', {
     'file_list': fields.List(fields.Nested(file_save_model))
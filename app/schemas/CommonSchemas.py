@@ -1,12 +1,28 @@
+from datetime import datetime
+
 from flask_restx import fields, Model
 
+from ..configs import TIME_ZONE
+
+
+class EpochDateTime(fields.DateTime):
+    """
+    DB에 저장된 epoch(초)를 TIME_ZONE 기준 ISO8601 문자열로 변환
+    fields.DateTime 과 달리 문자열 parse 과정 없이 한번만 변환함
+    """
+    def format(self, value):
+        try:
+            return datetime.fromtimestamp(int(value), TIME_ZONE).isoformat()
+        except (TypeError, ValueError, OverflowError) as e:
+            raise fields.MarshallingError(e)
+
 
 # 기본 오류 메시지
 # fields.String 과 같이 내용이 없는경우 괄호는 생략가능함
 # fields.String는 pattern 파라메터로 RegExp를 사용한 유효성 검사를 할 수 있음
 # 예) pattern=r'\S+@\S+\.\S+', pattern=r'^(?=.*[a-zA-Z])(?=.*\d)(?!.*\s).{8,}$'
 default_error_model = Model('DefaultErrorMsg', {
-    'timestamp': fields.DateTime(description='오류발생 시간', example='2023-10-12T21:34:34.617561+00:00'),
+    'timestamp': fields.DateTime(description='오류발생 시간', example='2023-10-13T06:34:34.617561+09:00'),
     'status': fields.Integer(description='Http Status 코드', example='403'),
     'error': fields.String(description='Http Status 코드명', example='Forbidden'),
     'message': fields.String(description='오류 메시지', example='오류 메시지'),
@@ -12,3 +12,13 @@ from flask_restx import reqparse
 common_list_params = reqparse.RequestParser()
 common_list_params.add_argument('start_row', location='args', type=int, required=True, default=0, help='시작행 번호')
 common_list_params.add_argument('row_per_page', location='args', type=int, required=True, default=10, help='화면당 행 수')
+# 게시물 조회 시 함께 조회할 정보
+# action='append' 인 경우 choices 는 값마다 확인됨 : action='split' 은 목록 전체를 choices 와 비교하므로 사용하지 않음
+# 예) ?include=files&include=file_count
+board_include_argument = reqparse.Argument('include', location='args', type=str, action='append', choices=('files', 'file_count'),
+                                           help='함께 조회할 정보(files: 파일목록, file_count: 파일수)')
+board_include_params = reqparse.RequestParser()
+board_include_params.add_argument(board_include_argument)
+# 게시물 목록 조회 파라메터 : 목록 조회 공통 파라메터 + include
+board_list_params = common_list_params.copy()
+board_list_params.add_argument(board_include_argument)
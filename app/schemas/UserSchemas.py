@@ -1,5 +1,6 @@
 from flask_restx import fields, Model
 
+from .CommonSchemas import EpochDateTime
 from ..enums import AuthCode
 
 # 로그인 Model
@@ -21,10 +22,18 @@ user_save_model = Model('UserSave', {
     'user_name': fields.String(description='사용자명', example='UserName', attribute='USER_NAME', required=True, min_length=2, max_length=50),
     'auth_code': fields.String(description='권한코드', example='USER', attribute='AUTH_CODE', required=True, enum=list([v.name for v in AuthCode]))
 })
+# 사용자 부분수정 Model : 전달된 항목만 수정되므로 필수 항목이 없음
+# password 가 없는 경우 비밀번호 암호화(BCrypt)를 하지 않음
+user_patch_model = Model('UserPatch', {
+    'user_id': fields.String(description='사용자ID', example='UserId', attribute='USER_ID', min_length=5, max_length=20),
+    'password': fields.String(description='비밀번호', example='Password', attribute='USER_PW', min_length=5, max_length=15),
+    'user_name': fields.String(description='사용자명', example='UserName', attribute='USER_NAME', min_length=2, max_length=50),
+    'auth_code': fields.String(description='권한코드(변경불가)', example='USER', attribute='AUTH_CODE', enum=list([v.name for v in AuthCode]))
+})
 user_detail_model = user_save_model.inherit('UserDetail', {
     'user_seq': fields.Integer(description='사용자 번호', example=1, attribute='SEQ'),
-    'rdate': fields.DateTime(description='등록일시', example='2023-09-06T14:42:06', attribute='RDATE'),
-    'mdate': fields.DateTime(description='수정일시', example='2023-09-06T14:42:06', attribute='MDATE')
+    'rdate': EpochDateTime(description='등록일시', example='2023-09-06T14:42:06+09:00', attribute='RDATE'),
+    'mdate': EpochDateTime(description='수정일시', example='2023-09-06T14:42:06+09:00', attribute='MDATE')
 })
 # 사용자 등록 결과
 user_save_result_model = Model('UserSaveResult', {
@@ -1,14 +1,108 @@
 import json
 import logging
 import os
-import shutil
+import time
+import zlib
+from datetime import datetime
 
 from flask import g
 from flask_babel import gettext
-from werkzeug.exceptions import NotFound
+from werkzeug.exceptions import BadRequest, NotFound
 
-from ..configs import PROJECT_ID, PathConfig
+from ..configs import PROJECT_ID, TIME_ZONE, PathConfig, BoardBodyConfig, UploadConfig
 from ..datasources import Sqlite3
+from ..utils import shard_path
+from .JobService import JobService, JobWorker
+from .UploadService import UploadService
+
+# INSERT, UPDATE 후 RETURNING 으로 반환할 BOARDS 컬럼
+_RETURNING_COLUMNS = 'SEQ, BOARDS_CODE, TITLE, RDATE, RUSER, MDATE, MUSER'
+
+
+def _pack_contents(contents):
+    """
+    CONTENTS 저장값 생성
+    BoardBodyConfig['compress_min_size'] 이상인 경우 zlib 압축
+    :param contents:
+    :return: (저장값, 압축여부)
+    """
+    min_size = BoardBodyConfig['compress_min_size']
+    if contents and min_size > 0:
+        encoded = contents.encode('utf-8')
+        if len(encoded) >= min_size:
+            return zlib.compress(encoded, BoardBodyConfig['compress_level']), 1
+    return contents, 0
+
+
+def _merge_body(returned_rows, contents, add_fields):
+    """
+    RETURNING 으로 반환된 BOARDS 행에 저장한 CONTENTS, ADD_FIELDS 추가
+    :param returned_rows:
+    :param contents:
+    :param add_fields:
+    :return: 반환된 행이 없으면 None
+    """
+    if not returned_rows:
+        return None
+    board_info = returned_rows[0]
+    board_info['CONTENTS'] = contents
+    board_info['ADD_FIELDS'] = add_fields
+    return board_info
+
+
+def _unpack_body(board_info, body):
+    """
+    BOARD_BODIES 조회결과(CONTENTS, ADD_FIELDS, IS_COMPRESSED)를 Board 정보에 설정
+    :param board_info:
+    :param body: BOARD_BODIES 가 없는 경우 None
+    :return:
+    """
+    body = body or {}
+    board_info['CONTENTS'] = _unpack_contents(body.get('CONTENTS'), body.get('IS_COMPRESSED'))
+    board_info['ADD_FIELDS'] = json.loads(body['ADD_FIELDS']) if body.get('ADD_FIELDS') else None
+    board_info.pop('IS_COMPRESSED', None)
+    return board_info
+
+
+def _rel_path(path, name):
+    """
+    file_upload_home 기준 상대경로 생성 : JobService 작업 정보에 사용
+    :param path:
+    :param name:
+    :return:
+    """
+    return f'{path}/{name}'
+
+
+def _zip_entry_name(file_org_name, used_names):
+    """
+    ZIP 내 파일명 : 원본 파일명에서 경로 구분자를 제거하고, 같은 이름이 있는 경우 '이름 (2).확장자' 형태로 변경
+    :param file_org_name:
+    :param used_names: 이미 사용된 파일명(소문자), 반환된 파일명이 추가됨
+    :return:
+    """
+    entry_name = file_org_name.replace('/', '_').replace('\\', '_').strip() or 'file'
+    (stem, dot, ext) = entry_name.rpartition('.')
+    if not dot:
+        (stem, ext) = (entry_name, '')
+    idx = 1
+    while entry_name.lower() in used_names:
+        idx += 1
+        entry_name = f'{stem} ({idx}).{ext}' if dot else f'{stem} ({idx})'
+    used_names.add(entry_name.lower())
+    return entry_name
+
+
+def _unpack_contents(contents, is_compressed):
+    """
+    저장된 CONTENTS 를 문자열로 변환
+    :param contents:
+    :param is_compressed:
+    :return:
+    """
+    if is_compressed:
+        return zlib.decompress(contents).decode('utf-8')
+    return contents
 
 
 class BoardService:
@@ -36,7 +130,7 @@ class BoardService:
         :return:
         :rtype:
         """
-        select_sql = 'SELECT SEQ, BOARDS_CODE, TITLE, STRFTIME("%Y-%m-%dT%H:%M:%S", RDATE) AS RDATE, RUSER, STRFTIME("%Y-%m-%dT%H:%M:%S", MDATE) AS MDATE, MUSER FROM BOARDS'
+        select_sql = 'SELECT SEQ, BOARDS_CODE, TITLE, RDATE, RUSER, MDATE, MUSER FROM BOARDS'
         where_sql = ' WHERE 1 = 1'
         orderby_sql = ' ORDER BY RDATE DESC'
         limit_sql = ' LIMIT ?, ?'
@@ -98,17 +192,20 @@ class BoardService:
     def get_board_by_seq(board_seq):
         """
         Board 정보 조회
+        CONTENTS, ADD_FIELDS 는 BOARD_BODIES 에서 조회
         :param board_seq:
         :return:
         """
-        board_info = Sqlite3().execute('SELECT SEQ, BOARDS_CODE, TITLE, CONTENTS, ADD_FIELDS, STRFTIME("%Y-%m-%dT%H:%M:%S", RDATE) AS RDATE, RUSER, STRFTIME("%Y-%m-%dT%H:%M:%S", MDATE) AS MDATE, MUSER FROM BOARDS WHERE SEQ = ?', (board_seq,), True)
-        board_info['ADD_FIELDS'] = json.loads(board_info['ADD_FIELDS'])
+        board_info = Sqlite3().execute('SELECT B.SEQ, B.BOARDS_CODE, B.TITLE, D.CONTENTS, D.ADD_FIELDS, D.IS_COMPRESSED, B.RDATE, B.RUSER, B.MDATE, B.MUSER FROM BOARDS B LEFT JOIN BOARD_BODIES D ON D.BOARD_SEQ = B.SEQ WHERE B.SEQ = ?', (board_seq,), True)
+        if board_info:
+            _unpack_body(board_info, board_info)
         return board_info
 
     @staticmethod
     def _insert_board(boards_code, title, contents, add_fields, user_id):
         """
         Board 정보 등록
+        INSERT ... RETURNING 으로 등록된 행을 바로 반환
         :param boards_code:
         :type boards_code:
         :param title:
@@ -119,17 +216,25 @@ class BoardService:
         :type add_fields:
         :param user_id:
         :type user_id:
-        :return:
+        :return: 등록된 Board 정보, 등록되지 않은 경우 None
         :rtype:
         """
-        result = Sqlite3().cmd('INSERT INTO BOARDS (BOARDS_CODE, TITLE, CONTENTS, ADD_FIELDS, RDATE, RUSER, MDATE, MUSER) VALUES (?, ?, ?, ?, DATETIME(\'now\', \'localtime\'), ?, DATETIME(\'now\', \'localtime\'), ?)',
-                               (boards_code, title, contents, json.dumps(add_fields), user_id, user_id), True)
-        return result
+        (packed_contents, is_compressed) = _pack_contents(contents)
+        now = int(time.time())
+        result = Sqlite3().cmd_list([
+            (f'INSERT INTO BOARDS (BOARDS_CODE, TITLE, RDATE, RUSER, MDATE, MUSER) VALUES (?, ?, ?, ?, ?, ?) RETURNING {_RETURNING_COLUMNS}',
+             (boards_code, title, now, user_id, now, user_id)),
+            ('INSERT INTO BOARD_BODIES (BOARD_SEQ, CONTENTS, ADD_FIELDS, IS_COMPRESSED) VALUES (last_insert_rowid(), ?, ?, ?)',
+             (packed_contents, json.dumps(add_fields), is_compressed))
+        ], is_returning=True)
+        return _merge_body(result[0], contents, add_fields)
 
     @staticmethod
     def _update_board(board_seq, boards_code, title, contents, add_fields, user_id):
         """
         Board 정보 수정
+        UPDATE ... RETURNING 으로 수정된 행을 바로 반환
+        BOARD_BODIES 는 BOARDS 가 수정된 경우(changes() > 0)에만 저장
         :param board_seq:
         :type board_seq:
         :param boards_code:
@@ -142,30 +247,97 @@ class BoardService:
         :type add_fields:
         :param user_id:
         :type user_id:
-        :return:
+        :return: 수정된 Board 정보, 게시물이 없는 경우 None
         :rtype:
         """
-        result = Sqlite3().cmd('UPDATE BOARDS SET BOARDS_CODE = ?, TITLE = ?, CONTENTS = ?, ADD_FIELDS = ?, MUSER = ?, MDATE = DATETIME(\'now\', \'localtime\') WHERE SEQ = ?',
-                               (boards_code, title, contents, json.dumps(add_fields), user_id, board_seq))
-        return result
+        (packed_contents, is_compressed) = _pack_contents(contents)
+        result = Sqlite3().cmd_list([
+            (f'UPDATE BOARDS SET BOARDS_CODE = ?, TITLE = ?, MUSER = ?, MDATE = ? WHERE SEQ = ? RETURNING {_RETURNING_COLUMNS}',
+             (boards_code, title, user_id, int(time.time()), board_seq)),
+            ('INSERT OR REPLACE INTO BOARD_BODIES (BOARD_SEQ, CONTENTS, ADD_FIELDS, IS_COMPRESSED) SELECT ?, ?, ?, ? WHERE changes() > 0',
+             (board_seq, packed_contents, json.dumps(add_fields), is_compressed))
+        ], is_returning=True)
+        return _merge_body(result[0], contents, add_fields)
+
+    @staticmethod
+    def patch_board(board_seq, user_id, boards_code=None, title=None, contents=None, add_fields=None):
+        """
+        Board 정보 부분수정
+        None 이 아닌 항목의 컬럼만 수정하며, BOARD_BODIES 는 CONTENTS 또는 ADD_FIELDS 가 있는 경우에만 수정
+        ADD_FIELDS 는 json_patch(JSON Merge Patch)로 기존 값에 병합
+        :param board_seq:
+        :type board_seq:
+        :param user_id:
+        :type user_id:
+        :param boards_code:
+        :type boards_code:
+        :param title:
+        :type title:
+        :param contents:
+        :type contents:
+        :param add_fields:
+        :type add_fields:
+        :return: 수정된 Board 정보
+        :rtype:
+        """
+        if boards_code is None and title is None and contents is None and add_fields is None:
+            raise BadRequest(gettext(u'수정할 항목이 없습니다.'))
+        board_sets = []
+        board_params = []
+        if boards_code is not None:
+            board_sets.append('BOARDS_CODE = ?')
+            board_params.append(boards_code)
+        if title is not None:
+            board_sets.append('TITLE = ?')
+            board_params.append(title)
+        board_sets.extend(['MUSER = ?', 'MDATE = ?'])
+        board_params.extend([user_id, int(time.time()), board_seq])
+        body_sets = []
+        body_params = []
+        if contents is not None:
+            (packed_contents, is_compressed) = _pack_contents(contents)
+            body_sets.extend(['CONTENTS = ?', 'IS_COMPRESSED = ?'])
+            body_params.extend([packed_contents, is_compressed])
+        if add_fields is not None:
+            body_sets.append('ADD_FIELDS = json_patch(COALESCE(ADD_FIELDS, \'{}\'), ?)')
+            body_params.append(json.dumps(add_fields))
+        body_params.append(board_seq)
+        if body_sets:
+            body_query = f'UPDATE BOARD_BODIES SET {", ".join(body_sets)} WHERE BOARD_SEQ = ? RETURNING CONTENTS, ADD_FIELDS, IS_COMPRESSED'
+        else:
+            # 응답에 필요한 내용만 조회
+            body_query = 'SELECT CONTENTS, ADD_FIELDS, IS_COMPRESSED FROM BOARD_BODIES WHERE BOARD_SEQ = ?'
+        result = Sqlite3().cmd_list([
+            (f'UPDATE BOARDS SET {", ".join(board_sets)} WHERE SEQ = ? RETURNING {_RETURNING_COLUMNS}', tuple(board_params)),
+            (body_query, tuple(body_params))
+        ], is_returning=True)
+        if not result[0]:
+            raise NotFound(gettext(u'게시물이 존재하지 않습니다.'))
+        return _unpack_body(result[0][0], result[1][0] if result[1] else None)
 
     def delete_boards(self, board_seq_list):
         """
         Board 삭제
+        첨부파일 삭제 작업 등록, FILES, BOARD_BODIES, BOARDS 삭제를 IN 조건으로 하나의 트랜잭션에서 처리
+        실제 파일 삭제는 JobWorker 에서 처리
         :param board_seq_list:
         :return:
         """
-        # 파일 확인 후 삭제
-        for board_seq in board_seq_list:
-            self.save_board_file(int(board_seq), None, None, None, None, None)
-        # 게시글 삭제
-        in_query_str = ','.join(list(''.rjust(len(board_seq_list), '?')))
-        result = Sqlite3().cmd(f'DELETE FROM BOARDS WHERE SEQ IN ({in_query_str})', tuple(board_seq_list))
-        return result
+        board_seqs = tuple(int(board_seq) for board_seq in board_seq_list)
+        in_query_str = ','.join(list(''.rjust(len(board_seqs), '?')))
+        result = Sqlite3().cmd_list([
+            JobService.make_file_remove_query(f'F.BOARD_SEQ IN ({in_query_str})', board_seqs),
+            (f'DELETE FROM FILES WHERE BOARD_SEQ IN ({in_query_str})', board_seqs),
+            (f'DELETE FROM BOARD_BODIES WHERE BOARD_SEQ IN ({in_query_str})', board_seqs),
+            (f'DELETE FROM BOARDS WHERE SEQ IN ({in_query_str})', board_seqs)
+        ])
+        JobWorker.notify()
+        return result[3]
 
     def save_board(self, board_seq, boards_code, title, contents, add_fields, user_id):
         """
         Board 정보 저장
+        별도 조회없이 저장된 행을 반환하며, 수정 대상이 없는 경우 NotFound
         :param board_seq:
         :type board_seq:
         :param boards_code:
@@ -178,21 +350,17 @@ class BoardService:
         :type add_fields:
         :param user_id:
         :type user_id:
-        :return:
+        :return: 저장된 Board 정보
         :rtype:
         """
         if board_seq:
-            board_info = self.get_board_by_seq(board_seq)
-            if not board_info:
-                raise NotFound(gettext(u'게시물이 존재하지 않습니다.'))
-        else:
-            board_info = None
-        if board_info:
             result = self._update_board(board_seq, boards_code, title, contents, add_fields, user_id)
+            if not result:
+                raise NotFound(gettext(u'게시물이 존재하지 않습니다.'))
         else:
             result = self._insert_board(boards_code, title, contents, add_fields, user_id)
-        if result < 1:
-            raise SystemError('Save Board Error')
+            if not result:
+                raise SystemError('Save Board Error')
         return result
 
     @staticmethod
@@ -203,7 +371,7 @@ class BoardService:
         :param is_key:
         :return:
         """
-        file_list = Sqlite3().execute('SELECT SEQ, BOARD_SEQ, PATH, FNAME, ONAME, STRFTIME("%Y-%m-%dT%H:%M:%S", RDATE) AS RDATE, RUSER FROM FILES WHERE BOARD_SEQ = ? ORDER BY SEQ', (board_seq,))
+        file_list = Sqlite3().execute('SELECT SEQ, BOARD_SEQ, PATH, FNAME, ONAME, RDATE, RUSER, FILE_HASH, FILE_SIZE FROM FILES WHERE BOARD_SEQ = ? ORDER BY SEQ', (board_seq,))
         if is_key:
             if file_list:
                 file_info_list = {}
@@ -215,6 +383,59 @@ class BoardService:
             file_info_list = file_list
         return file_info_list
 
+    @staticmethod
+    def get_board_file_map(board_seqs):
+        """
+        여러 Board 의 File 목록을 한번에 조회
+        :param board_seqs:
+        :return: {BOARD_SEQ: [File 정보]}
+        """
+        file_map = {}
+        if not board_seqs:
+            return file_map
+        in_query_str = ','.join(list(''.rjust(len(board_seqs), '?')))
+        file_list = Sqlite3().execute(f'SELECT SEQ, BOARD_SEQ, PATH, FNAME, ONAME, RDATE, RUSER, FILE_HASH, FILE_SIZE FROM FILES WHERE BOARD_SEQ IN ({in_query_str}) ORDER BY BOARD_SEQ, SEQ', tuple(board_seqs))
+        for file in file_list:
+            file_map.setdefault(file['BOARD_SEQ'], []).append(file)
+        return file_map
+
+    @staticmethod
+    def get_board_file_count_map(board_seqs):
+        """
+        여러 Board 의 File 수를 한번에 조회
+        :param board_seqs:
+        :return: {BOARD_SEQ: File 수}
+        """
+        if not board_seqs:
+            return {}
+        in_query_str = ','.join(list(''.rjust(len(board_seqs), '?')))
+        count_list = Sqlite3().execute(f'SELECT BOARD_SEQ, COUNT(*) AS CNT FROM FILES WHERE BOARD_SEQ IN ({in_query_str}) GROUP BY BOARD_SEQ', tuple(board_seqs))
+        return {count['BOARD_SEQ']: count['CNT'] for count in count_list}
+
+    def set_board_files(self, board_list, include):
+        """
+        include 에 따라 Board 정보에 FILE_LIST, FILE_COUNT 설정
+        화면의 모든 Board 에 대해 FILES 를 IN 조건으로 한번만 조회함
+        :param board_list:
+        :param include: 'files', 'file_count' 목록
+        :return:
+        """
+        if not board_list or not include:
+            return board_list
+        board_seqs = [board['SEQ'] for board in board_list]
+        if 'files' in include:
+            file_map = self.get_board_file_map(board_seqs)
+            for board in board_list:
+                board['FILE_LIST'] = file_map.get(board['SEQ'], [])
+                # 파일목록을 조회한 경우 파일수는 별도로 조회하지 않음
+                if 'file_count' in include:
+                    board['FILE_COUNT'] = len(board['FILE_LIST'])
+        elif 'file_count' in include:
+            count_map = self.get_board_file_count_map(board_seqs)
+            for board in board_list:
+                board['FILE_COUNT'] = count_map.get(board['SEQ'], 0)
+        return board_list
+
     @staticmethod
     def get_file_by_seq(file_seq):
         """
@@ -222,11 +443,39 @@ class BoardService:
         :param file_seq:
         :return:
         """
-        file_info = Sqlite3().execute('SELECT SEQ, BOARD_SEQ, PATH, FNAME, ONAME, STRFTIME("%Y-%m-%dT%H:%M:%S", RDATE) AS RDATE, RUSER FROM FILES WHERE SEQ = ?', (file_seq,), True)
+        file_info = Sqlite3().execute('SELECT SEQ, BOARD_SEQ, PATH, FNAME, ONAME, RDATE, RUSER, FILE_HASH, FILE_SIZE FROM FILES WHERE SEQ = ?', (file_seq,), True)
         return file_info
 
     @staticmethod
-    def _insert_file(board_seq, path, fname, oname, user_id):
+    def get_file_full_path(file_info):
+        """
+        File 정보의 실제 파일 경로
+        :param file_info:
+        :return:
+        """
+        return os.path.join(PathConfig[g.env_val]['file_upload_home'], *file_info['PATH'].split('/'), file_info['FNAME'])
+
+    def get_board_zip_entries(self, board_seq):
+        """
+        게시물의 모든 첨부파일을 ZIP 으로 내려받기 위한 파일 목록
+        파일 이동 작업이 처리되기 전이라 파일이 없는 경우는 제외
+        :param board_seq:
+        :return: (파일 전체 경로, ZIP 내 파일명, 등록일시) 목록
+        """
+        entries = []
+        used_names = set()
+        for file_info in self.get_board_file_list(board_seq):
+            full_path = self.get_file_full_path(file_info)
+            if not os.path.isfile(full_path):
+                self.logger.warning(f'ZIP skip file : {file_info["SEQ"]} {file_info["PATH"]}/{file_info["FNAME"]}')
+                continue
+            # ZIP 은 1980년 이전 일시를 저장 할 수 없음, 숫자 문자열로 저장된 경우도 있으므로 int 변환
+            date_time = max(datetime.fromtimestamp(int(file_info['RDATE'] or 0), TIME_ZONE).timetuple()[:6], (1980, 1, 1, 0, 0, 0))
+            entries.append((full_path, _zip_entry_name(file_info['ONAME'], used_names), date_time))
+        return entries
+
+    @staticmethod
+    def _insert_file(board_seq, path, fname, oname, user_id, file_hash, file_size):
         """
         Board File 등록
         :param board_seq:
@@ -234,14 +483,16 @@ class BoardService:
         :param fname:
         :param oname:
         :param user_id:
+        :param file_hash:
+        :param file_size:
         :return:
         """
-        result = Sqlite3().cmd('INSERT INTO FILES (BOARD_SEQ, PATH, FNAME, ONAME, RDATE, RUSER) VALUES (?, ?, ?, ?, DATETIME(\'now\', \'localtime\'), ?)',
-                               (board_seq, path, fname, oname, user_id))
+        result = Sqlite3().cmd('INSERT INTO FILES (BOARD_SEQ, PATH, FNAME, ONAME, RDATE, RUSER, FILE_HASH, FILE_SIZE) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                               (board_seq, path, fname, oname, int(time.time()), user_id, file_hash, file_size))
         return result
 
     @staticmethod
-    def _update_file(file_seq, path, fname, oname, user_id):
+    def _update_file(file_seq, path, fname, oname, user_id, file_hash, file_size):
         """
         Board File 변경
         :param file_seq:
@@ -249,10 +500,12 @@ class BoardService:
         :param fname:
         :param oname:
         :param user_id:
+        :param file_hash:
+        :param file_size:
         :return:
         """
-        result = Sqlite3().cmd('UPDATE FILES SET PATH = ?, FNAME = ?, ONAME = ?, RUSER = ?, RDATE = DATETIME(\'now\', \'localtime\') WHERE SEQ = ?',
-                               (path, fname, oname, user_id, file_seq))
+        result = Sqlite3().cmd('UPDATE FILES SET PATH = ?, FNAME = ?, ONAME = ?, RUSER = ?, RDATE = ?, FILE_HASH = ?, FILE_SIZE = ? WHERE SEQ = ?',
+                               (path, fname, oname, user_id, int(time.time()), file_hash, file_size, file_seq))
         return result
 
     @staticmethod
@@ -265,9 +518,26 @@ class BoardService:
         result = Sqlite3().cmd('DELETE FROM FILES WHERE SEQ = ?', (file_seq,))
         return result
 
+    @staticmethod
+    def _get_tmp_file_hash(file_tmp_path, file_tmp_name):
+        """
+        임시파일의 SHA-256, 크기 조회 : 화면에서 전달된 값은 사용하지 않고 업로드시 서버에서 계산하여 등록한 값을 사용
+        파일을 다시 읽지 않으므로 임시파일이 있는지, 크기가 같은지만 확인함
+        :param file_tmp_path:
+        :param file_tmp_name:
+        :return: (SHA-256, 파일 크기)
+        """
+        tmp_file = UploadService.get_tmp_file(file_tmp_path, file_tmp_name)
+        if not tmp_file:
+            raise BadRequest(gettext(u'임시파일이 존재하지 않습니다.'))
+        return tmp_file['FILE_HASH'], tmp_file['FILE_SIZE']
+
     def save_board_file(self, board_seq, file_seqs, file_org_names, file_tmp_names, file_tmp_paths, user_id):
         """
         Board File 저장 처리
+        파일은 SHA-256 을 파일명으로 저장하여 내용이 같은 파일은 하나만 저장함(FILES 의 같은 PATH, FNAME 행 수가 참조 수)
+        저장 디렉토리는 file_path 아래 SHA-256 앞자리로 나눈 하위 디렉토리(예: upload/ab/cd)이며 FILES.PATH 에 기록됨
+        파일 이동, 삭제는 데이터 저장 후 JobService 에 등록하여 백그라운드에서 처리
         :param board_seq:
         :param file_seqs:
         :param file_org_names:
@@ -277,9 +547,8 @@ class BoardService:
         :return:
         """
         # 업로드 디렉토리 설정
-        upload_path = PathConfig[g.env_val]['file_path']
-        file_base_path = PathConfig[g.env_val]['file_upload_home']
-        os.makedirs(file_base_path + os.path.sep + upload_path, exist_ok=True)
+        file_path = PathConfig[g.env_val]['file_path']
+        job_service = JobService()
         if file_seqs and len(file_seqs) > 0:
             # 등록된 데이터 조회
             file_seq_list = self.get_board_file_list(board_seq, True)
@@ -289,44 +558,36 @@ class BoardService:
                     # 기존 데이터와 비교 후 다르면 데이터 변경
                     old_info = file_seq_list[int(file_seq)]
                     if old_info and old_info['PATH'] != file_tmp_paths[idx]:
-                        # 기존 파일 삭제
-                        old_file_path = file_base_path + os.path.sep + old_info['PATH'] + os.path.sep + old_info['FNAME']
-                        if os.path.exists(old_file_path):
-                            os.remove(old_file_path)
-                        # 임시파일을 실제 디렉토리로 이동
-                        tmp_file_path = file_base_path + os.path.sep + file_tmp_paths[idx] + os.path.sep + file_tmp_names[idx]
-                        new_file_path = file_base_path + os.path.sep + upload_path + os.path.sep + file_tmp_names[idx]
-                        shutil.move(tmp_file_path, new_file_path)
                         # 변경된 파일로 다시 저장
-                        self._update_file(file_seq, upload_path, file_tmp_names[idx], file_org_names[idx], user_id)
+                        (file_hash, file_size) = self._get_tmp_file_hash(file_tmp_paths[idx], file_tmp_names[idx])
+                        upload_path = shard_path(file_path, file_hash, UploadConfig['shard_depth'])
+                        self._update_file(file_seq, upload_path, file_hash, file_org_names[idx], user_id, file_hash, file_size)
+                        # 기존 파일 삭제(참조하는 데이터가 없는 경우), 임시파일을 실제 디렉토리로 이동(같은 파일이 있는 경우 임시파일 삭제)
+                        job_service.enqueue_file_remove(_rel_path(old_info['PATH'], old_info['FNAME']))
+                        job_service.enqueue_file_move(_rel_path(file_tmp_paths[idx], file_tmp_names[idx]), _rel_path(upload_path, file_hash))
                 # 등록된 데이터가 없는 경우
                 elif not file_seq:
                     # 이동할 파일이 있는지 확인
                     if file_org_names[idx]:
-                        # 임시파일을 실제 디렉토리로 이동
-                        tmp_file_path = file_base_path + os.path.sep + file_tmp_paths[idx] + os.path.sep + file_tmp_names[idx]
-                        new_file_path = file_base_path + os.path.sep + upload_path + os.path.sep + file_tmp_names[idx]
-                        shutil.move(tmp_file_path, new_file_path)
                         # 파일등록
-                        self._insert_file(board_seq, upload_path, file_tmp_names[idx], file_org_names[idx], user_id)
+                        (file_hash, file_size) = self._get_tmp_file_hash(file_tmp_paths[idx], file_tmp_names[idx])
+                        upload_path = shard_path(file_path, file_hash, UploadConfig['shard_depth'])
+                        self._insert_file(board_seq, upload_path, file_hash, file_org_names[idx], user_id, file_hash, file_size)
+                        # 임시파일을 실제 디렉토리로 이동(같은 파일이 있는 경우 임시파일 삭제)
+                        job_service.enqueue_file_move(_rel_path(file_tmp_paths[idx], file_tmp_names[idx]), _rel_path(upload_path, file_hash))
             # 삭제 대상 파일 확인 후 삭제
             if file_seq_list:
                 for key in list(file_seq_list.keys()):
                     if str(key) not in file_seqs:
-                        # 파일 삭제
-                        old_info = file_seq_list[key]
-                        old_file_path = file_base_path + os.path.sep + old_info['PATH'] + os.path.sep + old_info['FNAME']
-                        if os.path.exists(old_file_path):
-                            os.remove(old_file_path)
                         # 데이터 삭제
                         self._delete_file(key)
+                        # 파일 삭제(참조하는 데이터가 없는 경우)
+                        old_info = file_seq_list[key]
+                        job_service.enqueue_file_remove(_rel_path(old_info['PATH'], old_info['FNAME']))
         else:  # 화면에서 등록한 파일이 없는경우 데이터를 확인 후 삭제
-            # 등록된 데이터 조회
-            file_seq_list = self.get_board_file_list(board_seq)
-            for old_file in file_seq_list:
-                # 파일 삭제
-                old_file_path = file_base_path + os.path.sep + old_file['PATH'] + os.path.sep + old_file['FNAME']
-                if os.path.exists(old_file_path):
-                    os.remove(old_file_path)
-                # 데이터 삭제
-                self._delete_file(old_file['SEQ'])
+            # 파일 삭제 작업 등록 및 데이터 삭제를 하나의 트랜잭션으로 처리
+            Sqlite3().cmd_list([
+                job_service.make_file_remove_query('F.BOARD_SEQ = ?', (board_seq,)),
+                ('DELETE FROM FILES WHERE BOARD_SEQ = ?', (board_seq,))
+            ])
+            JobWorker.notify()
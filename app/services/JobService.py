@@ -0,0 +1,394 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from ..configs import PROJECT_ID, PathConfig, JobConfig
+from ..datasources import Sqlite3
+from ..utils import metrics
+
+# 작업 구분
+JOB_FILE_MOVE = 'FILE_MOVE'
+JOB_FILE_REMOVE = 'FILE_REMOVE'
+# 작업 상태
+STATUS_READY = 'READY'
+STATUS_RUNNING = 'RUNNING'
+STATUS_DONE = 'DONE'
+STATUS_FAILED = 'FAILED'
+
+
+class RetryLater(Exception):
+    """
+    지금은 처리 할 수 없어 재시도가 필요한 경우
+    """
+    pass
+
+
+def _full_path(base_path, rel_path):
+    """
+    file_upload_home 기준 상대경로('/' 구분)를 실제 경로로 변환
+    :param base_path:
+    :param rel_path:
+    :return:
+    """
+    return os.path.join(base_path, *rel_path.split('/'))
+
+
+def _move_file(base_path, payload):
+    """
+    임시파일을 실제 디렉토리로 이동
+    내용이 같은 파일이 이미 있는 경우(중복제거) 이동하지 않고 임시파일만 삭제
+    이미 이동된 경우 완료로 처리
+    이동 또는 삭제된 임시파일의 정보(TMP_FILES)도 삭제
+    :param base_path:
+    :param payload: {'src': 임시파일 상대경로, 'dst': 저장할 상대경로}
+    :return:
+    """
+    src = _full_path(base_path, payload['src'])
+    dst = _full_path(base_path, payload['dst'])
+    if os.path.exists(dst):
+        if os.path.exists(src):
+            os.remove(src)
+    else:
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        shutil.move(src, dst)
+    (src_path, _, src_name) = payload['src'].rpartition('/')
+    Sqlite3().cmd('DELETE FROM TMP_FILES WHERE PATH = ? AND FNAME = ?', (src_path, src_name))
+
+
+def _remove_file(base_path, payload):
+    """
+    파일 삭제
+    여러 FILES 데이터가 같은 파일을 참조할 수 있으므로 참조하는 데이터가 없는 경우에만 삭제
+    확인 후 삭제 전에 참조가 추가되는 경우를 위해 파일명을 변경한 다음 다시 확인하고, 참조가 있으면 되돌림
+    파일이 없는 경우 완료로 처리하지만, 같은 파일의 이동 작업이 남아있는 경우 재시도
+    :param base_path:
+    :param payload: {'path': 삭제할 상대경로}
+    :return:
+    """
+    path = payload['path']
+    if JobService.get_file_ref_count(path) > 0:
+        return
+    full_path = _full_path(base_path, path)
+    removing_path = f'{full_path}.{uuid.uuid4().hex}.removing'
+    try:
+        os.rename(full_path, removing_path)
+    except FileNotFoundError:
+        if JobService.has_pending_move(path):
+            raise RetryLater(f'pending {JOB_FILE_MOVE} : {path}')
+        return
+    if JobService.get_file_ref_count(path) > 0:
+        os.replace(removing_path, full_path)
+    else:
+        os.remove(removing_path)
+
+
+class JobService:
+    """
+    JOBS 테이블을 사용한 백그라운드 작업 처리
+    요청을 처리하는 Thread 에서는 작업만 등록하고, 실제 처리는 JobWorker 에서 함
+    IDEMPOTENCY_KEY 가 같은 작업이 대기중(READY)인 경우 다시 등록하지 않음
+    처리중(RUNNING)인 작업은 이미 데이터를 조회했으므로 이후의 변경이 반영되지 않음, 따라서 중복으로 보지 않고 새로 등록함
+    """
+    # 작업 구분별 처리 함수
+    handlers = {
+        JOB_FILE_MOVE: _move_file,
+        JOB_FILE_REMOVE: _remove_file
+    }
+
+    def __init__(self):
+        """
+        Class 생성 및 변수선언
+        """
+        self.logger = logging.getLogger(f'{PROJECT_ID}.services.JobService')
+
+    @staticmethod
+    def make_enqueue_query(job_type, payload, idempotency_key=None):
+        """
+        작업 등록 query 생성
+        데이터 변경과 같은 트랜잭션에서 등록하려면 Sqlite3().cmd_list 에 함께 전달
+        :param job_type:
+        :param payload:
+        :param idempotency_key: 없는 경우 중복 확인을 하지 않음, 같은 값의 대기중(READY) 작업이 있는 경우에만 등록하지 않음
+        :return: (query, params)
+        """
+        now = int(time.time())
+        return ('INSERT INTO JOBS (JOB_TYPE, PAYLOAD, IDEMPOTENCY_KEY, STATUS, RETRY_COUNT, NEXT_RUN, RDATE, MDATE) '
+                'SELECT ?, ?, ?, ?, 0, ?, ?, ? '
+                'WHERE ? IS NULL OR NOT EXISTS (SELECT 1 FROM JOBS WHERE IDEMPOTENCY_KEY = ? AND STATUS = ?)',
+                (job_type, json.dumps(payload), idempotency_key, STATUS_READY, now, now, now, idempotency_key, idempotency_key, STATUS_READY))
+
+    @staticmethod
+    def make_file_remove_query(where_sql, params):
+        """
+        FILES 테이블에서 조건에 해당하는 파일의 삭제 작업 등록 query 생성
+        FILES 데이터를 삭제하기 전에 같은 트랜잭션에서 실행해야 함
+        :param where_sql: FILES 조회 조건
+        :param params: where_sql 의 파라메터
+        :return: (query, params)
+        """
+        now = int(time.time())
+        return (f'INSERT INTO JOBS (JOB_TYPE, PAYLOAD, IDEMPOTENCY_KEY, STATUS, RETRY_COUNT, NEXT_RUN, RDATE, MDATE) '
+                f'SELECT DISTINCT ?, json_object(\'path\', F.PATH || \'/\' || F.FNAME), ? || \':\' || F.PATH || \'/\' || F.FNAME, ?, 0, ?, ?, ? FROM FILES F '
+                f'WHERE {where_sql} AND NOT EXISTS (SELECT 1 FROM JOBS J WHERE J.IDEMPOTENCY_KEY = ? || \':\' || F.PATH || \'/\' || F.FNAME AND J.STATUS = ?)',
+                (JOB_FILE_REMOVE, JOB_FILE_REMOVE, STATUS_READY, now, now, now) + tuple(params) + (JOB_FILE_REMOVE, STATUS_READY))
+
+    def enqueue(self, job_type, payload, idempotency_key=None):
+        """
+        작업 등록
+        :param job_type:
+        :param payload:
+        :param idempotency_key:
+        :return: 등록된 작업 수(중복인 경우 0)
+        """
+        (query, params) = self.make_enqueue_query(job_type, payload, idempotency_key)
+        result = Sqlite3().cmd(query, params)
+        JobWorker.notify()
+        return result
+
+    def enqueue_file_move(self, src, dst):
+        """
+        파일 이동 작업 등록
+        내용이 같은 여러 임시파일이 같은 dst 로 이동할 수 있으므로 src 로 중복을 확인
+        :param src: file_upload_home 기준 상대경로
+        :param dst: file_upload_home 기준 상대경로
+        :return:
+        """
+        return self.enqueue(JOB_FILE_MOVE, {'src': src, 'dst': dst}, f'{JOB_FILE_MOVE}:{src}')
+
+    def enqueue_file_remove(self, path):
+        """
+        파일 삭제 작업 등록
+        :param path: file_upload_home 기준 상대경로
+        :return:
+        """
+        return self.enqueue(JOB_FILE_REMOVE, {'path': path}, f'{JOB_FILE_REMOVE}:{path}')
+
+    @staticmethod
+    def has_pending_move_src(src):
+        """
+        src 를 이동할 대기중인 작업이 있는지 확인
+        :param src: file_upload_home 기준 상대경로
+        :return:
+        """
+        result = Sqlite3().execute('SELECT COUNT(*) AS CNT FROM JOBS WHERE IDEMPOTENCY_KEY = ? AND STATUS IN (?, ?)',
+                                   (f'{JOB_FILE_MOVE}:{src}', STATUS_READY, STATUS_RUNNING), True)
+        return result['CNT'] > 0
+
+    @staticmethod
+    def has_pending_move(dst):
+        """
+        dst 로 이동할 대기중인 작업이 있는지 확인
+        :param dst: file_upload_home 기준 상대경로
+        :return:
+        """
+        result = Sqlite3().execute('SELECT COUNT(*) AS CNT FROM JOBS WHERE STATUS IN (?, ?) AND JOB_TYPE = ? AND json_extract(PAYLOAD, \'$.dst\') = ?',
+                                   (STATUS_READY, STATUS_RUNNING, JOB_FILE_MOVE, dst), True)
+        return result['CNT'] > 0
+
+    @staticmethod
+    def get_file_ref_count(path):
+        """
+        파일을 참조하는 FILES 데이터 수
+        :param path: file_upload_home 기준 상대경로
+        :return:
+        """
+        (file_path, file_name) = path.rsplit('/', 1)
+        result = Sqlite3().execute('SELECT COUNT(*) AS CNT FROM FILES WHERE FNAME = ? AND PATH = ?', (file_name, file_path), True)
+        return result['CNT']
+
+    @staticmethod
+    def claim_job():
+        """
+        처리할 작업 하나를 RUNNING 으로 변경 후 반환
+        하나의 UPDATE 로 처리하므로 여러 Thread, Process 에서 같은 작업을 가져가지 않음
+        :return: 처리할 작업이 없는 경우 None
+        """
+        now = int(time.time())
+        result = Sqlite3().cmd('UPDATE JOBS SET STATUS = ?, MDATE = ? WHERE SEQ = (SELECT SEQ FROM JOBS WHERE STATUS = ? AND NEXT_RUN <= ? ORDER BY SEQ LIMIT 1) '
+                               'RETURNING SEQ, JOB_TYPE, PAYLOAD, RETRY_COUNT, RDATE',
+                               (STATUS_RUNNING, now, STATUS_READY, now), is_returning=True)
+        if not result:
+            return None
+        job = result[0]
+        job['PAYLOAD'] = json.loads(job['PAYLOAD'])
+        return job
+
+    @staticmethod
+    def complete_job(job_seq):
+        """
+        작업 완료
+        :param job_seq:
+        :return:
+        """
+        return Sqlite3().cmd('UPDATE JOBS SET STATUS = ?, MDATE = ? WHERE SEQ = ?', (STATUS_DONE, int(time.time()), job_seq))
+
+    @staticmethod
+    def fail_job(job_seq, retry_count, error):
+        """
+        작업 실패 : 재시도 횟수가 남은 경우 대기시간 이후 다시 처리
+        :param job_seq:
+        :param retry_count: 지금까지 재시도한 횟수
+        :param error:
+        :return: 재시도 여부
+        """
+        now = int(time.time())
+        retry_count = retry_count + 1
+        is_retry = retry_count <= JobConfig['max_retry']
+        Sqlite3().cmd('UPDATE JOBS SET STATUS = ?, RETRY_COUNT = ?, NEXT_RUN = ?, LAST_ERROR = ?, MDATE = ? WHERE SEQ = ?',
+                      (STATUS_READY if is_retry else STATUS_FAILED, retry_count, now + JobConfig['retry_backoff'] ** retry_count, str(error)[:1000], now, job_seq))
+        return is_retry
+
+    @staticmethod
+    def reset_stale_jobs():
+        """
+        Process 종료 등으로 RUNNING 상태로 남은 작업을 다시 처리하도록 변경
+        :return:
+        """
+        now = int(time.time())
+        return Sqlite3().cmd('UPDATE JOBS SET STATUS = ?, MDATE = ? WHERE STATUS = ? AND MDATE < ?',
+                             (STATUS_READY, now, STATUS_RUNNING, now - JobConfig['stale_running']))
+
+    @staticmethod
+    def delete_done_jobs():
+        """
+        보관기간이 지난 완료 작업 삭제
+        :return:
+        """
+        return Sqlite3().cmd('DELETE FROM JOBS WHERE STATUS = ? AND MDATE < ?', (STATUS_DONE, int(time.time()) - JobConfig['done_retention']))
+
+    @staticmethod
+    def get_queue_stats():
+        """
+        상태별 작업 수 및 가장 오래 대기중인 작업의 대기시간(초)
+        :return:
+        """
+        stats = {STATUS_READY: 0, STATUS_RUNNING: 0, STATUS_DONE: 0, STATUS_FAILED: 0}
+        for row in Sqlite3().execute('SELECT STATUS, COUNT(*) AS CNT FROM JOBS GROUP BY STATUS'):
+            stats[row['STATUS']] = row['CNT']
+        oldest = Sqlite3().execute('SELECT MIN(RDATE) AS RDATE FROM JOBS WHERE STATUS = ?', (STATUS_READY,), True)
+        stats['oldest_ready_age'] = int(time.time()) - oldest['RDATE'] if oldest and oldest['RDATE'] else 0
+        return stats
+
+    @staticmethod
+    def collect_queue_metrics():
+        """
+        /metrics 요청시 대기열 상태 지표 조회(metrics collector)
+        JOBS 테이블은 모든 프로세스가 공유하므로 프로세스별로 기록하지 않고 조회한 값을 그대로 사용
+        :return: [(이름, label, 값), ...]
+        """
+        stats = JobService.get_queue_stats()
+        oldest_ready_age = stats.pop('oldest_ready_age')
+        result = [('jobs_queue_depth', (('status', status),), count) for status, count in stats.items()]
+        result.append(('jobs_oldest_ready_age_seconds', (), oldest_ready_age))
+        return result
+
+
+# /metrics 요청시 대기열 상태 조회
+metrics.add_collector(JobService.collect_queue_metrics)
+
+
+class JobWorker:
+    """
+    JOBS 테이블의 작업을 처리하는 Thread Pool
+    init_app 에서 시작되며, Request context 가 없으므로 env 를 직접 전달받음
+    """
+    # 작업 등록시 대기중인 Worker 를 깨우기 위한 이벤트
+    _wakeup = threading.Event()
+
+    def __init__(self, env, worker_count=None):
+        """
+        Class 생성 및 변수선언
+        :param env:
+        :param worker_count:
+        """
+        self.logger = logging.getLogger(f'{PROJECT_ID}.services.JobWorker')
+        self.base_path = PathConfig[env]['file_upload_home']
+        self.worker_count = JobConfig['worker_count'] if worker_count is None else worker_count
+        self.threads = []
+        self.stop_event = threading.Event()
+
+    @classmethod
+    def notify(cls):
+        """
+        대기중인 Worker 깨우기
+        """
+        cls._wakeup.set()
+
+    def start(self):
+        """
+        Worker Thread 시작
+        """
+        if self.worker_count < 1 or self.threads:
+            return
+        JobService.reset_stale_jobs()
+        for idx in range(self.worker_count):
+            thread = threading.Thread(target=self._run, args=(idx,), name=f'{PROJECT_ID}-job-worker-{idx}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        self.logger.info(f'JobWorker started : {self.worker_count}')
+
+    def stop(self, timeout=None):
+        """
+        Worker Thread 종료
+        :param timeout:
+        """
+        self.stop_event.set()
+        self.notify()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+    @staticmethod
+    def _add_metric(job, result):
+        """
+        처리 결과 지표 기록
+        :param job:
+        :param result: processed, retried, failed
+        """
+        metrics.inc('jobs_total', (('job_type', job['JOB_TYPE']), ('result', result)))
+
+    def run_once(self):
+        """
+        작업 하나를 처리
+        :return: 처리한 작업이 있는지 여부
+        """
+        job = JobService.claim_job()
+        if not job:
+            return False
+        try:
+            JobService.handlers[job['JOB_TYPE']](self.base_path, job['PAYLOAD'])
+            JobService.complete_job(job['SEQ'])
+            self._add_metric(job, 'processed')
+        except Exception as e:
+            if JobService.fail_job(job['SEQ'], job['RETRY_COUNT'], e):
+                self._add_metric(job, 'retried')
+                self.logger.warning(f'Job retry : {job["SEQ"]} {job["JOB_TYPE"]} {job["PAYLOAD"]} : {e}')
+            else:
+                self._add_metric(job, 'failed')
+                self.logger.error(f'Job failed : {job["SEQ"]} {job["JOB_TYPE"]} {job["PAYLOAD"]} : {e}')
+        return True
+
+    def _run(self, idx):
+        """
+        Worker Thread : 처리할 작업이 없으면 poll_interval 동안 대기
+        첫번째 Worker 는 주기적으로 완료된 작업을 정리
+        :param idx: Worker 번호
+        """
+        last_cleanup = 0
+        is_first = idx == 0
+        while not self.stop_event.is_set():
+            try:
+                if self.run_once():
+                    continue
+                if is_first and time.time() - last_cleanup > JobConfig['stale_running']:
+                    last_cleanup = time.time()
+                    JobService.reset_stale_jobs()
+                    JobService.delete_done_jobs()
+            except Exception as e:
+                self.logger.error(f'JobWorker error : {e}')
+            self._wakeup.wait(JobConfig['poll_interval'])
+            self._wakeup.clear()
@@ -1,10 +1,41 @@
 import logging
-
-import bcrypt
+import time
 
 from ..configs import PROJECT_ID
 from ..datasources import Sqlite3
 from ..enums import AuthCode
+from ..utils import hash_password
+
+# PRAGMA user_version 으로 관리하는 스키마 버전
+# 1 : USERS, BOARDS, FILES 의 RDATE, MDATE 를 INTEGER(UTC epoch 초) 컬럼으로 변경
+SCHEMA_VERSION = 1
+# 테이블 컬럼 정의 : 테이블 생성 및 이관(재생성)에 사용
+USERS_COLUMNS = '''(SEQ INTEGER PRIMARY KEY AUTOINCREMENT,
+         USER_ID TEXT UNIQUE,
+         USER_PW TEXT,
+         USER_NAME TEXT,
+         AUTH_CODE TEXT,
+         RDATE INTEGER,
+         MDATE INTEGER)'''
+BOARDS_COLUMNS = '''(SEQ INTEGER PRIMARY KEY AUTOINCREMENT,
+         BOARDS_CODE TEXT,
+         TITLE TEXT,
+         RDATE INTEGER,
+         RUSER TEXT,
+         MDATE INTEGER,
+         MUSER TEXT)'''
+FILES_COLUMNS = '''(SEQ INTEGER PRIMARY KEY AUTOINCREMENT,
+         BOARD_SEQ INTEGER,
+         PATH TEXT,
+         FNAME TEXT,
+         ONAME TEXT,
+         RDATE INTEGER,
+         RUSER TEXT,
+         FILE_HASH TEXT,
+         FILE_SIZE INTEGER)'''
+# 테이블별 인덱스 : 테이블 재생성 후 다시 생성
+FILES_INDEXES = ('CREATE INDEX IF NOT EXISTS IDX_FILES_BOARD_SEQ ON FILES (BOARD_SEQ)',
+                 'CREATE INDEX IF NOT EXISTS IDX_FILES_FNAME ON FILES (FNAME)')
 
 
 class Sqlite3Service:
@@ -20,7 +51,18 @@ class Sqlite3Service:
         # 테이블 생성
         self._make_table_users()
         self._make_table_boards()
+        self._make_table_board_bodies()
         self._make_table_files()
+        self._make_table_jobs()
+        self._make_table_upload_sessions()
+        self._make_table_tmp_files()
+        # 기존 BOARDS 의 CONTENTS, ADD_FIELDS 를 BOARD_BODIES 로 이관
+        self._migrate_board_bodies()
+        # 기존 FILES 에 FILE_HASH, FILE_SIZE 컬럼 추가
+        self._migrate_file_columns()
+        # 스키마 버전별 이관 : 버전이 같으면 실행하지 않음
+        if self._get_schema_version() < SCHEMA_VERSION:
+            self._migrate_epoch_dates()
         # 최초 사용자 등록
         if self._check_table_users() < 1:
             self._insert_first_user()
@@ -40,26 +82,57 @@ class Sqlite3Service:
         최초 사용자 등록
         :return:
         """
-        # 비밀번호 암호화(Bcrypt) : Java Spring 기본값을 사용하여 호환성 유지
-        password_bcrypt = bcrypt.hashpw('1234!'.encode('utf-8'), bcrypt.gensalt(10, b'2a'))
-        result = Sqlite3().cmd('INSERT INTO USERS (USER_ID, USER_PW, USER_NAME, AUTH_CODE, RDATE, MDATE) VALUES (?, ?, ?, ?, DATETIME(\'now\', \'localtime\'), DATETIME(\'now\', \'localtime\'))',
-                               ('admin', password_bcrypt, 'Admin User', AuthCode.ADMIN.name), True)
+        password_bcrypt = hash_password('1234!')
+        now = int(time.time())
+        result = Sqlite3().cmd('INSERT INTO USERS (USER_ID, USER_PW, USER_NAME, AUTH_CODE, RDATE, MDATE) VALUES (?, ?, ?, ?, ?, ?)',
+                               ('admin', password_bcrypt, 'Admin User', AuthCode.ADMIN.name, now, now), True)
         self.logger.info(f'Insert USER : {result}')
         return result
 
+    @staticmethod
+    def _get_schema_version():
+        return Sqlite3().execute(query='PRAGMA user_version', is_one=True)['user_version']
+
+    def _migrate_epoch_dates(self):
+        """
+        이전 버전의 RDATE, MDATE 컬럼(TEXT)을 INTEGER 컬럼으로 변경
+        TEXT 컬럼에는 숫자를 저장해도 문자열로 저장되므로 INTEGER 로 선언한 테이블을 새로 만들어 데이터를 옮김
+        'YYYY-MM-DD HH:MM:SS'(DATETIME('now', 'localtime')) 값은 서버의 localtime 으로 보고 UTC epoch(초)로, 숫자 문자열은 정수로 변환
+        테이블 재생성과 스키마 버전 변경은 하나의 트랜잭션으로 처리하므로 한번만 실행됨
+        :return:
+        """
+        query_list = [('BEGIN', None)]
+        for table, columns, date_columns, indexes in (('USERS', USERS_COLUMNS, ('RDATE', 'MDATE'), ()),
+                                                      ('BOARDS', BOARDS_COLUMNS, ('RDATE', 'MDATE'), ()),
+                                                      ('FILES', FILES_COLUMNS, ('RDATE',), FILES_INDEXES)):
+            table_info = {col['name']: col['type'].upper() for col in Sqlite3().execute(query=f'PRAGMA table_info({table})')}
+            if all(table_info.get(column) == 'INTEGER' for column in date_columns):
+                continue
+            names = [name for name in table_info]
+            values = [f"CASE WHEN {name} LIKE '____-__-__ __:__:__' THEN CAST(STRFTIME('%s', {name}, 'utc') AS INTEGER) "
+                      f"ELSE CAST({name} AS INTEGER) END" if name in date_columns else name for name in names]
+            query_list.extend([
+                (f'DROP TABLE IF EXISTS {table}_NEW', None),
+                (f'CREATE TABLE {table}_NEW {columns}', None),
+                (f'INSERT INTO {table}_NEW ({", ".join(names)}) SELECT {", ".join(values)} FROM {table}', None),
+                # 삭제된 SEQ 가 다시 사용되지 않도록 AUTOINCREMENT 값 유지
+                (f"DELETE FROM sqlite_sequence WHERE name = '{table}_NEW'", None),
+                (f"INSERT INTO sqlite_sequence (name, seq) SELECT '{table}_NEW', seq FROM sqlite_sequence WHERE name = '{table}'", None),
+                (f'DROP TABLE {table}', None),
+                (f'ALTER TABLE {table}_NEW RENAME TO {table}', None)
+            ])
+            query_list.extend((index, None) for index in indexes)
+            self.logger.info(f'Migrate epoch dates : {table}')
+        query_list.append((f'PRAGMA user_version = {SCHEMA_VERSION}', None))
+        Sqlite3().cmd_list(query_list)
+        self.logger.info(f'Migrated schema version : {SCHEMA_VERSION}')
+
     def _make_table_users(self):
         """
         테이블 생성
         :return:
         """
-        Sqlite3().cmd(query='''CREATE TABLE IF NOT EXISTS USERS
-        (SEQ INTEGER PRIMARY KEY AUTOINCREMENT,
-         USER_ID TEXT UNIQUE,
-         USER_PW TEXT,
-         USER_NAME TEXT,
-         AUTH_CODE TEXT,
-         RDATE TEXT,
-         MDATE TEXT)''')
+        Sqlite3().cmd(query=f'CREATE TABLE IF NOT EXISTS USERS {USERS_COLUMNS}')
         self.logger.info('Maked USERS Table')
 
     def _make_table_boards(self):
@@ -69,29 +142,118 @@ class Sqlite3Service:
         테스트된 버전은 3.43.2 버전임 : sqlite3 --version
         :return:
         """
-        Sqlite3().cmd(query='''CREATE TABLE IF NOT EXISTS BOARDS
-        (SEQ INTEGER PRIMARY KEY AUTOINCREMENT,
-         BOARDS_CODE TEXT,
-         TITLE TEXT,
-         CONTENTS TEXT,
-         ADD_FIELDS JSON,
-         RDATE TEXT,
-         RUSER TEXT,
-         MDATE TEXT,
-         MUSER TEXT)''')
+        Sqlite3().cmd(query=f'CREATE TABLE IF NOT EXISTS BOARDS {BOARDS_COLUMNS}')
         self.logger.info('Maked BOARDS Table')
 
+    def _make_table_board_bodies(self):
+        """
+        테이블 생성
+        목록 조회시 읽지 않는 CONTENTS, ADD_FIELDS 를 BOARDS 와 분리하여 BOARDS 의 행 크기를 작게 유지
+        IS_COMPRESSED 가 1 인 경우 CONTENTS 는 zlib 으로 압축된 BLOB 임
+        :return:
+        """
+        Sqlite3().cmd(query='''CREATE TABLE IF NOT EXISTS BOARD_BODIES
+        (BOARD_SEQ INTEGER PRIMARY KEY,
+         CONTENTS BLOB,
+         ADD_FIELDS JSON,
+         IS_COMPRESSED INTEGER DEFAULT 0)''')
+        self.logger.info('Maked BOARD_BODIES Table')
+
+    def _migrate_board_bodies(self):
+        """
+        이전 구조의 BOARDS 테이블(CONTENTS, ADD_FIELDS 포함)인 경우 BOARD_BODIES 로 데이터 이관 후 컬럼 삭제
+        DROP COLUMN 은 3.35.0 이상이 필요함
+        :return:
+        """
+        columns = [col['name'] for col in Sqlite3().execute(query='PRAGMA table_info(BOARDS)')]
+        if 'CONTENTS' not in columns:
+            return
+        result = Sqlite3().cmd_list([
+            ('INSERT OR IGNORE INTO BOARD_BODIES (BOARD_SEQ, CONTENTS, ADD_FIELDS, IS_COMPRESSED) SELECT SEQ, CONTENTS, ADD_FIELDS, 0 FROM BOARDS', None),
+            ('ALTER TABLE BOARDS DROP COLUMN CONTENTS', None),
+            ('ALTER TABLE BOARDS DROP COLUMN ADD_FIELDS', None)
+        ])
+        self.logger.info(f'Migrated BOARD_BODIES : {result[0]}')
+
+    def _migrate_file_columns(self):
+        """
+        이전 구조의 FILES 테이블인 경우 FILE_HASH, FILE_SIZE 컬럼 추가
+        기존 데이터는 NULL 로 남으며 중복제거 대상에서 제외됨
+        :return:
+        """
+        columns = [col['name'] for col in Sqlite3().execute(query='PRAGMA table_info(FILES)')]
+        if 'FILE_HASH' in columns:
+            return
+        Sqlite3().cmd_list([
+            ('ALTER TABLE FILES ADD COLUMN FILE_HASH TEXT', None),
+            ('ALTER TABLE FILES ADD COLUMN FILE_SIZE INTEGER', None)
+        ])
+        self.logger.info('Migrated FILES columns : FILE_HASH, FILE_SIZE')
+
     def _make_table_files(self):
         """
         테이블 생성
+        FNAME 이 FILE_HASH(SHA-256) 인 파일은 내용이 같은 첨부파일끼리 공유하며, 같은 PATH, FNAME 의 행 수가 참조 수임
         :return:
         """
-        Sqlite3().cmd(query='''CREATE TABLE IF NOT EXISTS FILES
+        Sqlite3().cmd(query=f'CREATE TABLE IF NOT EXISTS FILES {FILES_COLUMNS}')
+        # 게시물별 파일목록 조회용, 파일 삭제시 같은 파일을 참조하는 데이터 수 확인용
+        for index in FILES_INDEXES:
+            Sqlite3().cmd(query=index)
+        self.logger.info('Maked FILES Table')
+
+    def _make_table_jobs(self):
+        """
+        테이블 생성
+        백그라운드 작업 목록 : JobService 참고
+        :return:
+        """
+        Sqlite3().cmd(query='''CREATE TABLE IF NOT EXISTS JOBS
         (SEQ INTEGER PRIMARY KEY AUTOINCREMENT,
-         BOARD_SEQ INTEGER,
+         JOB_TYPE TEXT,
+         PAYLOAD JSON,
+         IDEMPOTENCY_KEY TEXT,
+         STATUS TEXT,
+         RETRY_COUNT INTEGER DEFAULT 0,
+         NEXT_RUN INTEGER,
+         LAST_ERROR TEXT,
+         RDATE INTEGER,
+         MDATE INTEGER)''')
+        # 처리할 작업 조회 및 중복 확인용
+        Sqlite3().cmd(query='CREATE INDEX IF NOT EXISTS IDX_JOBS_STATUS ON JOBS (STATUS, NEXT_RUN)')
+        Sqlite3().cmd(query='CREATE INDEX IF NOT EXISTS IDX_JOBS_IDEMPOTENCY_KEY ON JOBS (IDEMPOTENCY_KEY)')
+        self.logger.info('Maked JOBS Table')
+
+    def _make_table_upload_sessions(self):
+        """
+        테이블 생성
+        이어올리기 업로드 목록 : UploadService 참고
+        업로드된 크기(offset)는 저장하지 않고 임시파일의 크기를 사용함
+        :return:
+        """
+        Sqlite3().cmd(query='''CREATE TABLE IF NOT EXISTS UPLOAD_SESSIONS
+        (UPLOAD_ID TEXT PRIMARY KEY,
          PATH TEXT,
          FNAME TEXT,
          ONAME TEXT,
-         RDATE TEXT,
+         FILE_SIZE INTEGER,
+         RDATE INTEGER,
          RUSER TEXT)''')
-        self.logger.info('Maked FILES Table')
+        self.logger.info('Maked UPLOAD_SESSIONS Table')
+
+    def _make_table_tmp_files(self):
+        """
+        테이블 생성
+        업로드된 임시파일 목록 : 업로드 중 계산한 SHA-256, 크기를 보관하여 게시물 파일저장시 다시 계산하지 않음(UploadService 참고)
+        임시파일이 이동되면 삭제되며, 게시물에 저장되지 않은 경우는 TmpFileReaper 가 ttl 이후 삭제함
+        :return:
+        """
+        Sqlite3().cmd(query='''CREATE TABLE IF NOT EXISTS TMP_FILES
+        (PATH TEXT,
+         FNAME TEXT,
+         FILE_HASH TEXT,
+         FILE_SIZE INTEGER,
+         RDATE INTEGER,
+         RUSER TEXT,
+         PRIMARY KEY (PATH, FNAME))''')
+        self.logger.info('Maked TMP_FILES Table')
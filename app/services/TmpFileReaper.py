@@ -0,0 +1,228 @@
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows : 프로세스간 lock 없이 동작
+    fcntl = None
+
+from ..configs import PROJECT_ID, PathConfig, ReaperConfig
+from ..datasources import Sqlite3
+from ..utils import metrics
+from .JobService import JobService
+from .UploadService import PART_EXT
+
+
+class TmpFileReaper:
+    """
+    게시물에 저장되지 않고 file_tmp_path 에 남은 임시파일 정리
+    os.scandir 로 batch_size 씩 나누어 확인하므로 파일이 많아도 한번에 목록을 읽지 않음
+    이동 대기중인 파일은 삭제하지 않으며, 이어올리기 중인 파일(.part)은 PATCH 마다 수정시간이 변경되므로 ttl 이후에 삭제됨
+    init_app 에서 시작되며, Request context 가 없으므로 env 를 직접 전달받음
+    여러 worker 프로세스에서 실행되는 경우 file_upload_home 의 lock 파일을 얻은 프로세스만 한번의 전체 확인을 진행함
+    처리 결과는 /metrics(tmp_reaper_*) 로 제공하고, 전체 확인이 끝날 때마다 해당 확인의 결과를 로그로 기록함
+    """
+
+    def __init__(self, env, dry_run=None, ttl=None):
+        """
+        Class 생성 및 변수선언
+        :param env:
+        :param dry_run: None 인 경우 ReaperConfig 사용
+        :param ttl: None 인 경우 ReaperConfig 사용
+        """
+        self.logger = logging.getLogger(f'{PROJECT_ID}.services.TmpFileReaper')
+        self.tmp_path = PathConfig[env]['file_tmp_path']
+        self.tmp_full_path = os.path.join(PathConfig[env]['file_upload_home'], self.tmp_path)
+        self.lock_path = os.path.join(PathConfig[env]['file_upload_home'], '.tmp-reaper.lock')
+        self._lock_file = None
+        self.dry_run = ReaperConfig['dry_run'] if dry_run is None else dry_run
+        self.ttl = ReaperConfig['ttl'] if ttl is None else ttl
+        self.thread = None
+        self.stop_event = threading.Event()
+        # 진행중인 scan
+        self._scanner = None
+        self._expire_before = 0
+        self._pass_start = 0
+        self._pass_metrics = {}
+        self._last_delete = 0
+        # 처리 결과 통계
+        self.metrics_lock = threading.Lock()
+        self.metrics = {'passes': 0, 'scanned': 0, 'expired': 0, 'deleted': 0, 'deleted_bytes': 0, 'skipped': 0, 'errors': 0,
+                        'last_pass_seconds': 0, 'last_pass_end': 0}
+
+    def start(self):
+        """
+        정리 Thread 시작
+        """
+        if ReaperConfig['interval'] <= 0 or self.thread:
+            return
+        self.thread = threading.Thread(target=self._run, name=f'{PROJECT_ID}-tmp-reaper', daemon=True)
+        self.thread.start()
+        self.logger.info(f'TmpFileReaper started : ttl={self.ttl}, dry_run={self.dry_run}')
+
+    def stop(self, timeout=None):
+        """
+        정리 Thread 종료
+        :param timeout:
+        """
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def _add_metric(self, name, value=1):
+        with self.metrics_lock:
+            self.metrics[name] += value
+        if name == 'deleted_bytes':
+            metrics.inc('tmp_reaper_deleted_bytes_total', value=value)
+        else:
+            metrics.inc('tmp_reaper_files_total', (('result', name),), value)
+
+    def get_metrics(self):
+        """
+        처리 결과 통계
+        :return:
+        """
+        with self.metrics_lock:
+            metrics = dict(self.metrics)
+        metrics['dry_run'] = self.dry_run
+        return metrics
+
+    def run_step(self):
+        """
+        임시파일 batch_size 개 확인
+        :return: 한번의 전체 확인이 끝났는지 여부
+        """
+        if self._scanner is None:
+            if not os.path.isdir(self.tmp_full_path) or not self._acquire_lock():
+                return True
+            self._scanner = os.scandir(self.tmp_full_path)
+            self._expire_before = time.time() - self.ttl
+            self._pass_start = time.monotonic()
+            with self.metrics_lock:
+                self._pass_metrics = dict(self.metrics)
+        for _ in range(ReaperConfig['batch_size']):
+            try:
+                entry = next(self._scanner)
+            except StopIteration:
+                self._end_pass()
+                return True
+            self._check_entry(entry)
+        return False
+
+    def run_once(self):
+        """
+        전체 임시파일을 한번 확인
+        :return: 처리 결과 통계
+        """
+        while not self.run_step():
+            pass
+        return self.get_metrics()
+
+    def _acquire_lock(self):
+        """
+        프로세스간 lock : 다른 프로세스가 확인중이면 이번 확인은 건너뜀
+        :return: lock 을 얻었는지 여부
+        """
+        if fcntl is None:
+            return True
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _release_lock(self):
+        if self._lock_file:
+            # close 시 lock 도 해제됨
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _end_pass(self):
+        self._scanner.close()
+        self._scanner = None
+        try:
+            if not self.dry_run:
+                self._delete_stale_sessions()
+        finally:
+            self._release_lock()
+        pass_seconds = time.monotonic() - self._pass_start
+        with self.metrics_lock:
+            self.metrics['passes'] += 1
+            self.metrics['last_pass_seconds'] = round(pass_seconds, 3)
+            self.metrics['last_pass_end'] = int(time.time())
+            pass_result = {name: self.metrics[name] - self._pass_metrics.get(name, 0)
+                           for name in ('scanned', 'expired', 'deleted', 'deleted_bytes', 'skipped', 'errors')}
+        metrics.inc('tmp_reaper_passes_total')
+        metrics.inc('tmp_reaper_pass_seconds_total', value=pass_seconds)
+        self.logger.info(f'TmpFileReaper pass finished : {pass_result}, seconds={pass_seconds:.3f}, dry_run={self.dry_run}')
+
+    def _check_entry(self, entry):
+        """
+        수정된 후 ttl 이 지난 파일 삭제
+        :param entry: os.DirEntry
+        """
+        self._add_metric('scanned')
+        try:
+            if not entry.is_file(follow_symlinks=False):
+                return
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime >= self._expire_before:
+                return
+            self._add_metric('expired')
+            if JobService.has_pending_move_src(f'{self.tmp_path}/{entry.name}'):
+                self._add_metric('skipped')
+                return
+            if self.dry_run:
+                self.logger.info(f'[dry-run] expired tmp file : {entry.name} {stat.st_size}')
+                return
+            self._throttle()
+            os.remove(entry.path)
+            if entry.name.endswith(PART_EXT):
+                Sqlite3().cmd('DELETE FROM UPLOAD_SESSIONS WHERE PATH = ? AND FNAME = ?', (self.tmp_path, entry.name[:-len(PART_EXT)]))
+            self._add_metric('deleted')
+            self._add_metric('deleted_bytes', stat.st_size)
+        except FileNotFoundError:
+            # 확인 중에 이동, 삭제된 경우
+            pass
+        except Exception as e:
+            self._add_metric('errors')
+            self.logger.error(f'TmpFileReaper error : {entry.name} : {e}')
+
+    def _delete_stale_sessions(self):
+        """
+        임시파일이 없는 이어올리기 세션 삭제
+        ttl 이 지난 임시파일 정보(TMP_FILES) 삭제 : 이동 대기중인 파일은 정보가 없어도 이동됨
+        """
+        Sqlite3().cmd('DELETE FROM TMP_FILES WHERE PATH = ? AND RDATE < ?', (self.tmp_path, int(self._expire_before)))
+        sessions = Sqlite3().execute('SELECT UPLOAD_ID, FNAME FROM UPLOAD_SESSIONS WHERE PATH = ? AND RDATE < ?', (self.tmp_path, int(self._expire_before)))
+        for session in sessions:
+            if not os.path.exists(os.path.join(self.tmp_full_path, session['FNAME'] + PART_EXT)):
+                Sqlite3().cmd('DELETE FROM UPLOAD_SESSIONS WHERE UPLOAD_ID = ?', (session['UPLOAD_ID'],))
+
+    def _throttle(self):
+        """
+        초당 삭제 수 제한
+        """
+        wait = self._last_delete + 1.0 / ReaperConfig['max_deletes_per_sec'] - time.monotonic()
+        if wait > 0:
+            self.stop_event.wait(wait)
+        self._last_delete = time.monotonic()
+
+    def _run(self):
+        """
+        정리 Thread : batch 사이에는 step_interval, 전체 확인 후에는 interval 동안 대기
+        """
+        while not self.stop_event.is_set():
+            try:
+                is_done = self.run_step()
+            except Exception as e:
+                self.logger.error(f'TmpFileReaper error : {e}')
+                is_done = True
+            self.stop_event.wait(ReaperConfig['interval'] if is_done else ReaperConfig['step_interval'])
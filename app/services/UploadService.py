@@ -0,0 +1,178 @@
+import logging
+import os
+import time
+import uuid
+
+from flask import g
+from flask_babel import gettext
+from werkzeug.exceptions import BadRequest, Conflict, RequestEntityTooLarge
+
+from ..configs import PROJECT_ID, PathConfig, UploadConfig
+from ..datasources import Sqlite3
+from ..utils import CHUNK_SIZE, make_tmp_file_name, file_sha256
+
+# 업로드중인 임시파일의 확장자 : 완료되면 제거됨
+PART_EXT = '.part'
+
+
+class UploadService:
+    """
+    이어올리기(resumable) 업로드 처리
+    세션 생성 -> 위치(offset)를 지정하여 나누어 업로드 -> 완료 순서로 처리하며
+    완료 결과는 /board/fileupload 와 같은 file_tmp_path, file_tmp_name 이므로 그대로 게시물 파일저장에 사용할 수 있음
+    업로드된 크기는 임시파일의 크기이므로 연결이 끊겨도 저장된 위치부터 다시 업로드 할 수 있음
+    """
+
+    def __init__(self):
+        """
+        Class 생성 및 변수선언
+        """
+        self.logger = logging.getLogger(f'{PROJECT_ID}.services.UploadService')
+
+    @staticmethod
+    def _part_full_path(session):
+        """
+        업로드중인 임시파일 경로
+        :param session:
+        :return:
+        """
+        return os.path.join(PathConfig[g.env_val]['file_upload_home'], session['PATH'], session['FNAME'] + PART_EXT)
+
+    def create_session(self, file_org_name, file_size, user_id):
+        """
+        업로드 세션 생성 및 빈 임시파일 생성
+        :param file_org_name:
+        :param file_size: 업로드할 파일 전체 크기(byte)
+        :param user_id:
+        :return:
+        """
+        if file_size > UploadConfig['max_file_size']:
+            raise RequestEntityTooLarge(gettext(u'업로드 파일의 크기가 제한을 초과했습니다.'))
+        file_tmp_path = PathConfig[g.env_val]['file_tmp_path']
+        os.makedirs(os.path.join(PathConfig[g.env_val]['file_upload_home'], file_tmp_path), exist_ok=True)
+        result = Sqlite3().cmd('INSERT INTO UPLOAD_SESSIONS (UPLOAD_ID, PATH, FNAME, ONAME, FILE_SIZE, RDATE, RUSER) VALUES (?, ?, ?, ?, ?, ?, ?) '
+                               'RETURNING UPLOAD_ID, PATH, FNAME, ONAME, FILE_SIZE, RDATE, RUSER',
+                               (uuid.uuid4().hex, file_tmp_path, make_tmp_file_name(file_org_name), file_org_name, file_size, int(time.time()), user_id),
+                               is_returning=True)
+        session = result[0]
+        open(self._part_full_path(session), 'wb').close()
+        session['OFFSET'] = 0
+        self.logger.info(f'Upload session created : {session["UPLOAD_ID"]} {file_size}')
+        return session
+
+    def get_session(self, upload_id, user_id):
+        """
+        업로드 세션 조회 : 세션을 생성한 사용자만 조회 가능
+        :param upload_id:
+        :param user_id:
+        :return: 세션이 없거나 임시파일이 삭제된 경우 None
+        """
+        session = Sqlite3().execute('SELECT UPLOAD_ID, PATH, FNAME, ONAME, FILE_SIZE, RDATE, RUSER FROM UPLOAD_SESSIONS WHERE UPLOAD_ID = ? AND RUSER = ?',
+                                    (upload_id, user_id), True)
+        if not session:
+            return None
+        try:
+            session['OFFSET'] = os.path.getsize(self._part_full_path(session))
+        except FileNotFoundError:
+            return None
+        return session
+
+    def write_chunk(self, session, offset, stream, length):
+        """
+        offset 위치부터 length 만큼 stream 을 CHUNK_SIZE 씩 읽어 임시파일에 저장
+        연결이 끊긴 경우에도 저장된 부분은 남으므로 다음 요청은 변경된 offset 부터 보내면 됨
+        :param session:
+        :param offset: 클라이언트가 알고있는 업로드된 크기, 서버의 크기와 다르면 409
+        :param stream:
+        :param length: 요청 body 크기
+        :return: offset 이 변경된 세션
+        """
+        if offset != session['OFFSET']:
+            raise Conflict(gettext(u'업로드 위치가 일치하지 않습니다.'))
+        if offset + length > session['FILE_SIZE']:
+            raise BadRequest(gettext(u'업로드 파일의 크기를 초과했습니다.'))
+        remain = length
+        with open(self._part_full_path(session), 'r+b') as f:
+            f.seek(offset)
+            try:
+                while remain > 0:
+                    chunk = stream.read(min(CHUNK_SIZE, remain))
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    remain -= len(chunk)
+            finally:
+                session['OFFSET'] = offset + length - remain
+        return session
+
+    @staticmethod
+    def make_tmp_file_query(file_info, user_id):
+        """
+        업로드된 임시파일 정보 등록 query 생성
+        게시물 파일저장시 화면에서 전달된 값 대신 등록된 SHA-256, 크기를 사용함
+        :param file_info: file_tmp_path, file_tmp_name, file_hash, file_size
+        :param user_id:
+        :return: (query, params)
+        """
+        return ('INSERT OR REPLACE INTO TMP_FILES (PATH, FNAME, FILE_HASH, FILE_SIZE, RDATE, RUSER) VALUES (?, ?, ?, ?, ?, ?)',
+                (file_info['file_tmp_path'], file_info['file_tmp_name'], file_info['file_hash'], file_info['file_size'], int(time.time()), user_id))
+
+    def save_tmp_files(self, file_info_list, user_id):
+        """
+        /board/fileupload 로 업로드된 임시파일 정보 등록
+        :param file_info_list:
+        :param user_id:
+        :return:
+        """
+        if not file_info_list:
+            return []
+        return Sqlite3().cmd_list([self.make_tmp_file_query(file_info, user_id) for file_info in file_info_list])
+
+    @staticmethod
+    def get_tmp_file(file_tmp_path, file_tmp_name):
+        """
+        업로드된 임시파일 정보 조회
+        등록된 정보가 없거나, 임시파일이 없거나, 크기가 다른 경우 None
+        :param file_tmp_path:
+        :param file_tmp_name:
+        :return: FILE_HASH, FILE_SIZE
+        """
+        tmp_file = Sqlite3().execute('SELECT FILE_HASH, FILE_SIZE FROM TMP_FILES WHERE PATH = ? AND FNAME = ?', (file_tmp_path, file_tmp_name), True)
+        if not tmp_file:
+            return None
+        try:
+            file_size = os.path.getsize(os.path.join(PathConfig[g.env_val]['file_upload_home'], file_tmp_path, file_tmp_name))
+        except OSError:
+            return None
+        return tmp_file if file_size == tmp_file['FILE_SIZE'] else None
+
+    def finalize_session(self, session):
+        """
+        업로드 완료 : 임시파일명을 /board/fileupload 와 같은 형태로 변경 후 세션 삭제
+        :param session:
+        :return: 업로드 파일정보
+        """
+        if session['OFFSET'] != session['FILE_SIZE']:
+            raise Conflict(gettext(u'업로드가 완료되지 않았습니다.'))
+        part_full_path = self._part_full_path(session)
+        (file_hash, file_size) = file_sha256(part_full_path)
+        os.replace(part_full_path, part_full_path[:-len(PART_EXT)])
+        file_info = {'file_org_name': session['ONAME'], 'file_tmp_path': session['PATH'], 'file_tmp_name': session['FNAME'], 'file_size': file_size, 'file_hash': file_hash}
+        # 세션 삭제 및 임시파일 정보 등록을 하나의 트랜잭션으로 처리
+        Sqlite3().cmd_list([
+            ('DELETE FROM UPLOAD_SESSIONS WHERE UPLOAD_ID = ?', (session['UPLOAD_ID'],)),
+            self.make_tmp_file_query(file_info, session['RUSER'])
+        ])
+        self.logger.info(f'Upload session finished : {session["UPLOAD_ID"]}')
+        return file_info
+
+    def delete_session(self, session):
+        """
+        업로드 취소 : 임시파일 및 세션 삭제
+        :param session:
+        :return:
+        """
+        part_full_path = self._part_full_path(session)
+        if os.path.exists(part_full_path):
+            os.remove(part_full_path)
+        return Sqlite3().cmd('DELETE FROM UPLOAD_SESSIONS WHERE UPLOAD_ID = ?', (session['UPLOAD_ID'],))
@@ -1,12 +1,16 @@
 import logging
+import time
 
-import bcrypt
 from flask_babel import gettext
 from werkzeug.exceptions import BadRequest, NotFound, Forbidden
 
 from ..configs import PROJECT_ID
 from ..datasources import Sqlite3
 from ..enums import AuthCode
+from ..utils import hash_password
+
+# INSERT, UPDATE 후 RETURNING 으로 반환할 USERS 컬럼
+_RETURNING_COLUMNS = 'SEQ, USER_ID, USER_PW, USER_NAME, AUTH_CODE, RDATE, MDATE'
 
 
 class UsersService:
@@ -27,7 +31,7 @@ class UsersService:
         :param user_id:
         :return:
         """
-        user_info = Sqlite3().execute('SELECT SEQ, USER_ID, USER_PW, USER_NAME, AUTH_CODE, STRFTIME("%Y-%m-%dT%H:%M:%S", RDATE) AS RDATE, STRFTIME("%Y-%m-%dT%H:%M:%S", MDATE) AS MDATE FROM USERS WHERE USER_ID = ?', (user_id,), True)
+        user_info = Sqlite3().execute('SELECT SEQ, USER_ID, USER_PW, USER_NAME, AUTH_CODE, RDATE, MDATE FROM USERS WHERE USER_ID = ?', (user_id,), True)
         return user_info
 
     @staticmethod
@@ -37,7 +41,7 @@ class UsersService:
         :param user_seq:
         :return:
         """
-        user_info = Sqlite3().execute('SELECT SEQ, USER_ID, USER_PW, USER_NAME, AUTH_CODE, STRFTIME("%Y-%m-%dT%H:%M:%S", RDATE) AS RDATE, STRFTIME("%Y-%m-%dT%H:%M:%S", MDATE) AS MDATE FROM USERS WHERE SEQ = ?', (user_seq,), True)
+        user_info = Sqlite3().execute('SELECT SEQ, USER_ID, USER_PW, USER_NAME, AUTH_CODE, RDATE, MDATE FROM USERS WHERE SEQ = ?', (user_seq,), True)
         return user_info
 
     def _get_user_list(self, start_row, row_per_page, auth_code=None, user_seqs=None):
@@ -54,7 +58,7 @@ class UsersService:
         :return:
         :rtype:
         """
-        select_sql = 'SELECT SEQ, USER_ID, USER_PW, USER_NAME, AUTH_CODE, STRFTIME("%Y-%m-%dT%H:%M:%S", RDATE) AS RDATE, STRFTIME("%Y-%m-%dT%H:%M:%S", MDATE) AS MDATE FROM USERS '
+        select_sql = 'SELECT SEQ, USER_ID, USER_PW, USER_NAME, AUTH_CODE, RDATE, MDATE FROM USERS '
         where_sql = ' WHERE 1 = 1'
         orderby_sql = ' ORDER BY RDATE DESC'
         limit_sql = ' LIMIT ?, ?'
@@ -74,9 +78,6 @@ class UsersService:
         sql = select_sql + where_sql
         self.logger.debug(f'_get_user_list COUNT sql : {sql}')
         totalcount = Sqlite3().execute(query=sql, is_one=True)['CNT']
-        for user in user_list:
-            user['RDATE'] = user['RDATE'] + '.000000+09:00'
-            user['MDATE'] = user['MDATE'] + '.000000+09:00'
         return user_list, totalcount
 
     def get_user_list(self, start_row, row_per_page):
@@ -127,13 +128,14 @@ class UsersService:
         :type user_name:
         :param auth_code:
         :type auth_code:
-        :return:
+        :return: 등록된 User 정보
         :rtype:
         """
-        password_bcrypt = bcrypt.hashpw(user_pw.encode('utf-8'), bcrypt.gensalt(10, b'2a'))
-        result = Sqlite3().cmd('INSERT INTO USERS (USER_ID, USER_PW, USER_NAME, AUTH_CODE, RDATE, MDATE) VALUES (?, ?, ?, ?, DATETIME(\'now\', \'localtime\'), DATETIME(\'now\', \'localtime\'))',
-                               (user_id, password_bcrypt, user_name, auth_code), True)
-        return result
+        password_bcrypt = hash_password(user_pw)
+        now = int(time.time())
+        result = Sqlite3().cmd(f'INSERT INTO USERS (USER_ID, USER_PW, USER_NAME, AUTH_CODE, RDATE, MDATE) VALUES (?, ?, ?, ?, ?, ?) RETURNING {_RETURNING_COLUMNS}',
+                               (user_id, password_bcrypt, user_name, auth_code, now, now), is_returning=True)
+        return result[0] if result else None
 
     @staticmethod
     def _update_mdate(user_id):
@@ -141,7 +143,7 @@ class UsersService:
         수정일 변경
         :return:
         """
-        result = Sqlite3().cmd('UPDATE USERS SET MDATE = DATETIME(\'now\', \'localtime\') WHERE USER_ID = ?', (user_id,))
+        result = Sqlite3().cmd('UPDATE USERS SET MDATE = ? WHERE USER_ID = ?', (int(time.time()), user_id))
         return result
 
     def update_login_mdate(self, user_id):
@@ -153,23 +155,26 @@ class UsersService:
             self._update_mdate(user_id)
 
     @staticmethod
-    def _update_user(user_seq, user_id, user_pw, user_name):
+    def _update_user(user_seq, user_id, user_pw, user_name, auth_code):
         """
         User 정보 수정
+        권한정보는 변경 할 수 없으므로 AUTH_CODE 가 일치하는 경우에만 수정
         :param user_seq:
         :param user_id:
         :param user_pw:
         :param user_name:
-        :return:
+        :param auth_code:
+        :return: 수정된 User 정보, 수정된 행이 없는 경우 None
         """
-        password_bcrypt = bcrypt.hashpw(user_pw.encode('utf-8'), bcrypt.gensalt(10, b'2a'))
-        result = Sqlite3().cmd('UPDATE USERS SET USER_ID = ?, USER_PW = ?, USER_NAME = ?, MDATE = DATETIME(\'now\', \'localtime\') WHERE SEQ = ?',
-                               (user_id, password_bcrypt, user_name, user_seq))
-        return result
+        password_bcrypt = hash_password(user_pw)
+        result = Sqlite3().cmd(f'UPDATE USERS SET USER_ID = ?, USER_PW = ?, USER_NAME = ?, MDATE = ? WHERE SEQ = ? AND AUTH_CODE = ? RETURNING {_RETURNING_COLUMNS}',
+                               (user_id, password_bcrypt, user_name, int(time.time()), user_seq, auth_code), is_returning=True)
+        return result[0] if result else None
 
     def save_user(self, user_id, user_pw, user_name, user_seq, auth_code):
         """
         User 정보 저장
+        별도 조회없이 저장된 행을 반환
         :param user_id:
         :type user_id:
         :param user_pw:
@@ -180,25 +185,66 @@ class UsersService:
         :type user_seq:
         :param auth_code:
         :type auth_code:
-        :return:
+        :return: 저장된 User 정보
         :rtype:
         """
         if user_seq:
-            user_info = self.get_user_by_seq(user_seq)
-            if not user_info:
-                raise NotFound(gettext(u'사용자가 존재하지 않습니다.'))
-        else:
-            user_info = None
-        if user_info:
-            if user_info['AUTH_CODE'] != auth_code:
+            result = self._update_user(user_seq, user_id, user_pw, user_name, auth_code)
+            if not result:
+                # 수정된 행이 없는 경우에만 원인 확인
+                if not self.get_user_by_seq(user_seq):
+                    raise NotFound(gettext(u'사용자가 존재하지 않습니다.'))
                 raise Forbidden(gettext(u'사용자의 권한정보는 변경 할 수 없습니다.'))
-            result = self._update_user(user_seq, user_id, user_pw, user_name)
         else:
             result = self._insert_user(user_id, user_pw, user_name, auth_code)
-        if result < 1:
-            raise SystemError('Save User Error')
+            if not result:
+                raise SystemError('Save User Error')
         return result
 
+    def patch_user(self, user_seq, user_id=None, user_pw=None, user_name=None, auth_code=None):
+        """
+        User 정보 부분수정
+        None 이 아닌 항목의 컬럼만 수정하며, 비밀번호가 없는 경우 BCrypt 암호화를 하지 않음
+        :param user_seq:
+        :type user_seq:
+        :param user_id:
+        :type user_id:
+        :param user_pw:
+        :type user_pw:
+        :param user_name:
+        :type user_name:
+        :param auth_code: 권한정보 확인용(변경불가)
+        :type auth_code:
+        :return: 수정된 User 정보
+        :rtype:
+        """
+        if user_id is None and user_pw is None and user_name is None:
+            raise BadRequest(gettext(u'수정할 항목이 없습니다.'))
+        sets = []
+        params = []
+        if user_id is not None:
+            sets.append('USER_ID = ?')
+            params.append(user_id)
+        if user_pw is not None:
+            sets.append('USER_PW = ?')
+            params.append(hash_password(user_pw))
+        if user_name is not None:
+            sets.append('USER_NAME = ?')
+            params.append(user_name)
+        sets.append('MDATE = ?')
+        params.extend([int(time.time()), user_seq])
+        where_sql = 'WHERE SEQ = ?'
+        if auth_code is not None:
+            where_sql = where_sql + ' AND AUTH_CODE = ?'
+            params.append(auth_code)
+        result = Sqlite3().cmd(f'UPDATE USERS SET {", ".join(sets)} {where_sql} RETURNING {_RETURNING_COLUMNS}', tuple(params), is_returning=True)
+        if not result:
+            # 수정된 행이 없는 경우에만 원인 확인
+            if auth_code is None or not self.get_user_by_seq(user_seq):
+                raise NotFound(gettext(u'사용자가 존재하지 않습니다.'))
+            raise Forbidden(gettext(u'사용자의 권한정보는 변경 할 수 없습니다.'))
+        return result[0]
+
     @staticmethod
     def _delete_users(user_seq_list):
         """
@@ -1,3 +1,6 @@
 from .BoardService import BoardService
+from .JobService import JobService, JobWorker
 from .Sqlite3Serivce import Sqlite3Service
+from .TmpFileReaper import TmpFileReaper
+from .UploadService import UploadService
 from .UsersService import UsersService
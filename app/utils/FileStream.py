@@ -0,0 +1,202 @@
+import hashlib
+import io
+import os
+import uuid
+import zipfile
+from urllib.parse import quote
+
+from flask import Request, current_app, request
+from flask_babel import gettext
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import send_file
+
+# 파일을 읽을 때 사용하는 크기(byte) : werkzeug multipart 파서의 기본 buffer_size 와 같음
+CHUNK_SIZE = 64 * 1024
+
+
+def make_tmp_file_name(filename):
+    """
+    업로드 파일의 임시파일명 생성 : uuid + 원본 파일의 확장자
+    :param filename:
+    :return:
+    """
+    file_ext = filename.split('.')[(len(filename.split('.')) - 1)] if filename and len(filename.split('.')) > 1 else ''
+    return str(uuid.uuid4().hex) + '.' + file_ext
+
+
+def shard_path(file_path, file_name, depth):
+    """
+    파일명 앞에서부터 2자씩 depth 단계의 하위 디렉토리를 붙인 저장경로('/' 구분)
+    예) shard_path('upload', 'abcdef.txt', 2) -> 'upload/ab/cd'
+    :param file_path:
+    :param file_name: SHA-256, uuid 등 hex 문자열로 시작하는 파일명
+    :param depth:
+    :return:
+    """
+    return '/'.join([file_path] + [file_name[idx * 2:idx * 2 + 2].lower() for idx in range(depth)])
+
+
+def file_sha256(path):
+    """
+    파일의 SHA-256 계산
+    :param path:
+    :return: (SHA-256, 파일 크기)
+    """
+    file_hash = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            file_hash.update(chunk)
+            size += len(chunk)
+    return file_hash.hexdigest(), size
+
+
+def send_stored_file(full_path, download_name, etag=True, mode='send_file', accel_uri=None):
+    """
+    저장된 첨부파일 전송 : 모드는 DownloadConfig 참고
+    send_file 모드는 Range(206, 416), If-None-Match, If-Modified-Since(304) 를 처리함
+    x-sendfile, x-accel 모드는 앞단 서버에서 파일 전송 및 Range, 조건부 요청을 처리함
+    :param full_path: 파일 전체 경로
+    :param download_name: Content-Disposition 에 사용할 파일명
+    :param etag: ETag 값, True 인 경우 파일의 수정시간, 크기로 생성
+    :param mode:
+    :param accel_uri: x-accel 모드에서 nginx 에 전달할 경로
+    :return:
+    """
+    is_proxy = mode in ('x-sendfile', 'x-accel')
+    response = send_file(full_path, request.environ, as_attachment=True, download_name=download_name, conditional=not is_proxy,
+                         etag=etag if not is_proxy else False, use_x_sendfile=is_proxy, response_class=current_app.response_class)
+    if mode == 'x-accel':
+        del response.headers['X-Sendfile']
+        response.headers['X-Accel-Redirect'] = quote(accel_uri)
+    return response
+
+
+class _ZipStreamBuffer(io.RawIOBase):
+    """
+    ZipFile 이 쓴 데이터를 모아두는 버퍼
+    seek, tell 을 지원하지 않으므로 ZipFile 은 크기, CRC 를 data descriptor 로 기록함
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self):
+        """
+        모아둔 데이터를 반환하고 비움
+        :return:
+        """
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip_stream(entries, stored_extensions=()):
+    """
+    파일 목록을 ZIP 으로 만들면서 CHUNK_SIZE 단위로 반환
+    전체 ZIP 을 메모리나 디스크에 만들지 않음
+    :param entries: (파일 전체 경로, ZIP 내 파일명, 수정일시 (년, 월, 일, 시, 분, 초)) 목록
+    :param stored_extensions: 압축하지 않을 확장자 목록
+    :return:
+    """
+    buffer = _ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, 'w') as zip_file:
+        for (full_path, entry_name, date_time) in entries:
+            zip_info = zipfile.ZipInfo(entry_name, date_time)
+            file_ext = entry_name.rsplit('.', 1)[-1].lower() if '.' in entry_name else ''
+            zip_info.compress_type = zipfile.ZIP_STORED if file_ext in stored_extensions else zipfile.ZIP_DEFLATED
+            # 크기를 미리 설정해야 4GB 이상인 경우 ZIP64 로 기록됨
+            zip_info.file_size = os.path.getsize(full_path)
+            with open(full_path, 'rb') as src, zip_file.open(zip_info, 'w') as dst:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                    dst.write(chunk)
+                    data = buffer.pop()
+                    if data:
+                        yield data
+    # 마지막 파일의 data descriptor 및 central directory
+    yield buffer.pop()
+
+
+class HashingFileWriter(io.FileIO):
+    """
+    multipart 파싱 중 전달되는 chunk 를 바로 파일에 쓰면서 SHA-256, 크기를 계산
+    max_size 를 넘는 경우 작성중인 파일을 삭제하고 RequestEntityTooLarge 발생
+    """
+
+    def __init__(self, path, max_size=None):
+        super().__init__(path, 'w+')
+        self.path = path
+        self.max_size = max_size
+        self.size = 0
+        self._hash = hashlib.sha256()
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_size and self.size > self.max_size:
+            self.discard()
+            raise RequestEntityTooLarge(gettext(u'업로드 파일의 크기가 제한을 초과했습니다.'))
+        self._hash.update(data)
+        return super().write(data)
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def discard(self):
+        """
+        작성중인 파일 삭제
+        """
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class UploadStreamFactory:
+    """
+    FileStreamRequest 에서 사용하는 stream factory
+    업로드 파일마다 dir_path 에 임시파일명으로 HashingFileWriter 를 생성
+    """
+
+    def __init__(self, dir_path, max_file_size=None):
+        self.dir_path = dir_path
+        self.max_file_size = max_file_size
+        self.writers = []
+
+    def __call__(self, total_content_length, content_type, filename=None, content_length=None):
+        # part 의 Content-Length 가 있는 경우 파일을 만들기 전에 확인
+        if self.max_file_size and content_length and content_length > self.max_file_size:
+            raise RequestEntityTooLarge(gettext(u'업로드 파일의 크기가 제한을 초과했습니다.'))
+        tmp_name = make_tmp_file_name(filename)
+        writer = HashingFileWriter(os.path.join(self.dir_path, tmp_name), self.max_file_size)
+        writer.tmp_name = tmp_name
+        self.writers.append(writer)
+        return writer
+
+    def discard_all(self):
+        """
+        생성된 모든 임시파일 삭제 : 파싱 도중 오류가 발생한 경우 사용
+        """
+        for writer in self.writers:
+            writer.discard()
+
+
+class FileStreamRequest(Request):
+    """
+    file_stream_factory 가 설정된 경우 multipart 파일을 SpooledTemporaryFile 대신 해당 factory 로 저장
+    request.files 에 처음 접근하기 전에 설정해야 함
+    예) request.file_stream_factory = UploadStreamFactory(dir_path)
+    """
+    file_stream_factory = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.file_stream_factory is not None:
+            return self.file_stream_factory(total_content_length, content_type, filename, content_length)
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
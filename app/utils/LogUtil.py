@@ -1,42 +1,183 @@
-from datetime import datetime, timezone
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from datetime import datetime
 from http import HTTPStatus
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-from flask import request
+from flask import g, has_request_context, request
+from flask_jwt_extended import get_jwt
 from werkzeug.exceptions import RequestEntityTooLarge
 
+from ..configs import TIME_ZONE, LogConfig, ErrorLogConfig, AccessLogConfig
 
-def err_log(logger, e, file_path, traceback_str=None, msg=None):
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    크기가 제한된 queue 에 로그를 넣는 Handler
+    queue 가 가득 찬 경우 policy 에 따라 바로 버리거나(drop) block_timeout 동안 기다린 후 버림(block)
+    버린 로그 수는 dropped 에 기록됨
+    """
+
+    def __init__(self, log_queue, policy='drop', block_timeout=1.0):
+        super().__init__(log_queue)
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def enqueue(self, record):
+        try:
+            if self.policy == 'block':
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+
+def start_queue_logging(logger, log_file, formatter):
+    """
+    logger 에 BoundedQueueHandler 를 등록하고 파일에 쓰는 QueueListener 시작
+    파일 쓰기와 RotatingFileHandler 의 파일 교체는 QueueListener Thread 에서 처리되므로 요청 Thread 가 디스크를 기다리지 않음
+    메시지는 요청 Thread 에서 만들어지고, formatter 는 QueueListener Thread 에서 적용됨
+    :param logger:
+    :param log_file:
+    :param formatter:
+    :return: (BoundedQueueHandler, QueueListener) 종료시 QueueListener.stop() 을 호출해야 남은 로그가 기록됨
+    """
+    file_handler = RotatingFileHandler(log_file, maxBytes=LogConfig['max_bytes'], backupCount=LogConfig['backup_count'], encoding='utf-8')
+    file_handler.setFormatter(formatter)
+    queue_handler = BoundedQueueHandler(queue.Queue(LogConfig['queue_size']), LogConfig['policy'], LogConfig['block_timeout'])
+    listener = QueueListener(queue_handler.queue, file_handler, respect_handler_level=True)
+    listener.start()
+    logger.addHandler(queue_handler)
+    return queue_handler, listener
+
+
+class _ErrorDeduplicator:
+    """
+    같은 fingerprint 의 오류를 dedup_window 동안 한번만 기록하기 위한 생략 횟수 관리
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # fingerprint : [window 시작시간, 생략된 수]
+        self._windows = {}
+
+    def check(self, fingerprint):
+        """
+        :param fingerprint:
+        :return: 기록해야 하는 경우 이전 window 에서 생략된 수, 생략해야 하는 경우 None
+        """
+        now = time.monotonic()
+        window = ErrorLogConfig['dedup_window']
+        with self._lock:
+            state = self._windows.get(fingerprint)
+            if state and now - state[0] < window:
+                state[1] += 1
+                return None
+            if len(self._windows) >= ErrorLogConfig['dedup_max_keys']:
+                self._windows = {key: value for key, value in self._windows.items() if now - value[0] < window}
+            self._windows[fingerprint] = [now, 0]
+            return state[1] if state else 0
+
+
+_error_deduplicator = _ErrorDeduplicator()
+
+
+def _cap(value):
+    """
+    max_body 길이로 자름
+    :param value:
+    :return:
+    """
+    value = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=str)
+    max_body = ErrorLogConfig['max_body']
+    return value if len(value) <= max_body else f'{value[:max_body]}...({len(value)})'
+
+
+def err_log(logger, e, file_path, traceback_str=None, msg=None, status=None):
     """
     오류로그 출력
+    요청정보, 오류정보를 JSON 한줄로 기록하며 traceback 은 5xx(status 가 없는 경우 포함)인 경우에만 기록
+    같은 상태, 오류, URL 규칙의 오류는 ErrorLogConfig['dedup_window'] 동안 한번만 기록하고 생략된 수(suppressed)를 다음 기록에 포함
     :param logger:
     :param e:
     :param file_path: __name__ 를 사용하여 실행되고 있는 파일의 패키지 경로를 출력한다.
     :param traceback_str:
     :param msg:
+    :param status: HTTP 상태 코드
     """
-    # 오류 메시지 목록 생성
-    error_msg_list = [f'{file_path} ERROR ========= START']
-    if request:
-        error_msg_list.append(f'{file_path} Call URL : {request.url if request.url else ""}')
-        error_msg_list.append(f'{file_path} Call METHOD : {request.method if request.method else ""}')
-        if not isinstance(e, RequestEntityTooLarge):
-            error_msg_list.append(f'{file_path} Call FORM : {request.form.to_dict() if len(request.form) > 0 else ""}')
+    status = int(status) if status else int(HTTPStatus.INTERNAL_SERVER_ERROR)
+    error_info = {'status': status, 'error': type(e).__name__, 'message': _cap(str(e))}
+    if msg:
+        error_info['msg'] = msg
+    route = None
+    if has_request_context():
+        route = request.url_rule.rule if request.url_rule else request.path
+        error_info.update({'method': request.method, 'url': request.url, 'route': route})
+        # 요청 크기 초과인 경우 FORM 을 다시 읽지 않음
+        if not isinstance(e, RequestEntityTooLarge) and len(request.form) > 0:
+            error_info['form'] = _cap(request.form.to_dict())
         # json 속성은 body에 변환할 데이터가 없는경우 400 Bad Request를 반환함
         # 확인을 위해서는 get_json 함수의 silent=True 를 사용하여 값이 없을경우 None 값을 받도록 해야함
-        error_msg_list.append(f'{file_path} Call JSON : {request.get_json(silent=True)}')
-    error_msg_list.append(f'{file_path} Exception : {e}')
-    error_msg_list.append(f'{file_path} Exception args : {e.args}')
-    if msg:
-        error_msg_list.append(f'{file_path} Exception msg : {msg}')
-    if traceback_str:
-        error_msg_list.append(f'{file_path} traceback :\n{traceback_str}')
-    error_msg_list.append(f'{file_path} ERROR ========= END')
+        request_json = request.get_json(silent=True)
+        if request_json is not None:
+            error_info['json'] = _cap(request_json)
+    suppressed = _error_deduplicator.check((status, error_info['error'], route or file_path))
+    if suppressed is None:
+        return
+    if suppressed:
+        error_info['suppressed'] = suppressed
+    error_msg = f'{file_path} ERROR {json.dumps(error_info, ensure_ascii=False, default=str)}'
+    if traceback_str and status >= int(HTTPStatus.INTERNAL_SERVER_ERROR):
+        error_msg = f'{error_msg}\n{traceback_str}'
     # 로거 객체에 따른 출력 분리
-    for error_msg in error_msg_list:
-        if logger:
-            logger.error(error_msg)
-        else:
-            print(error_msg)
+    if logger:
+        logger.log(logging.ERROR if status >= int(HTTPStatus.INTERNAL_SERVER_ERROR) else logging.WARNING, error_msg)
+    else:
+        print(error_msg)
+
+
+def access_log(logger, response, started, namespace=None):
+    """
+    요청 단위 접근로그 출력(after_request 에서 호출)
+    URL 규칙, Namespace, 상태, 처리시간, DB 시간, DB 호출 수, 응답 크기, 사용자 SEQ 를 JSON 한줄로 기록
+    AccessLogConfig 의 sample_rate 에 따라 일부 요청만 기록하며 느린 요청과 오류 응답은 항상 기록
+    :param logger: 파일 쓰기가 QueueListener 에서 처리되는 접근로그 전용 logger
+    :param response:
+    :param started: 요청 시작시 time.perf_counter() 값
+    :param namespace: 요청을 처리한 Resource 의 Namespace 이름
+    """
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    slow_ms = AccessLogConfig['slow_ms']
+    if not ((slow_ms and elapsed_ms >= slow_ms)
+            or (AccessLogConfig['always_log_errors'] and response.status_code >= int(HTTPStatus.BAD_REQUEST))
+            or random.random() < AccessLogConfig['sample_rate']):
+        return
+    # JWT 확인을 하지 않은 요청은 get_jwt 에서 RuntimeError 가 발생함
+    try:
+        user_seq = get_jwt().get('sub')
+    except RuntimeError:
+        user_seq = None
+    access_info = {
+        'method': request.method,
+        'route': request.url_rule.rule if request.url_rule else None,
+        'namespace': namespace,
+        'status': response.status_code,
+        'total_ms': round(elapsed_ms, 3),
+        'db_ms': round(g.get('db_time', 0.0) * 1000, 3),
+        'db_count': g.get('db_count', 0),
+        # stream 응답(ZIP 등)은 크기를 알 수 없으므로 None
+        'bytes': response.content_length,
+        'user_seq': user_seq
+    }
+    logger.info(json.dumps(access_info, ensure_ascii=False))
 
 
 def make_default_error_response(status: HTTPStatus, message):
@@ -49,10 +190,9 @@ def make_default_error_response(status: HTTPStatus, message):
     :return:
     :rtype:
     """
-    tmp = datetime.utcnow()
-    now = tmp.astimezone(timezone.utc)
+    now = datetime.now(TIME_ZONE)
     return {
-        'timestamp': now.strftime("%Y-%m-%dT%H:%M:%S.%f+00:00"),
+        'timestamp': now.isoformat(timespec='microseconds'),
         'status': status.value,
         'error': status.phrase,
         'message': message,
@@ -0,0 +1,287 @@
+import bisect
+import json
+import logging
+import os
+import re
+import threading
+from functools import lru_cache
+
+from ..configs import PROJECT_ID, MetricsConfig
+
+# 지표 형식
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+# SQL fingerprint 최대 길이
+MAX_FINGERPRINT = 200
+_SQL_SPACES = re.compile(r'\s+')
+_SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+_SQL_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SQL_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def sql_fingerprint(query):
+    """
+    SQL 을 지표 label 로 사용할 수 있도록 정규화
+    공백 정리, 문자열/숫자 상수는 ?, IN (?, ?, ...) 은 IN (...) 으로 변경하여 label 수가 늘어나지 않도록 함
+    :param query:
+    :return:
+    """
+    query = _SQL_SPACES.sub(' ', query).strip()
+    query = _SQL_STRING.sub('?', query)
+    query = _SQL_NUMBER.sub('?', query)
+    query = _SQL_IN_LIST.sub('IN (...)', query)
+    return query[:MAX_FINGERPRINT]
+
+
+def _format_labels(labels, extra=None):
+    """
+    Prometheus text 형식의 label 문자열 생성
+    :param labels: ((이름, 값), ...)
+    :param extra: 추가 label (이름, 값)
+    :return:
+    """
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = [(key, str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')) for key, value in pairs]
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def _is_alive(pid):
+    """
+    프로세스 실행 여부 확인
+    :param pid:
+    :return:
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MetricsRegistry:
+    """
+    프로세스 내부 지표 저장소
+    counter, gauge 는 값, histogram 은 구간별 개수와 합계를 (이름, label) 별로 저장하며 lock 은 값 변경 시에만 짧게 사용
+    multiproc_dir 이 설정된 경우 각 프로세스가 flush_interval 마다 {pid}.json 으로 기록하고
+    collect 에서 모든 파일을 합산함(종료된 프로세스의 gauge 는 제외)
+    DB 의 작업 대기열처럼 모든 프로세스가 공유하는 값은 collector 로 등록하여 render 시점에 한번만 조회함
+    """
+
+    def __init__(self):
+        """
+        Class 생성 및 변수선언
+        """
+        self.logger = logging.getLogger(f'{PROJECT_ID}.utils.Metrics')
+        self._lock = threading.Lock()
+        # 이름 : (형식, 설명, histogram 구간)
+        self._meta = {}
+        # (이름, label) : counter, gauge 는 값, histogram 은 [구간별 개수..., +Inf 개수, 합계]
+        self._values = {}
+        # render 시점에 값을 조회하는 함수 목록 : 프로세스 간 합산하지 않음
+        self._collectors = []
+        self.multiproc_dir = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def describe(self, name, metric_type, help_text, buckets=None):
+        """
+        지표 등록
+        :param name:
+        :param metric_type: COUNTER, GAUGE, HISTOGRAM
+        :param help_text:
+        :param buckets: histogram 구간(초)
+        """
+        self._meta[name] = (metric_type, help_text, tuple(buckets or ()))
+
+    def add_collector(self, collector):
+        """
+        render 시점에 값을 조회하는 함수 등록
+        :param collector: [(이름, label, 값), ...] 을 반환하는 함수
+        """
+        self._collectors.append(collector)
+
+    def inc(self, name, labels=(), value=1):
+        """
+        counter, gauge 증가(gauge 감소는 음수 사용)
+        :param name:
+        :param labels: ((이름, 값), ...)
+        :param value:
+        """
+        key = (name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        """
+        histogram 에 값 추가
+        :param name:
+        :param labels: ((이름, 값), ...)
+        :param value:
+        """
+        buckets = self._meta[name][2]
+        idx = bisect.bisect_left(buckets, value)
+        key = (name, labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(buckets) + 1) + [0.0]
+            state[idx] += 1
+            state[-1] += value
+
+    def snapshot(self):
+        """
+        현재 프로세스의 지표 복사본
+        :return: [[이름, label, 값], ...]
+        """
+        with self._lock:
+            return [[name, labels, list(value) if isinstance(value, list) else value] for (name, labels), value in self._values.items()]
+
+    def reset(self):
+        """
+        fork 된 worker 프로세스 초기화
+        부모 프로세스의 값이 worker 마다 중복 합산되지 않도록 값을 비우고,
+        fork 시점에 다른 Thread 가 잡고 있었을 수 있는 lock 과 복사되지 않는 Thread 를 새로 만듦
+        """
+        self._lock = threading.Lock()
+        self._values = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self, multiproc_dir=None, flush_interval=None):
+        """
+        공유 디렉토리에 지표를 기록하는 Thread 시작
+        multiproc_dir 이 없으면 프로세스 단독으로 동작하므로 Thread 를 시작하지 않음
+        :param multiproc_dir:
+        :param flush_interval:
+        """
+        self.multiproc_dir = multiproc_dir or os.environ.get('METRICS_MULTIPROC_DIR') or MetricsConfig['multiproc_dir']
+        if not self.multiproc_dir or (self._thread and self._thread.is_alive()):
+            return
+        os.makedirs(self.multiproc_dir, exist_ok=True)
+        interval = flush_interval or MetricsConfig['flush_interval']
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name='MetricsFlush', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Thread 종료 및 마지막 지표 기록
+        """
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self, interval):
+        """
+        flush_interval 마다 지표 기록
+        :param interval:
+        """
+        while not self._stop_event.wait(interval):
+            try:
+                self.flush()
+            except Exception as e:
+                self.logger.error(f'Metrics flush error : {e}')
+
+    def flush(self):
+        """
+        현재 프로세스의 지표를 {multiproc_dir}/{pid}.json 으로 기록
+        임시파일에 쓴 후 os.replace 하므로 읽는 쪽에서 쓰는 중인 파일을 읽지 않음
+        """
+        if not self.multiproc_dir:
+            return
+        pid = os.getpid()
+        file_path = os.path.join(self.multiproc_dir, f'{pid}.json')
+        tmp_path = f'{file_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'pid': pid, 'values': self.snapshot()}, f)
+        os.replace(tmp_path, file_path)
+
+    def collect(self):
+        """
+        지표 합산
+        multiproc_dir 이 있으면 현재 프로세스를 먼저 기록한 후 모든 프로세스의 파일을 합산
+        :return: {(이름, label): 값}
+        """
+        if not self.multiproc_dir:
+            return {(name, labels): value for name, labels, value in self.snapshot()}
+        self.flush()
+        result = {}
+        for entry in os.scandir(self.multiproc_dir):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                with open(entry.path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                self.logger.warning(f'Metrics file read error : {entry.path}, {e}')
+                continue
+            alive = data['pid'] == os.getpid() or _is_alive(data['pid'])
+            for name, labels, value in data['values']:
+                meta = self._meta.get(name)
+                # 종료된 프로세스의 gauge(처리중인 요청 수 등)는 합산하지 않음
+                if meta is None or (meta[0] == GAUGE and not alive):
+                    continue
+                key = (name, tuple(tuple(label) for label in labels))
+                if isinstance(value, list):
+                    current = result.get(key)
+                    result[key] = value if current is None else [a + b for a, b in zip(current, value)]
+                else:
+                    result[key] = result.get(key, 0) + value
+        return result
+
+    def render(self):
+        """
+        Prometheus text 형식(0.0.4)으로 변환
+        :return:
+        """
+        values = self.collect()
+        for collector in self._collectors:
+            try:
+                values.update({(name, labels): value for name, labels, value in collector()})
+            except Exception as e:
+                self.logger.error(f'Metrics collector error : {e}')
+        lines = []
+        for name, (metric_type, help_text, buckets) in sorted(self._meta.items()):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for (value_name, labels), value in sorted(values.items()):
+                if value_name != name:
+                    continue
+                if metric_type != HISTOGRAM:
+                    lines.append(f'{name}{_format_labels(labels)} {value}')
+                    continue
+                cumulative = 0
+                for bucket, count in zip(buckets + ('+Inf',), value[:-1]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_format_labels(labels, ("le", bucket))} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {value[-1]}')
+                lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+# 프로세스 단위 지표 저장소
+metrics = MetricsRegistry()
+metrics.describe('http_requests_total', COUNTER, 'Total HTTP requests by restx Resource, method and status.')
+metrics.describe('http_request_duration_seconds', HISTOGRAM, 'HTTP request latency by restx Resource and method.', MetricsConfig['latency_buckets'])
+metrics.describe('http_requests_in_flight', GAUGE, 'HTTP requests currently being processed by restx Resource and method.')
+metrics.describe('sqlite_query_duration_seconds', HISTOGRAM, 'Sqlite3 execute/cmd/cmd_list latency by statement fingerprint.', MetricsConfig['latency_buckets'])
+metrics.describe('sqlite_connections_opened_total', COUNTER, 'Sqlite3 connections opened. Connections are not pooled, so compare with sqlite_query_duration_seconds_count for the reuse ratio.')
+metrics.describe('bcrypt_duration_seconds', HISTOGRAM, 'bcrypt hash/check time.', MetricsConfig['bcrypt_buckets'])
+metrics.describe('bcrypt_wait_seconds', HISTOGRAM, 'Time bcrypt work waited in the bounded executor queue.', MetricsConfig['latency_buckets'])
+metrics.describe('bcrypt_pending', GAUGE, 'bcrypt work queued or running in the bounded executor.')
+metrics.describe('bcrypt_rejected_total', COUNTER, 'bcrypt work rejected with 503 because the executor queue was full or the wait timed out.')
+metrics.describe('jobs_total', COUNTER, 'Background jobs handled by JobWorker by job type and result (processed, retried, failed).')
+metrics.describe('jobs_queue_depth', GAUGE, 'Rows in the JOBS table by status, read from the database at scrape time.')
+metrics.describe('jobs_oldest_ready_age_seconds', GAUGE, 'Age of the oldest READY job, read from the database at scrape time.')
+metrics.describe('tmp_reaper_files_total', COUNTER, 'Tmp files handled by TmpFileReaper by result (scanned, expired, deleted, skipped, errors).')
+metrics.describe('tmp_reaper_deleted_bytes_total', COUNTER, 'Bytes of expired tmp files deleted by TmpFileReaper.')
+metrics.describe('tmp_reaper_passes_total', COUNTER, 'Completed TmpFileReaper passes over file_tmp_path.')
+metrics.describe('tmp_reaper_pass_seconds_total', COUNTER, 'Total time spent in TmpFileReaper passes, divide by tmp_reaper_passes_total for the average.')
@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from flask_babel import gettext
+from werkzeug.exceptions import ServiceUnavailable
+
+from ..configs import PROJECT_ID, PasswordHashConfig
+from .Metrics import metrics
+
+# 비밀번호 암호화(Bcrypt) : Java Spring 기본값을 사용하여 호환성 유지
+BCRYPT_ROUNDS = 10
+BCRYPT_PREFIX = b'2a'
+
+
+class PasswordHasher:
+    """
+    bcrypt 전용 Thread pool
+    bcrypt 는 처리 중 GIL 을 해제하므로 Thread 로 병렬 처리되며, 요청 Thread 는 결과를 기다리기만 함
+    처리중 + 대기중 작업이 workers + max_queue 를 넘으면 기다리지 않고 ServiceUnavailable(503) 발생
+    로그인이 몰려도 bcrypt 에 사용되는 Thread 는 workers 개로 제한되므로 다른 요청(게시물 조회 등)은 계속 처리됨
+    Thread pool 은 처음 사용할 때 생성되며, fork 된 worker 프로세스에서는 init_worker 에서 reset 을 호출해야 함
+    """
+
+    def __init__(self):
+        """
+        Class 생성 및 변수선언
+        """
+        self.logger = logging.getLogger(f'{PROJECT_ID}.utils.PasswordHasher')
+        self._lock = threading.Lock()
+        self._executor = None
+        # 처리중 + 대기중 작업 수
+        self._pending = 0
+        # 완료되지 않은 작업 : shutdown 시 대기중인 작업 취소용
+        self._futures = set()
+
+    def reset(self):
+        """
+        fork 된 worker 프로세스 초기화 : 부모 프로세스의 Thread 는 복사되지 않으므로 Thread pool 을 새로 만들도록 비움
+        """
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = 0
+        self._futures = set()
+
+    def shutdown(self):
+        """
+        Thread pool 종료 : 대기중인 작업은 취소
+        Python 3.7 은 shutdown 의 cancel_futures 가 없으므로 직접 취소함
+        """
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+            futures = self._futures
+            self._futures = set()
+        for future in futures:
+            future.cancel()
+        if executor:
+            executor.shutdown(wait=False)
+
+    def _acquire(self, op):
+        """
+        작업 수 확인 및 증가
+        :param op:
+        :return: Thread pool
+        """
+        with self._lock:
+            if self._pending >= PasswordHashConfig['workers'] + PasswordHashConfig['max_queue']:
+                metrics.inc('bcrypt_rejected_total', (('op', op), ('reason', 'queue_full')))
+                raise self._unavailable()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=PasswordHashConfig['workers'], thread_name_prefix=f'{PROJECT_ID}-bcrypt')
+            self._pending += 1
+        metrics.inc('bcrypt_pending')
+        return self._executor
+
+    @staticmethod
+    def _unavailable():
+        return ServiceUnavailable(gettext(u'요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해 주세요.'), retry_after=PasswordHashConfig['retry_after'])
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+        metrics.inc('bcrypt_pending', value=-1)
+
+    def _call(self, op, submitted, fn, args):
+        """
+        Thread pool 에서 실행 : 대기시간, 처리시간 기록
+        """
+        started = time.perf_counter()
+        metrics.observe('bcrypt_wait_seconds', (('op', op),), started - submitted)
+        try:
+            return fn(*args)
+        finally:
+            metrics.observe('bcrypt_duration_seconds', (('op', op),), time.perf_counter() - started)
+            self._release()
+
+    def run(self, op, fn, *args):
+        """
+        Thread pool 에서 fn 실행 후 결과 반환
+        :param op: 지표 label 예) hashpw, checkpw
+        :param fn:
+        :param args:
+        :return: fn 결과
+        """
+        executor = self._acquire(op)
+        try:
+            future = executor.submit(self._call, op, time.perf_counter(), fn, args)
+        except RuntimeError:
+            # shutdown 된 경우
+            self._release()
+            raise
+        with self._lock:
+            self._futures.add(future)
+        try:
+            return future.result(timeout=PasswordHashConfig['timeout'])
+        except CancelledError:
+            # shutdown 으로 취소된 경우(시작되지 않았으므로 _call 에서 작업 수가 감소되지 않음)
+            self._release()
+            raise self._unavailable()
+        except FutureTimeoutError:
+            # 시작되지 않은 작업은 취소(처리중인 작업은 끝나면 _call 에서 작업 수 감소)
+            if future.cancel():
+                self._release()
+            metrics.inc('bcrypt_rejected_total', (('op', op), ('reason', 'timeout')))
+            self.logger.warning(f'bcrypt timeout : op={op}, pending={self._pending}')
+            raise self._unavailable()
+        finally:
+            with self._lock:
+                self._futures.discard(future)
+
+
+password_hasher = PasswordHasher()
+
+
+def _hashpw(password):
+    # bcrypt 는 처음 사용할 때 import 함(app 시작시간 단축)
+    import bcrypt
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(BCRYPT_ROUNDS, BCRYPT_PREFIX))
+
+
+def _checkpw(password, password_bcrypt):
+    import bcrypt
+    return bcrypt.checkpw(password.encode('utf-8'), password_bcrypt)
+
+
+def hash_password(password):
+    """
+    비밀번호 암호화(bcrypt 전용 Thread pool 에서 처리)
+    :param password:
+    :return: bcrypt hash(bytes)
+    """
+    return password_hasher.run('hashpw', _hashpw, password)
+
+
+def check_password(password, password_bcrypt):
+    """
+    비밀번호 확인(bcrypt 전용 Thread pool 에서 처리)
+    :param password:
+    :param password_bcrypt: 저장된 bcrypt hash
+    :return: 일치 여부
+    """
+    return password_hasher.run('checkpw', _checkpw, password, password_bcrypt)
@@ -0,0 +1,163 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+# 분석 방식
+CPROFILE = 'cprofile'
+SAMPLE = 'sample'
+PROFILE_MODES = (CPROFILE, SAMPLE)
+# continuous sampling 결과 파일 쓰기 lock
+_continuous_lock = threading.Lock()
+
+
+def _frame_name(frame):
+    """
+    collapsed stack 의 frame 이름 : 함수명 (파일명:시작 줄번호)
+    collapsed 형식의 구분자인 ';' 는 사용할 수 없음
+    :param frame:
+    :return:
+    """
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'.replace(';', ',')
+
+
+class StackSampler:
+    """
+    interval 마다 대상 Thread 의 stack 을 기록하는 sampling profiler
+    대상 Thread 는 sys._current_frames() 로 읽기만 하므로 요청 처리에 추가되는 비용은 sampling Thread 의 GIL 사용 뿐임
+    """
+
+    def __init__(self, thread_id, interval):
+        """
+        Class 생성 및 변수선언
+        :param thread_id: 분석할 Thread 의 threading.get_ident()
+        :param interval: sampling 주기(초)
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        sampling Thread 시작
+        """
+        self._thread = threading.Thread(target=self._run, name='StackSampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        sampling Thread 종료
+        """
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        """
+        대상 Thread 의 stack 을 root 부터 ';' 로 연결하여 개수 기록
+        """
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def collapsed(self):
+        """
+        collapsed stack 형식(flamegraph.pl, speedscope 입력) 문자열
+        :return:
+        """
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    """
+    요청 하나를 cProfile 또는 StackSampler 로 분석
+    before_request 에서 start, after_request(또는 teardown_request) 에서 stop 을 같은 Thread 에서 호출해야 함
+    """
+
+    def __init__(self, mode, interval, is_inline=False, is_continuous=False):
+        """
+        Class 생성 및 변수선언
+        :param mode: CPROFILE, SAMPLE
+        :param interval: SAMPLE 인 경우 sampling 주기(초)
+        :param is_inline: 결과를 응답 본문으로 반환
+        :param is_continuous: sample_rate 에 의해 선택된 요청
+        """
+        self.mode = mode
+        self.is_inline = is_inline
+        self.is_continuous = is_continuous
+        self.started = None
+        self.elapsed = None
+        if mode == CPROFILE:
+            self._profiler = cProfile.Profile()
+        else:
+            self._profiler = StackSampler(threading.get_ident(), interval)
+
+    def start(self):
+        """
+        분석 시작
+        """
+        self.started = time.perf_counter()
+        if self.mode == CPROFILE:
+            self._profiler.enable()
+        else:
+            self._profiler.start()
+
+    def stop(self):
+        """
+        분석 종료 : 여러번 호출되어도 한번만 처리
+        """
+        if self.elapsed is not None:
+            return
+        if self.mode == CPROFILE:
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+        self.elapsed = time.perf_counter() - self.started
+
+    def report(self, stats_limit):
+        """
+        결과 문자열 : CPROFILE 은 누적시간 순 pstats 출력, SAMPLE 은 collapsed stack
+        :param stats_limit: pstats 최대 출력 함수 수
+        :return:
+        """
+        if self.mode == SAMPLE:
+            return self._profiler.collapsed()
+        stream = io.StringIO()
+        pstats.Stats(self._profiler, stream=stream).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(stats_limit)
+        return stream.getvalue()
+
+    def save(self, dir_path, name):
+        """
+        결과 파일 저장 : CPROFILE 은 {name}.prof(pstats), SAMPLE 은 {name}.collapsed
+        continuous 인 경우 continuous-{pid}.collapsed 에 누적
+        :param dir_path:
+        :param name: 파일명(확장자 제외)
+        :return: 저장된 파일 경로
+        """
+        os.makedirs(dir_path, exist_ok=True)
+        if self.mode == CPROFILE:
+            file_path = os.path.join(dir_path, f'{name}.prof')
+            self._profiler.dump_stats(file_path)
+            return file_path
+        if self.is_continuous:
+            file_path = os.path.join(dir_path, f'continuous-{os.getpid()}.collapsed')
+            with _continuous_lock, open(file_path, 'a', encoding='utf-8') as f:
+                f.write(self._profiler.collapsed())
+            return file_path
+        file_path = os.path.join(dir_path, f'{name}.collapsed')
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(self._profiler.collapsed())
+        return file_path
@@ -0,0 +1,117 @@
+import json
+import time
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_restx import marshalling
+from flask_restx.representations import output_json
+
+from ..configs import QueryBudgetConfig
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    요청 단위 SQL 실행 수가 QueryBudgetConfig 의 제한을 초과한 경우 발생
+    """
+    pass
+
+
+# flask_restx 원래의 marshal
+_restx_marshal = marshalling.marshal
+
+
+def timed_marshal(data, fields, *args, **kwargs):
+    """
+    flask_restx 의 marshal(Model 변환) 시간을 g.serialize_time(초)에 누적
+    marshal 은 목록, Nested 처리시 자신을 다시 호출하므로 가장 바깥의 호출만 기록함
+    marshal_with 를 사용하지 않고 직접 변환하는 경우에도 이 함수를 사용
+    :param data:
+    :param fields:
+    :return:
+    """
+    if not has_app_context() or g.get('is_marshalling'):
+        return _restx_marshal(data, fields, *args, **kwargs)
+    g.is_marshalling = True
+    started = time.perf_counter()
+    try:
+        return _restx_marshal(data, fields, *args, **kwargs)
+    finally:
+        g.is_marshalling = False
+        g.serialize_time = g.get('serialize_time', 0.0) + time.perf_counter() - started
+
+
+def install_marshal_timing():
+    """
+    marshal_with 가 사용하는 flask_restx.marshalling.marshal 을 timed_marshal 로 교체
+    """
+    marshalling.marshal = timed_marshal
+
+
+def timed_output_json(data, code, headers=None):
+    """
+    flask_restx 의 JSON 응답 변환(json.dumps) 시간을 g.serialize_time(초)에 누적
+    Api.representation('application/json') 으로 등록하여 사용
+    :param data:
+    :param code:
+    :param headers:
+    :return:
+    """
+    started = time.perf_counter()
+    response = output_json(data, code, headers)
+    g.serialize_time = g.get('serialize_time', 0.0) + time.perf_counter() - started
+    return response
+
+
+def make_server_timing(started):
+    """
+    Server-Timing Header 값 생성 : db(SQL 실행 수 포함), serialize(marshal + JSON 변환), total (ms)
+    :param started: 요청 시작시 time.perf_counter() 값
+    :return:
+    """
+    total_ms = (time.perf_counter() - started) * 1000
+    db_ms = g.get('db_time', 0.0) * 1000
+    serialize_ms = g.get('serialize_time', 0.0) * 1000
+    return f'db;dur={db_ms:.3f};desc="{g.get("db_count", 0)} queries", serialize;dur={serialize_ms:.3f};desc="marshal + JSON", total;dur={total_ms:.3f}'
+
+
+def _is_raise_action():
+    return current_app.testing or QueryBudgetConfig['action'] == 'raise'
+
+
+def _get_query_budget(resource_name):
+    return QueryBudgetConfig['endpoints'].get(f'{resource_name}.{request.method.lower()}', QueryBudgetConfig['default'])
+
+
+def _make_budget_info(resource_name, db_count, budget):
+    return json.dumps({'resource': resource_name, 'method': request.method, 'route': request.url_rule.rule if request.url_rule else None,
+                       'db_count': db_count, 'budget': budget}, ensure_ascii=False)
+
+
+def enforce_query_budget():
+    """
+    SQL 실행 전 요청 단위 SQL 실행 수(g.db_count) 확인
+    action 이 'raise' 이거나 app.testing 인 경우 제한만큼 실행된 뒤의 SQL 은 실행하지 않고 QueryBudgetExceeded 발생
+    요청 처리 중 발생하므로 오류 응답(500)으로 처리되어 접근로그, 지표에도 500 으로 기록됨
+    요청이 아닌 경우(백그라운드 Thread, app 시작시 테이블 생성 등)는 확인하지 않음
+    """
+    if not has_request_context() or 'metric_labels' not in g or not _is_raise_action():
+        return
+    resource_name = g.metric_labels[0][1]
+    budget = _get_query_budget(resource_name)
+    db_count = g.get('db_count', 0)
+    if budget and db_count >= budget:
+        raise QueryBudgetExceeded(_make_budget_info(resource_name, db_count + 1, budget))
+
+
+def check_query_budget(logger, resource_name):
+    """
+    요청 완료 후 요청 단위 SQL 실행 수(g.db_count) 확인
+    action 이 'log' 인 경우 제한을 초과하면 경고 로그 기록('raise' 인 경우는 enforce_query_budget 에서 처리됨)
+    :param logger:
+    :param resource_name: restx Resource 클래스명
+    """
+    if _is_raise_action():
+        return
+    budget = _get_query_budget(resource_name)
+    db_count = g.get('db_count', 0)
+    if budget and db_count > budget:
+        logger.warning(f'Query budget exceeded {_make_budget_info(resource_name, db_count, budget)}')
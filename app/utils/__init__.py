@@ -1,3 +1,8 @@
 from .Converters import IntListConverter, AuthCodeConverter, BoardsCodeConverter
 from .Decorator import admin_required
-from .LogUtil import err_log, make_default_error_response
+from .FileStream import CHUNK_SIZE, FileStreamRequest, UploadStreamFactory, make_tmp_file_name, shard_path, file_sha256, send_stored_file, iter_zip_stream
+from .LogUtil import err_log, access_log, make_default_error_response, start_queue_logging
+from .Metrics import metrics, sql_fingerprint
+from .PasswordUtil import PasswordHasher, password_hasher, hash_password, check_password
+from .Profiler import PROFILE_MODES, RequestProfiler, StackSampler
+from .RequestTiming import QueryBudgetExceeded, timed_marshal, install_marshal_timing, timed_output_json, make_server_timing, enforce_query_budget, check_query_budget
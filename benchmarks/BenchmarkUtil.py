@@ -0,0 +1,102 @@
+"""
+benchmark 공통 함수
+측정 결과는 {'median_ms', 'p95_ms', ...} 형태로 JSON 에 기록되며, baseline(이전 실행 결과 JSON)이 있는 경우 median 비율을 비교함
+"""
+import json
+import statistics
+import time
+
+
+def percentile(values, ratio):
+    """
+    정렬된 목록의 백분위 값(nearest-rank)
+    :param values: 정렬된 목록
+    :param ratio: 0.0 ~ 1.0
+    :return:
+    """
+    if not values:
+        return None
+    idx = min(len(values) - 1, max(0, int(round(ratio * len(values) + 0.5)) - 1))
+    return values[idx]
+
+
+def summarize(times_ms, number=1):
+    """
+    실행시간 목록 요약
+    :param times_ms: 반복별 실행시간(ms)
+    :param number: 반복 한번에 실행한 횟수, 1회 실행시간으로 환산
+    :return:
+    """
+    values = sorted(t / number for t in times_ms)
+    median = statistics.median(values)
+    return {
+        'repeat': len(values),
+        'median_ms': round(median, 4),
+        'p95_ms': round(percentile(values, 0.95), 4),
+        'min_ms': round(values[0], 4),
+        'max_ms': round(values[-1], 4),
+        'ops_per_sec': round(1000 / median, 1) if median else None
+    }
+
+
+def measure(fn, repeat, number=1, warmup=1, prepare=None):
+    """
+    fn 실행시간 측정
+    :param fn: prepare 가 있는 경우 prepare 결과를 인자로 받음
+    :param repeat: 반복 횟수
+    :param number: 반복 한번에 fn 을 실행하는 횟수(실행시간이 짧은 micro benchmark 용)
+    :param warmup: 측정하지 않는 처음 실행 횟수
+    :param prepare: 반복마다 측정시간에서 제외하고 먼저 실행하는 함수(반복번호를 인자로 받음)
+    :return:
+    """
+    times = []
+    for idx in range(warmup + repeat):
+        args = (prepare(idx),) if prepare else ()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn(*args)
+        elapsed = (time.perf_counter() - start) * 1000
+        if idx >= warmup:
+            times.append(elapsed)
+    return summarize(times, number)
+
+
+def compare(report, baseline, threshold):
+    """
+    baseline 과 median 비교
+    :param report: {'results': {이름: 측정결과}}
+    :param baseline: 이전 실행 결과
+    :param threshold: 이 비율 이상 느려진 경우 regression 으로 표시 예) 0.2 : 20%
+    :return: {이름: {'baseline_ms', 'median_ms', 'ratio', 'regression'}}
+    """
+    result = {}
+    for name, current in report['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if not isinstance(current, dict) or not isinstance(previous, dict) or not previous.get('median_ms') or 'median_ms' not in current:
+            continue
+        ratio = current['median_ms'] / previous['median_ms']
+        result[name] = {'baseline_ms': previous['median_ms'], 'median_ms': current['median_ms'], 'ratio': round(ratio, 3),
+                        'regression': ratio >= 1 + threshold}
+    return result
+
+
+def write_report(report, output=None, baseline=None, threshold=0.2):
+    """
+    결과 JSON 출력 및 저장
+    :param report:
+    :param output: 저장할 파일 경로, 없으면 출력만 함
+    :param baseline: 비교할 이전 결과 JSON 파일 경로
+    :param threshold: regression 기준 비율
+    :return: regression 이 있는 경우 True
+    """
+    has_regression = False
+    if baseline:
+        with open(baseline, encoding='utf-8') as f:
+            report['compare'] = compare(report, json.load(f), threshold)
+        has_regression = any(v['regression'] for v in report['compare'].values())
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
+    return has_regression
@@ -0,0 +1,141 @@
+"""
+게시물 목록 조회 속도 비교
+CONTENTS, ADD_FIELDS 를 BOARDS 에 같이 저장하는 구조(inline)와 BOARD_BODIES 로 분리한 구조(split)의
+_get_board_list 쿼리(ORDER BY RDATE DESC LIMIT ?, ?) 및 COUNT(*) 실행시간을 비교
+실행) python -m benchmarks.BoardListBenchmark --rows 1000000 --contents-size 2000
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import string
+import tempfile
+import time
+import zlib
+
+BOARDS_CODES = ('NOTICE', 'FAQ', 'POST')
+LIST_SQL = 'SELECT SEQ, BOARDS_CODE, TITLE, RDATE, RUSER, MDATE, MUSER FROM BOARDS WHERE 1 = 1 ORDER BY RDATE DESC LIMIT ?, ?'
+COUNT_SQL = 'SELECT COUNT(*) AS CNT FROM BOARDS WHERE 1 = 1'
+SCHEMAS = {
+    'inline': [
+        '''CREATE TABLE BOARDS (SEQ INTEGER PRIMARY KEY AUTOINCREMENT, BOARDS_CODE TEXT, TITLE TEXT, CONTENTS TEXT, ADD_FIELDS JSON,
+         RDATE INTEGER, RUSER TEXT, MDATE INTEGER, MUSER TEXT)'''
+    ],
+    'split': [
+        '''CREATE TABLE BOARDS (SEQ INTEGER PRIMARY KEY AUTOINCREMENT, BOARDS_CODE TEXT, TITLE TEXT,
+         RDATE INTEGER, RUSER TEXT, MDATE INTEGER, MUSER TEXT)''',
+        '''CREATE TABLE BOARD_BODIES (BOARD_SEQ INTEGER PRIMARY KEY, CONTENTS BLOB, ADD_FIELDS JSON, IS_COMPRESSED INTEGER DEFAULT 0)'''
+    ]
+}
+
+
+def _make_rows(rows, contents_size, seed):
+    """
+    테스트 데이터 생성
+    :param rows:
+    :param contents_size: CONTENTS 평균 크기(byte)
+    :param seed:
+    :return:
+    """
+    rnd = random.Random(seed)
+    words = [''.join(rnd.choices(string.ascii_letters, k=rnd.randint(2, 10))) for _ in range(2000)]
+    base = int(time.time()) - rows
+    for idx in range(rows):
+        size = rnd.randint(contents_size // 2, contents_size * 3 // 2)
+        contents = ' '.join(rnd.choices(words, k=size // 6 + 1))[:size]
+        rdate = base + idx
+        add_fields = json.dumps({'a_str': words[idx % len(words)], 'b_int': idx})
+        yield idx + 1, rnd.choice(BOARDS_CODES), f'제목 {idx}', contents, add_fields, rdate
+
+
+def _seed(db_path, layout, rows, contents_size, compress_min_size, seed):
+    """
+    구조별 DB 생성
+    :return:
+    """
+    conn = sqlite3.connect(db_path)
+    for ddl in SCHEMAS[layout]:
+        conn.execute(ddl)
+    batch = []
+    for (seq, code, title, contents, add_fields, rdate) in _make_rows(rows, contents_size, seed):
+        batch.append((seq, code, title, contents, add_fields, rdate))
+        if len(batch) >= 10000:
+            _insert(conn, layout, batch, compress_min_size)
+            batch = []
+    if batch:
+        _insert(conn, layout, batch, compress_min_size)
+    conn.commit()
+    conn.close()
+
+
+def _insert(conn, layout, batch, compress_min_size):
+    if layout == 'inline':
+        conn.executemany('INSERT INTO BOARDS (SEQ, BOARDS_CODE, TITLE, CONTENTS, ADD_FIELDS, RDATE, RUSER, MDATE, MUSER) VALUES (?, ?, ?, ?, ?, ?, \'admin\', ?, \'admin\')',
+                         [(seq, code, title, contents, add_fields, rdate, rdate) for (seq, code, title, contents, add_fields, rdate) in batch])
+    else:
+        conn.executemany('INSERT INTO BOARDS (SEQ, BOARDS_CODE, TITLE, RDATE, RUSER, MDATE, MUSER) VALUES (?, ?, ?, ?, \'admin\', ?, \'admin\')',
+                         [(seq, code, title, rdate, rdate) for (seq, code, title, _, _, rdate) in batch])
+        bodies = []
+        for (seq, _, _, contents, add_fields, _) in batch:
+            if 0 < compress_min_size <= len(contents.encode('utf-8')):
+                bodies.append((seq, zlib.compress(contents.encode('utf-8'), 6), add_fields, 1))
+            else:
+                bodies.append((seq, contents, add_fields, 0))
+        conn.executemany('INSERT INTO BOARD_BODIES (BOARD_SEQ, CONTENTS, ADD_FIELDS, IS_COMPRESSED) VALUES (?, ?, ?, ?)', bodies)
+
+
+def _timeit(db_path, sql, params, repeat):
+    """
+    매 실행마다 Connection 을 새로 여는 Sqlite3 Class 와 동일한 방식으로 측정
+    :return: 실행시간 목록(ms)
+    """
+    result = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn = sqlite3.connect(db_path)
+        conn.execute(sql, params).fetchall()
+        conn.close()
+        result.append((time.perf_counter() - start) * 1000)
+    return result
+
+
+def run(rows, contents_size, compress_min_size, repeat, row_per_page, seed, work_dir):
+    """
+    구조별 목록 조회 측정
+    :return:
+    """
+    report = {'rows': rows, 'contents_size': contents_size, 'compress_min_size': compress_min_size, 'repeat': repeat, 'results': {}}
+    for layout in SCHEMAS:
+        db_path = os.path.join(work_dir, f'board_list_{layout}.db')
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        _seed(db_path, layout, rows, contents_size, compress_min_size, seed)
+        layout_result = {'db_size_mb': round(os.path.getsize(db_path) / 1024 / 1024, 1)}
+        for name, sql, params in (('list_first_page', LIST_SQL, (0, row_per_page)),
+                                  ('list_middle_page', LIST_SQL, (rows // 2, row_per_page)),
+                                  ('count', COUNT_SQL, ())):
+            times = _timeit(db_path, sql, params, repeat)
+            layout_result[name] = {'median_ms': round(statistics.median(times), 2), 'min_ms': round(min(times), 2)}
+        report['results'][layout] = layout_result
+        os.remove(db_path)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='BOARDS 목록 조회 inline/split 구조 비교')
+    parser.add_argument('--rows', type=int, default=1000000, help='게시물 수')
+    parser.add_argument('--contents-size', type=int, default=2000, help='CONTENTS 평균 크기(byte)')
+    parser.add_argument('--compress-min-size', type=int, default=4 * 1024, help='압축 기준 크기(byte), 0 이면 압축하지 않음')
+    parser.add_argument('--repeat', type=int, default=5, help='쿼리별 반복 횟수')
+    parser.add_argument('--row-per-page', type=int, default=10, help='화면당 행 수')
+    parser.add_argument('--seed', type=int, default=1, help='random seed')
+    parser.add_argument('--work-dir', default=tempfile.gettempdir(), help='DB 생성 디렉토리')
+    args = parser.parse_args()
+    report = run(args.rows, args.contents_size, args.compress_min_size, args.repeat, args.row_per_page, args.seed, args.work_dir)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
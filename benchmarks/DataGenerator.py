@@ -0,0 +1,169 @@
+"""
+benchmark 용 데이터 생성
+같은 seed 로 실행하면 같은 데이터가 생성됨
+현재 디렉토리의 sample.db 를 새로 만들고(Sqlite3Service 로 테이블 생성) USERS, BOARDS(모든 BoardsCode), BOARD_BODIES(ADD_FIELDS 포함), FILES 를 등록
+FILES 는 blobs 개의 실제 파일을 file_upload_home 에 저장하고 여러 행이 같은 파일을 참조(중복제거 구조와 동일)하므로 1e7 행도 디스크를 많이 사용하지 않음
+실행) python -m benchmarks.DataGenerator --work-dir /tmp/bench --users 10000 --boards 100000 --files 1000000
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import string
+import time
+
+import bcrypt
+
+from app.configs import PathConfig, UploadConfig
+from app.enums import AuthCode, BoardsCode
+from app.services import Sqlite3Service
+from app.utils import shard_path
+
+# 한번에 등록하는 행 수
+BATCH_SIZE = 10000
+# 생성되는 사용자의 비밀번호
+USER_PASSWORD = '1234!'
+FILE_EXTENSIONS = ('txt', 'pdf', 'png', 'zip', 'md')
+
+
+def _batched(rows):
+    """
+    BATCH_SIZE 단위로 나눔
+    :param rows:
+    :return:
+    """
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _make_users(rnd, users, base):
+    """
+    USERS 행 생성 : 5% 는 ADMIN
+    bcrypt 는 느리므로 모든 사용자가 같은 비밀번호 hash 를 사용
+    """
+    password_bcrypt = bcrypt.hashpw(USER_PASSWORD.encode('utf-8'), bcrypt.gensalt(10, b'2a'))
+    for idx in range(users):
+        auth_code = AuthCode.ADMIN.name if rnd.random() < 0.05 else AuthCode.USER.name
+        yield f'user{idx:08d}', password_bcrypt, f'사용자 {idx}', auth_code, base + idx, base + idx
+
+
+def _make_boards(rnd, boards, users, words, contents_size, base):
+    """
+    BOARDS, BOARD_BODIES 행 생성 : BoardsCode 는 순서대로, ADD_FIELDS 는 wildcard_multi_model 의 모든 형식 사용
+    """
+    boards_codes = [v.name for v in BoardsCode]
+    for idx in range(boards):
+        seq = idx + 1
+        user_id = f'user{rnd.randrange(users):08d}' if users else 'admin'
+        rdate = base + idx
+        size = rnd.randint(contents_size // 2, contents_size * 3 // 2)
+        contents = ' '.join(rnd.choices(words, k=size // 6 + 1))[:size]
+        add_fields = {'a_str': rnd.choice(words), 'b_int': rnd.randrange(1000000), 'c_float': round(rnd.random() * 1000, 3),
+                      'd_list_str': rnd.choices(words, k=rnd.randint(0, 5))}
+        yield ((seq, boards_codes[idx % len(boards_codes)], f'제목 {seq} {rnd.choice(words)}', rdate, user_id, rdate, user_id),
+               (seq, contents, json.dumps(add_fields, ensure_ascii=False)))
+
+
+def _make_blobs(rnd, blobs, blob_size, env):
+    """
+    FILES 가 참조할 실제 파일 저장
+    :return: [(PATH, FNAME(SHA-256), FILE_SIZE)]
+    """
+    result = []
+    file_path = PathConfig[env]['file_path']
+    for _ in range(blobs):
+        size = rnd.randint(blob_size // 2, blob_size * 3 // 2)
+        # Random.randbytes 는 Python 3.9 이상, getrandbits(0) 은 Python 3.9 미만에서 ValueError
+        data = rnd.getrandbits(size * 8).to_bytes(size, 'little') if size else b''
+        file_hash = hashlib.sha256(data).hexdigest()
+        path = shard_path(file_path, file_hash, UploadConfig['shard_depth'])
+        dir_path = os.path.join(PathConfig[env]['file_upload_home'], *path.split('/'))
+        os.makedirs(dir_path, exist_ok=True)
+        with open(os.path.join(dir_path, file_hash), 'wb') as f:
+            f.write(data)
+        result.append((path, file_hash, len(data)))
+    return result
+
+
+def _make_files(rnd, files, boards, blob_list, base):
+    """
+    FILES 행 생성 : 게시물은 무작위, 파일은 blob_list 중 무작위
+    """
+    for idx in range(files):
+        (path, file_hash, file_size) = rnd.choice(blob_list)
+        yield (rnd.randint(1, boards), path, file_hash, f'file{idx}.{rnd.choice(FILE_EXTENSIONS)}', base + idx, 'admin', file_hash, file_size)
+
+
+def seed(users, boards, files, env='local', contents_size=1000, blobs=16, blob_size=64 * 1024, seed_value=1):
+    """
+    현재 디렉토리의 sample.db 를 새로 만들고 데이터 등록
+    :param users: 사용자 수(admin 제외)
+    :param boards: 게시물 수
+    :param files: FILES 행 수
+    :param env: 파일 저장경로(PathConfig)
+    :param contents_size: CONTENTS 평균 크기(byte)
+    :param blobs: 실제 파일 수
+    :param blob_size: 실제 파일 평균 크기(byte)
+    :param seed_value: random seed
+    :return: 생성 결과
+    """
+    started = time.perf_counter()
+    if os.path.exists('sample.db'):
+        os.remove('sample.db')
+    Sqlite3Service()
+    rnd = random.Random(seed_value)
+    words = [''.join(rnd.choices(string.ascii_letters, k=rnd.randint(2, 10))) for _ in range(2000)]
+    base = int(time.time()) - max(users, boards, files)
+    conn = sqlite3.connect('sample.db')
+    # 생성 속도를 위해 동기화하지 않음(benchmark 데이터 전용)
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA journal_mode = MEMORY')
+    for batch in _batched(_make_users(rnd, users, base)):
+        conn.executemany('INSERT INTO USERS (USER_ID, USER_PW, USER_NAME, AUTH_CODE, RDATE, MDATE) VALUES (?, ?, ?, ?, ?, ?)', batch)
+    for batch in _batched(_make_boards(rnd, boards, users, words, contents_size, base)):
+        conn.executemany('INSERT INTO BOARDS (SEQ, BOARDS_CODE, TITLE, RDATE, RUSER, MDATE, MUSER) VALUES (?, ?, ?, ?, ?, ?, ?)', [row[0] for row in batch])
+        conn.executemany('INSERT INTO BOARD_BODIES (BOARD_SEQ, CONTENTS, ADD_FIELDS, IS_COMPRESSED) VALUES (?, ?, ?, 0)', [row[1] for row in batch])
+    blob_list = _make_blobs(rnd, blobs, blob_size, env) if files and boards else []
+    for batch in _batched(_make_files(rnd, files, boards, blob_list, base) if blob_list else ()):
+        conn.executemany('INSERT INTO FILES (BOARD_SEQ, PATH, FNAME, ONAME, RDATE, RUSER, FILE_HASH, FILE_SIZE) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch)
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+    return {
+        'users': users,
+        'boards': boards,
+        'files': files if blob_list else 0,
+        'blobs': len(blob_list),
+        'seed': seed_value,
+        'db_size_mb': round(os.path.getsize('sample.db') / 1024 / 1024, 1),
+        'seconds': round(time.perf_counter() - started, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark 데이터 생성')
+    parser.add_argument('--work-dir', required=True, help='sample.db, 첨부파일을 생성할 디렉토리(실행 디렉토리로 사용)')
+    parser.add_argument('--env', default='local', help='첨부파일 저장경로(PathConfig) env')
+    parser.add_argument('--users', type=int, default=1000, help='사용자 수')
+    parser.add_argument('--boards', type=int, default=10000, help='게시물 수')
+    parser.add_argument('--files', type=int, default=10000, help='FILES 행 수')
+    parser.add_argument('--contents-size', type=int, default=1000, help='CONTENTS 평균 크기(byte)')
+    parser.add_argument('--blobs', type=int, default=16, help='실제 첨부파일 수')
+    parser.add_argument('--seed', type=int, default=1, help='random seed')
+    args = parser.parse_args()
+    os.makedirs(args.work_dir, exist_ok=True)
+    os.chdir(args.work_dir)
+    result = seed(args.users, args.boards, args.files, args.env, args.contents_size, args.blobs, seed_value=args.seed)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
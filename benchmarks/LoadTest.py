@@ -0,0 +1,400 @@
+"""
+http/api.http 의 요청을 동시에 반복 실행하는 부하 테스트
+- api.http 를 읽어 '### {Namespace} - {route}' 제목별 요청(method, URL, Header, body, 응답 처리 script 의 token 저장)을 만듦
+- worker(가상 사용자)마다 로그인 후 scenario(조회, 게시물 CRUD, 파일 업로드/저장)를 --mix 비율로 반복
+- 응답의 board_seq, user_seq, upload_id, 업로드 파일 목록을 저장하여 다음 요청의 route 파라메터, file_list 에 사용
+- --concurrency 개의 Thread 와 전체 --rps 제한으로 --duration 초 동안 실행
+- 요청별, 전체 p50/p95/p99, 상태코드별 오류 수, SQLITE_BUSY(database is locked) 응답 수를 JSON 으로 출력
+--server-cmd 를 지정하면 --work-dir 에서 서버를 시작하고 종료함
+실행) python -m benchmarks.LoadTest --server-cmd "python /path/to/app.py" --work-dir /tmp/load --concurrency 8 --duration 30
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import shlex
+import socket
+import subprocess
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from benchmarks.BenchmarkUtil import percentile, write_report
+
+DEFAULT_HTTP_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'http', 'api.http')
+# 요청 제목 : '{METHOD} {route}'
+SCENARIOS = {
+    'read': ['GET /board', 'GET /board/<boards_code:boards_code>', 'GET /board/<int:board_seq>', 'GET /login', 'GET /user'],
+    'board_crud': ['POST /board', 'GET /board/<int:board_seq>', 'PUT /board/<int:board_seq>', 'PATCH /board/<int:board_seq>', 'DELETE /board/<int:board_seq>'],
+    'file': ['POST /board/fileupload', 'POST /board', 'POST /board/<int:board_seq>/file', 'GET /board/<int:board_seq>/file', 'GET /board/<int:board_seq>/files.zip']
+}
+# worker 시작시 한번 실행 : 로그인, 조회용 게시물 등록
+SETUP = ['POST /login', 'POST /board']
+# sqlite3.OperationalError 메시지(Sqlite3 Class 는 SystemError 로 변환하여 500 응답)
+SQLITE_BUSY_PATTERN = re.compile(rb'database (?:table )?is locked|SQLITE_BUSY')
+_VARIABLE = re.compile(r'{{\s*(\$?\w+)\s*}}')
+_ROUTE_PARAM = re.compile(r'<(?:[^:>]+:)?([^>]+)>')
+_GLOBAL_SET = re.compile(r'client\.global\.set\("(\w+)",\s*response\.body\.(\w+)\)')
+
+
+class HttpRequest:
+    """
+    api.http 의 요청 하나
+    """
+
+    def __init__(self, title, method, url, headers, body_lines, captures, base_dir):
+        self.title = title
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.body_lines = body_lines
+        # 응답 JSON 에서 저장할 변수 : {변수명: 응답 key}
+        self.captures = captures
+        self.base_dir = base_dir
+        self.route = title.split(' - ', 1)[-1].strip()
+        self.key = f'{method} {self.route}'
+
+    def build(self, variables):
+        """
+        변수를 적용한 요청
+        route 파라메터는 variables 에 값이 있으면 route 로 URL 을 다시 만들고, 없으면 api.http 의 URL 을 사용
+        :param variables:
+        :return: (method, URL, headers, body)
+        """
+        url = self.url
+        params = _ROUTE_PARAM.findall(self.route)
+        if params and all(name in variables for name in params) and url.startswith('{{hosts}}'):
+            (_, _, query) = url.partition('?')
+            url = '{{hosts}}' + _ROUTE_PARAM.sub(lambda m: str(variables[m.group(1)]), self.route) + (f'?{query}' if query else '')
+        url = _substitute(url, variables)
+        headers = {name: _substitute(value, variables) for name, value in self.headers.items()}
+        return self.method, url, headers, self._build_body(headers, variables)
+
+    def _build_body(self, headers, variables):
+        """
+        body 생성 : '< 파일경로' 줄은 파일 내용, multipart 는 CRLF 사용, JSON 의 file_list 는 업로드한 파일 목록으로 변경
+        :param headers:
+        :param variables:
+        :return:
+        """
+        if not self.body_lines:
+            return None
+        content_type = headers.get('Content-Type', '')
+        newline = b'\r\n' if content_type.startswith('multipart/') else b'\n'
+        chunks = []
+        for line in self.body_lines:
+            if line.startswith('< '):
+                with open(os.path.join(self.base_dir, line[2:].strip()), 'rb') as f:
+                    chunks.append(f.read())
+            else:
+                chunks.append(_substitute(line, variables).encode('utf-8'))
+        body = newline.join(chunks) + (newline if content_type.startswith('multipart/') else b'')
+        if 'json' in content_type and 'tmp_file_list' in variables:
+            data = json.loads(body)
+            if 'file_list' in data:
+                data['file_list'] = variables['tmp_file_list']
+                body = json.dumps(data).encode('utf-8')
+        return body
+
+
+def _substitute(text, variables):
+    """
+    {{변수}} 적용 : $uuid, $timestamp, $randomInt 는 호출할 때마다 새로운 값
+    :param text:
+    :param variables:
+    :return:
+    """
+    def replace(match):
+        name = match.group(1)
+        if name == '$uuid':
+            return str(uuid.uuid4())
+        if name == '$timestamp':
+            return str(int(time.time()))
+        if name == '$randomInt':
+            return str(random.randrange(1000))
+        return str(variables.get(name, match.group(0)))
+    return _VARIABLE.sub(replace, text)
+
+
+def parse_http_file(path):
+    """
+    api.http 파일 읽기
+    :param path:
+    :return: {'{METHOD} {route}': HttpRequest} 같은 제목이 여러개인 경우 처음 요청 사용
+    """
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    base_dir = os.path.dirname(os.path.abspath(path))
+    result = {}
+    for block in re.split(r'^###', text, flags=re.MULTILINE)[1:]:
+        lines = block.splitlines()
+        title = lines[0].strip()
+        idx = 1
+        while idx < len(lines) and (not lines[idx].strip() or lines[idx].lstrip().startswith('#')):
+            idx += 1
+        if idx >= len(lines):
+            continue
+        (method, url) = lines[idx].split(None, 1)
+        idx += 1
+        # 여러 줄의 query string
+        while idx < len(lines) and lines[idx].strip()[:1] in ('?', '&'):
+            url += lines[idx].strip()
+            idx += 1
+        headers = {}
+        while idx < len(lines) and lines[idx].strip():
+            line = lines[idx].strip()
+            if not line.startswith('#'):
+                (name, value) = line.split(':', 1)
+                headers[name.strip()] = value.strip()
+            idx += 1
+        body_lines = []
+        captures = {}
+        is_script = False
+        for line in lines[idx + 1:]:
+            if line.startswith('> {%'):
+                is_script = True
+            elif is_script:
+                captures.update(dict(_GLOBAL_SET.findall(line)))
+                if line.startswith('%}'):
+                    is_script = False
+            else:
+                body_lines.append(line)
+        while body_lines and not body_lines[-1].strip():
+            body_lines.pop()
+        request = HttpRequest(title, method.upper(), url.strip(), headers, body_lines, captures, base_dir)
+        result.setdefault(request.key, request)
+    return result
+
+
+class _RateLimiter:
+    """
+    전체 worker 의 초당 요청 수 제한
+    """
+
+    def __init__(self, rps):
+        self.interval = 1 / rps if rps else 0
+        self.next_time = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.perf_counter()
+            slot = max(self.next_time, now)
+            self.next_time = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class _Stats:
+    """
+    요청 결과 기록
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.status = {}
+        self.sqlite_busy = 0
+
+    def add(self, key, elapsed_ms, status, body):
+        with self._lock:
+            self.latencies.setdefault(key, []).append(elapsed_ms)
+            self.status[str(status)] = self.status.get(str(status), 0) + 1
+            if not isinstance(status, int) or status >= 400:
+                self.errors[key] = self.errors.get(key, 0) + 1
+            if body and SQLITE_BUSY_PATTERN.search(body):
+                self.sqlite_busy += 1
+
+
+class _Worker(threading.Thread):
+    """
+    가상 사용자 : 연결을 재사용(keep-alive)하며 scenario 반복
+    """
+
+    def __init__(self, requests, scenarios, variables, limiter, stats, deadline, timeout, seed_value):
+        super().__init__(daemon=True)
+        self.requests = requests
+        self.scenarios = scenarios
+        self.variables = dict(variables)
+        self.limiter = limiter
+        self.stats = stats
+        self.deadline = deadline
+        self.timeout = timeout
+        self.rnd = random.Random(seed_value)
+        self.conn = None
+        self.setup_variables = {}
+
+    def run(self):
+        for key in SETUP:
+            self._send(key)
+        # 삭제된 게시물 대신 사용할 SETUP 의 변수
+        self.setup_variables = dict(self.variables)
+        names = list(self.scenarios)
+        weights = [self.scenarios[name] for name in names]
+        while time.perf_counter() < self.deadline:
+            for key in SCENARIOS[self.rnd.choices(names, weights)[0]]:
+                if time.perf_counter() >= self.deadline:
+                    break
+                self._send(key)
+        if self.conn:
+            self.conn.close()
+
+    def _send(self, key):
+        """
+        요청 실행 및 응답의 변수 저장
+        :param key:
+        """
+        (method, url, headers, body) = self.requests[key].build(self.variables)
+        parts = urlsplit(url)
+        self.limiter.wait()
+        started = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=self.timeout)
+            self.conn.request(method, parts.path + (f'?{parts.query}' if parts.query else ''), body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException) as e:
+            self.stats.add(key, (time.perf_counter() - started) * 1000, type(e).__name__, None)
+            if self.conn:
+                self.conn.close()
+            self.conn = None
+            return
+        self.stats.add(key, (time.perf_counter() - started) * 1000, status, data)
+        if method == 'DELETE' and status < 400:
+            for name in _ROUTE_PARAM.findall(self.requests[key].route):
+                self.variables[name] = self.setup_variables.get(name, self.variables[name])
+        if status < 400 and data and response.getheader('Content-Type', '').startswith('application/json'):
+            self._capture(key, json.loads(data))
+
+    def _capture(self, key, data):
+        """
+        응답에서 다음 요청에 사용할 값 저장
+        :param key:
+        :param data:
+        """
+        if not isinstance(data, dict):
+            return
+        for name, field in self.requests[key].captures.items():
+            if field in data:
+                self.variables[name] = data[field]
+        if 'board_seq' in data:
+            self.variables['board_seq'] = self.variables['board_seqs'] = data['board_seq']
+        if 'user_seq' in data:
+            self.variables['user_seq'] = self.variables['user_seqs'] = data['user_seq']
+        if 'upload_id' in data:
+            self.variables['upload_id'] = data['upload_id']
+        if 'files' in data:
+            self.variables['tmp_file_list'] = [dict(file_info, file_seq='') for file_info in data['files']]
+        if data.get('file_list'):
+            self.variables['file_seq'] = data['file_list'][0].get('file_seq')
+
+
+def _wait_port(host, port, timeout):
+    """
+    서버가 요청을 받을 수 있을 때까지 대기
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f'server is not ready : {host}:{port}')
+
+
+def run(hosts, http_file, concurrency, rps, duration, mix, user_id, password, timeout=30, seed_value=1):
+    """
+    부하 테스트 실행
+    :param hosts: api.http 의 {{hosts}} 예) http://127.0.0.1:5000/api/v1
+    :param http_file:
+    :param concurrency: worker 수
+    :param rps: 전체 초당 요청 수 제한, 0 이면 제한하지 않음
+    :param duration: 실행시간(초)
+    :param mix: {scenario: 비율}
+    :param user_id: 로그인 요청의 user_id
+    :param password: 로그인 요청의 password
+    :param timeout: 요청 timeout(초)
+    :param seed_value:
+    :return:
+    """
+    requests = parse_http_file(http_file)
+    missing = [key for key in SETUP + [key for name in mix for key in SCENARIOS[name]] if key not in requests]
+    if missing:
+        raise ValueError(f'api.http 에 없는 요청 : {missing}')
+    # 로그인 계정 변경
+    login = requests['POST /login']
+    login.body_lines = json.dumps({'user_id': user_id, 'password': password}).splitlines()
+    stats = _Stats()
+    limiter = _RateLimiter(rps)
+    started = time.perf_counter()
+    workers = [_Worker(requests, mix, {'hosts': hosts}, limiter, stats, started + duration, timeout, seed_value + idx) for idx in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    all_latencies = sorted(v for values in stats.latencies.values() for v in values)
+    total = len(all_latencies)
+    error_count = sum(stats.errors.values())
+    results = {}
+    for key, values in sorted(stats.latencies.items()):
+        values = sorted(values)
+        results[key] = {'count': len(values), 'errors': stats.errors.get(key, 0), 'median_ms': round(percentile(values, 0.5), 2),
+                        'p95_ms': round(percentile(values, 0.95), 2), 'p99_ms': round(percentile(values, 0.99), 2)}
+    return {
+        'config': {'hosts': hosts, 'concurrency': concurrency, 'rps': rps, 'duration': duration, 'mix': mix},
+        'requests': total,
+        'rps': round(total / elapsed, 1),
+        'latency_ms': {'p50': round(percentile(all_latencies, 0.5), 2) if total else None, 'p95': round(percentile(all_latencies, 0.95), 2) if total else None,
+                       'p99': round(percentile(all_latencies, 0.99), 2) if total else None, 'max': round(all_latencies[-1], 2) if total else None},
+        'error_rate': round(error_count / total, 4) if total else 0,
+        'status': stats.status,
+        'sqlite_busy': stats.sqlite_busy,
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='api.http scenario 부하 테스트')
+    parser.add_argument('--hosts', default='http://127.0.0.1:5000/api/v1', help='api.http 의 {{hosts}}')
+    parser.add_argument('--http-file', default=DEFAULT_HTTP_FILE, help='api.http 경로')
+    parser.add_argument('--concurrency', type=int, default=8, help='동시 사용자(Thread) 수')
+    parser.add_argument('--rps', type=float, default=0, help='전체 초당 요청 수 제한, 0 이면 제한하지 않음')
+    parser.add_argument('--duration', type=float, default=30, help='실행시간(초)')
+    parser.add_argument('--mix', default='read=6,board_crud=3,file=1', help=f'scenario 비율 ({", ".join(SCENARIOS)})')
+    parser.add_argument('--user-id', default='admin', help='로그인 사용자')
+    parser.add_argument('--password', default='1234!', help='로그인 비밀번호')
+    parser.add_argument('--server-cmd', help='서버 시작 명령 예) "python app.py", 없으면 실행중인 서버 사용')
+    parser.add_argument('--work-dir', default='.', help='서버 실행 디렉토리(sample.db 위치)')
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    parser.add_argument('--baseline', help='비교할 이전 결과 JSON')
+    parser.add_argument('--threshold', type=float, default=0.2, help='regression 기준(median 증가 비율)')
+    args = parser.parse_args()
+    mix = {name: float(weight) for name, weight in (item.split('=') for item in args.mix.split(','))}
+    server = None
+    if args.server_cmd:
+        os.makedirs(args.work_dir, exist_ok=True)
+        server = subprocess.Popen(shlex.split(args.server_cmd), cwd=args.work_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        parts = urlsplit(args.hosts)
+        _wait_port(parts.hostname, parts.port or 80, 30)
+        report = run(args.hosts, args.http_file, args.concurrency, args.rps, args.duration, mix, args.user_id, args.password)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+    if write_report(report, args.output, args.baseline, args.threshold):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
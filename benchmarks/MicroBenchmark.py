@@ -0,0 +1,89 @@
+"""
+요청마다 반복되는 작은 처리의 실행시간 측정
+- _dict_factory : 조회 결과 tuple -> dict 변환(sqlite3 기본 tuple, sqlite3.Row 와 비교)
+- marshal_with : 게시물 목록, 게시물 상세(ADD_FIELDS Wildcard 포함) 변환
+- URL Converter : int_list, boards_code, auth_code
+결과는 1회 실행시간(ms)이며 --output, --baseline 은 RouteBenchmark 와 같음
+실행) python -m benchmarks.MicroBenchmark --rows 1000 --output micro.json
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+from flask_restx import marshal
+
+from app import app
+from app.datasources.Sqlite3 import _dict_factory
+from app.schemas import board_list_model, board_detail_model
+from app.utils import IntListConverter, BoardsCodeConverter, AuthCodeConverter
+from benchmarks.BenchmarkUtil import measure, write_report
+
+BOARDS_SQL = 'SELECT SEQ, BOARDS_CODE, TITLE, RDATE, RUSER, MDATE, MUSER FROM BOARDS ORDER BY SEQ'
+
+
+def _make_db(rows):
+    """
+    메모리 DB 에 BOARDS 생성
+    :param rows:
+    :return:
+    """
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE BOARDS (SEQ INTEGER PRIMARY KEY, BOARDS_CODE TEXT, TITLE TEXT, RDATE INTEGER, RUSER TEXT, MDATE INTEGER, MUSER TEXT)')
+    now = int(time.time())
+    conn.executemany('INSERT INTO BOARDS VALUES (?, ?, ?, ?, ?, ?, ?)',
+                     [(idx, 'POST', f'제목 {idx}', now, 'admin', now, 'admin') for idx in range(1, rows + 1)])
+    return conn
+
+
+def _fetch(conn, row_factory):
+    conn.row_factory = row_factory
+    return conn.execute(BOARDS_SQL).fetchall()
+
+
+def run(rows, repeat, number):
+    """
+    :param rows: 조회, 변환할 행 수
+    :param repeat:
+    :param number: 반복 한번에 실행하는 횟수
+    :return:
+    """
+    report = {'rows': rows, 'repeat': repeat, 'number': number, 'results': {}}
+    results = report['results']
+    conn = _make_db(rows)
+    results['fetch.tuple'] = measure(lambda: _fetch(conn, None), repeat, number)
+    results['fetch.sqlite3_row'] = measure(lambda: _fetch(conn, sqlite3.Row), repeat, number)
+    results['fetch._dict_factory'] = measure(lambda: _fetch(conn, _dict_factory), repeat, number)
+    board_list = _fetch(conn, _dict_factory)
+    conn.close()
+    board_detail = dict(board_list[0], CONTENTS='내용 ' * 500, FILE_COUNT=0,
+                        ADD_FIELDS={'a_str': '문자열', 'b_int': 1234, 'c_float': 12.34, 'd_list_str': ['문자1', '문자2', '문자3']})
+    with app.app_context():
+        results['marshal.board_list'] = measure(lambda: marshal({'totalcount': rows, 'board_list': board_list}, board_list_model), repeat, number)
+        results['marshal.board_detail'] = measure(lambda: marshal(board_detail, board_detail_model), repeat, number * 10)
+    int_list = IntListConverter(app.url_map)
+    boards_code = BoardsCodeConverter(app.url_map)
+    auth_code = AuthCodeConverter(app.url_map)
+    seqs = ','.join(str(idx) for idx in range(1, 101))
+    results['converter.int_list_100'] = measure(lambda: int_list.to_python(seqs), repeat, number * 100)
+    results['converter.boards_code'] = measure(lambda: boards_code.to_python('POST'), repeat, number * 1000)
+    results['converter.auth_code'] = measure(lambda: auth_code.to_python('USER'), repeat, number * 1000)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='_dict_factory, marshal_with, Converter 실행시간 측정')
+    parser.add_argument('--rows', type=int, default=1000, help='조회, 변환할 행 수')
+    parser.add_argument('--repeat', type=int, default=20, help='반복 횟수')
+    parser.add_argument('--number', type=int, default=10, help='반복 한번에 실행하는 횟수')
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    parser.add_argument('--baseline', help='비교할 이전 결과 JSON')
+    parser.add_argument('--threshold', type=float, default=0.2, help='regression 기준(median 증가 비율)')
+    args = parser.parse_args()
+    report = run(args.rows, args.repeat, args.number)
+    if write_report(report, args.output and os.path.abspath(args.output), args.baseline, args.threshold):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""
+BoardSample, UserSample 의 모든 route 처리시간 측정
+DataGenerator 로 데이터를 생성한 후 Flask test client 로 요청하며, 등록/수정/삭제 route 는 대상 데이터를 측정시간 밖에서 먼저 만듦
+결과는 JSON 으로 출력되며 --output 으로 저장한 결과를 다음 실행의 --baseline 으로 사용하면 median 비율을 비교함
+실행) python -m benchmarks.RouteBenchmark --work-dir /tmp/bench --boards 100000 --files 100000 --output route.json
+"""
+import argparse
+import io
+import os
+import random
+
+from benchmarks.BenchmarkUtil import measure, write_report
+from benchmarks.DataGenerator import USER_PASSWORD, seed
+
+API = '/api/v1'
+
+
+class _Client:
+    """
+    test client 와 인증 Header
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.rnd = random.Random(1)
+        response = client.post(f'{API}/login', json={'user_id': 'admin', 'password': USER_PASSWORD})
+        self.access_headers = {'Authorization': f'Bearer {response.json["access_token"]}'}
+        self.refresh_headers = {'Authorization': f'Bearer {response.json["refresh_token"]}'}
+        self.errors = {}
+
+    def request(self, name, method, url, **kwargs):
+        """
+        요청 후 응답 본문까지 읽음(stream 응답 포함), 400 이상인 경우 오류 수 기록
+        :return:
+        """
+        response = self.client.open(url, method=method, **kwargs)
+        response.get_data()
+        if response.status_code >= 400:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        return response
+
+    def create_board(self, _idx=None):
+        response = self.client.post(f'{API}/board', headers=self.access_headers, json=_board_payload(self.rnd))
+        return response.json['board_seq']
+
+    def create_user(self, _idx=None):
+        response = self.client.post(f'{API}/user', headers=self.access_headers, json=_user_payload(self.rnd))
+        return response.json['user_seq']
+
+    def create_user_login(self, _idx=None):
+        """
+        사용자 정보는 로그인한 사용자만 수정할 수 있으므로 생성한 사용자로 로그인
+        :return: (사용자 번호, 사용자 정보, 인증 Header)
+        """
+        payload = _user_payload(self.rnd)
+        response = self.client.post(f'{API}/user', headers=self.access_headers, json=payload)
+        login = self.client.post(f'{API}/login', json={'user_id': payload['user_id'], 'password': payload['password']})
+        return response.json['user_seq'], payload, {'Authorization': f'Bearer {login.json["access_token"]}'}
+
+    def upload_tmp_files(self, _idx=None):
+        response = self.client.post(f'{API}/board/fileupload', headers=self.access_headers, content_type='multipart/form-data',
+                                    data={'file': [(io.BytesIO(os.urandom(4096)), 'bench.txt'), (io.BytesIO(os.urandom(4096)), 'bench.bin')]})
+        return [dict(file_info, file_seq='') for file_info in response.json['files']]
+
+    def create_upload_session(self, _idx=None):
+        response = self.client.post(f'{API}/board/fileupload/session', headers=self.access_headers, json={'file_org_name': 'bench.bin', 'file_size': 4096})
+        return response.json['upload_id']
+
+
+def _board_payload(rnd):
+    return {'boards_code': rnd.choice(('NOTICE', 'FAQ', 'POST')), 'title': f'benchmark {rnd.randrange(1000000)}', 'contents': 'benchmark ' * 100,
+            'add_fields': {'a_str': 'benchmark', 'b_int': rnd.randrange(1000), 'c_float': 1.5, 'd_list_str': ['a', 'b']}}
+
+
+def _user_payload(rnd):
+    return {'user_id': f'bench{rnd.randrange(10 ** 12)}', 'password': USER_PASSWORD, 'user_name': 'benchmark', 'auth_code': 'USER'}
+
+
+def _cases(c, boards, users, file_board_seq, file_seq):
+    """
+    측정 대상 목록
+    :return: [(이름, 실행 함수, 측정 전 준비 함수)]
+    """
+    auth = c.access_headers
+    middle = max(0, boards // 2)
+    board_seqs = ','.join(str(seq) for seq in range(1, min(boards, 20) + 1))
+    user_seqs = ','.join(str(seq) for seq in range(1, min(users, 20) + 2))
+    upload_body = os.urandom(4096)
+    return [
+        # UserSample
+        ('login.post', lambda _: c.request('login.post', 'POST', f'{API}/login', json={'user_id': 'admin', 'password': USER_PASSWORD}), None),
+        ('login.get', lambda _: c.request('login.get', 'GET', f'{API}/login', headers=auth), None),
+        ('refresh.post', lambda _: c.request('refresh.post', 'POST', f'{API}/refresh', headers=c.refresh_headers), None),
+        ('refresh.get', lambda _: c.request('refresh.get', 'GET', f'{API}/refresh', headers=c.refresh_headers), None),
+        ('user.list', lambda _: c.request('user.list', 'GET', f'{API}/user?start_row=0&row_per_page=10', headers=auth), None),
+        ('user.list_middle_page', lambda _: c.request('user.list_middle_page', 'GET', f'{API}/user?start_row={users // 2}&row_per_page=10', headers=auth), None),
+        ('user.list_by_auth_code', lambda _: c.request('user.list_by_auth_code', 'GET', f'{API}/user/auth_code/USER?start_row=0&row_per_page=10', headers=auth), None),
+        ('user.list_by_user_seqs', lambda _: c.request('user.list_by_user_seqs', 'GET', f'{API}/user/user_seqs/{user_seqs}', headers=auth), None),
+        ('user.get', lambda _: c.request('user.get', 'GET', f'{API}/user/1', headers=auth), None),
+        ('user.post', lambda _: c.request('user.post', 'POST', f'{API}/user', headers=auth, json=_user_payload(c.rnd)), None),
+        ('user.put', lambda args: c.request('user.put', 'PUT', f'{API}/user/{args[0]}', headers=args[2], json=dict(args[1], user_name='benchmark put')),
+         c.create_user_login),
+        ('user.patch', lambda args: c.request('user.patch', 'PATCH', f'{API}/user/{args[0]}', headers=args[2], json={'user_name': 'benchmark patch'}),
+         c.create_user_login),
+        ('user.delete', lambda seq: c.request('user.delete', 'DELETE', f'{API}/user/{seq}', headers=auth), c.create_user),
+        ('user.delete_by_user_seqs', lambda seq: c.request('user.delete_by_user_seqs', 'DELETE', f'{API}/user/user_seqs/{seq}', headers=auth), c.create_user),
+        # BoardSample
+        ('board.list', lambda _: c.request('board.list', 'GET', f'{API}/board?start_row=0&row_per_page=10'), None),
+        ('board.list_middle_page', lambda _: c.request('board.list_middle_page', 'GET', f'{API}/board?start_row={middle}&row_per_page=10'), None),
+        ('board.list_include', lambda _: c.request('board.list_include', 'GET', f'{API}/board?start_row=0&row_per_page=10&include=files&include=file_count'), None),
+        ('board.list_by_boards_code', lambda _: c.request('board.list_by_boards_code', 'GET', f'{API}/board/POST?start_row=0&row_per_page=10'), None),
+        ('board.list_by_board_seqs', lambda _: c.request('board.list_by_board_seqs', 'GET', f'{API}/board/board_seqs/{board_seqs}'), None),
+        ('board.get', lambda _: c.request('board.get', 'GET', f'{API}/board/{file_board_seq}?include=files'), None),
+        ('board.post', lambda _: c.request('board.post', 'POST', f'{API}/board', headers=auth, json=_board_payload(c.rnd)), None),
+        ('board.put', lambda seq: c.request('board.put', 'PUT', f'{API}/board/{seq}', headers=auth, json=_board_payload(c.rnd)), c.create_board),
+        ('board.patch', lambda seq: c.request('board.patch', 'PATCH', f'{API}/board/{seq}', headers=auth, json={'title': 'patched', 'add_fields': {'e_str': 'x'}}), c.create_board),
+        ('board.delete', lambda seq: c.request('board.delete', 'DELETE', f'{API}/board/{seq}', headers=auth), c.create_board),
+        ('board.delete_by_board_seqs', lambda seq: c.request('board.delete_by_board_seqs', 'DELETE', f'{API}/board/board_seqs/{seq}', headers=auth), c.create_board),
+        ('board.fileupload', lambda _: c.request('board.fileupload', 'POST', f'{API}/board/fileupload', headers=auth, content_type='multipart/form-data',
+                                                 data={'file': [(io.BytesIO(upload_body), 'bench.txt')]}), None),
+        ('board.fileupload_session.post', lambda _: c.request('board.fileupload_session.post', 'POST', f'{API}/board/fileupload/session', headers=auth,
+                                                              json={'file_org_name': 'bench.bin', 'file_size': 4096}), None),
+        ('board.fileupload_session.head', lambda upload_id: c.request('board.fileupload_session.head', 'HEAD', f'{API}/board/fileupload/session/{upload_id}', headers=auth),
+         c.create_upload_session),
+        ('board.fileupload_session.patch', lambda upload_id: c.request('board.fileupload_session.patch', 'PATCH', f'{API}/board/fileupload/session/{upload_id}',
+                                                                       headers=dict(auth, **{'Upload-Offset': '0'}), data=upload_body,
+                                                                       content_type='application/offset+octet-stream'), c.create_upload_session),
+        ('board.fileupload_session.delete', lambda upload_id: c.request('board.fileupload_session.delete', 'DELETE', f'{API}/board/fileupload/session/{upload_id}',
+                                                                        headers=auth), c.create_upload_session),
+        ('board.file.post', lambda args: c.request('board.file.post', 'POST', f'{API}/board/{args[0]}/file', headers=auth, json={'file_list': args[1]}),
+         lambda idx: (c.create_board(), c.upload_tmp_files())),
+        ('board.file.get', lambda _: c.request('board.file.get', 'GET', f'{API}/board/{file_board_seq}/file'), None),
+        ('board.file.download', lambda _: c.request('board.file.download', 'GET', f'{API}/board/{file_board_seq}/file/{file_seq}'), None),
+        ('board.file.download_range', lambda _: c.request('board.file.download_range', 'GET', f'{API}/board/{file_board_seq}/file/{file_seq}',
+                                                          headers={'Range': 'bytes=0-1023'}), None),
+        ('board.files_zip', lambda _: c.request('board.files_zip', 'GET', f'{API}/board/{file_board_seq}/files.zip'), None)
+    ]
+
+
+def run(users, boards, files, repeat, seed_value, only=None):
+    """
+    데이터 생성 후 route 별 측정
+    현재 디렉토리에 sample.db 와 첨부파일이 생성됨
+    :param users:
+    :param boards:
+    :param files:
+    :param repeat: route 별 반복 횟수
+    :param seed_value:
+    :param only: 이름이 이 값으로 시작하는 route 만 측정
+    :return:
+    """
+    dataset = seed(users, boards, files, seed_value=seed_value)
+    from app import app, init_app
+    init_app('local')
+    client = _Client(app.test_client())
+    from app.datasources import Sqlite3
+    file_row = Sqlite3().execute('SELECT BOARD_SEQ, SEQ FROM FILES ORDER BY SEQ LIMIT 1', is_one=True) or {'BOARD_SEQ': 1, 'SEQ': 1}
+    report = {'dataset': dataset, 'repeat': repeat, 'results': {}}
+    for name, fn, prepare in _cases(client, boards, users, file_row['BOARD_SEQ'], file_row['SEQ']):
+        if only and not name.startswith(only):
+            continue
+        report['results'][name] = measure(fn, repeat, prepare=prepare or (lambda idx: idx))
+    report['errors'] = client.errors
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='BoardSample, UserSample route 처리시간 측정')
+    parser.add_argument('--work-dir', required=True, help='sample.db, 첨부파일을 생성할 디렉토리(실행 디렉토리로 사용)')
+    parser.add_argument('--users', type=int, default=1000, help='사용자 수')
+    parser.add_argument('--boards', type=int, default=10000, help='게시물 수')
+    parser.add_argument('--files', type=int, default=10000, help='FILES 행 수')
+    parser.add_argument('--repeat', type=int, default=20, help='route 별 반복 횟수')
+    parser.add_argument('--seed', type=int, default=1, help='random seed')
+    parser.add_argument('--only', help='이름이 이 값으로 시작하는 route 만 측정 예) board.list')
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    parser.add_argument('--baseline', help='비교할 이전 결과 JSON')
+    parser.add_argument('--threshold', type=float, default=0.2, help='regression 기준(median 증가 비율)')
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    os.makedirs(args.work_dir, exist_ok=True)
+    os.chdir(args.work_dir)
+    report = run(args.users, args.boards, args.files, args.repeat, args.seed, args.only)
+    if write_report(report, output, baseline, args.threshold):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+app 시작시간 측정
+새 Python 프로세스를 반복 실행하여 단계별 시간(ms)을 측정
+- import : import app(Flask, flask-restx 등)
+- init : init_app(router 등록, Namespace import, Sqlite 테이블 확인), 백그라운드 Thread 는 시작하지 않음(preload 와 같음)
+- spec : swagger.json 직렬화
+- first_request : 첫번째 로그인 요청(bcrypt import 포함)
+- interpreter : 프로세스 실행부터 Python 시작까지
+- total : 프로세스 실행부터 첫번째 응답까지(프로세스 간 비교를 위해 time.time 사용)
+median total 이 --budget-ms 를 초과하거나 baseline 대비 regression 이 있으면 exit 1
+실행) python -m benchmarks.StartupBenchmark --repeat 10 --budget-ms 1500 --output startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.BenchmarkUtil import summarize, write_report
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHASES = ('interpreter', 'import', 'init', 'spec', 'first_request', 'total')
+# 측정용 프로세스에서 실행하는 코드 : 결과를 JSON 으로 출력
+CHILD_CODE = '''
+import json, sys, time
+launched = float(sys.argv[2])
+started_time = time.time()
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.init_app(sys.argv[1], True)
+initialized = time.perf_counter()
+app.build_api_spec()
+spec_built = time.perf_counter()
+response = app.app.test_client().post('/api/v1/login', json={'user_id': 'admin', 'password': '1234!'})
+finished = time.perf_counter()
+print(json.dumps({
+    'status': response.status_code,
+    'modules': len(sys.modules),
+    'import': (imported - started) * 1000,
+    'init': (initialized - imported) * 1000,
+    'spec': (spec_built - initialized) * 1000,
+    'first_request': (finished - spec_built) * 1000,
+    'interpreter': (started_time - launched) * 1000,
+    'total': (time.time() - launched) * 1000
+}))
+'''
+
+
+def run_once(env, work_dir, is_fresh_db):
+    """
+    새 프로세스에서 한번 측정
+    :param env:
+    :param work_dir: 실행 디렉토리(sample.db 위치)
+    :param is_fresh_db: sample.db 를 삭제하고 시작(테이블, 관리자 생성 포함)
+    :return: 단계별 시간(ms)
+    """
+    if is_fresh_db and os.path.exists(os.path.join(work_dir, 'sample.db')):
+        os.remove(os.path.join(work_dir, 'sample.db'))
+    environ = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (ROOT_PATH, os.environ.get('PYTHONPATH')))))
+    result = subprocess.run([sys.executable, '-c', CHILD_CODE, env, repr(time.time())], cwd=work_dir, env=environ,
+                            capture_output=True, text=True, check=True)
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    if measured['status'] != 200:
+        raise RuntimeError(f'first request failed : {measured["status"]}')
+    return measured
+
+
+def run(env, repeat, work_dir, is_fresh_db):
+    """
+    :param env:
+    :param repeat: 반복 횟수(처음 1회는 sample.db 생성 및 .pyc 생성을 위해 측정하지 않음)
+    :param work_dir:
+    :param is_fresh_db:
+    :return:
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    run_once(env, work_dir, True)
+    samples = [run_once(env, work_dir, is_fresh_db) for _ in range(repeat)]
+    report = {'env': env, 'repeat': repeat, 'fresh_db': is_fresh_db, 'modules': samples[-1]['modules'], 'results': {}}
+    for phase in PHASES:
+        report['results'][phase] = summarize([sample[phase] for sample in samples])
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='app 시작시간 측정')
+    parser.add_argument('--env', default='local', help='init_app env')
+    parser.add_argument('--repeat', type=int, default=10, help='반복 횟수')
+    parser.add_argument('--work-dir', help='실행 디렉토리(sample.db 위치), 없으면 임시 디렉토리')
+    parser.add_argument('--fresh-db', action='store_true', help='매번 sample.db 를 새로 생성')
+    parser.add_argument('--budget-ms', type=float, default=1500, help='total median 허용 시간(ms)')
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    parser.add_argument('--baseline', help='비교할 이전 결과 JSON')
+    parser.add_argument('--threshold', type=float, default=0.2, help='regression 기준(median 증가 비율)')
+    args = parser.parse_args()
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='startup-')
+    report = run(args.env, args.repeat, work_dir, args.fresh_db)
+    report['budget_ms'] = args.budget_ms
+    report['over_budget'] = report['results']['total']['median_ms'] > args.budget_ms
+    has_regression = write_report(report, args.output and os.path.abspath(args.output), args.baseline, args.threshold)
+    if has_regression or report['over_budget']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
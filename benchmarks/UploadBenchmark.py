@@ -0,0 +1,110 @@
+"""
+파일 업로드 저장 속도 비교
+werkzeug 기본 방식(SpooledTemporaryFile 에 저장 후 FileStorage.save 로 복사)과
+UploadStreamFactory 로 multipart 파싱 중 임시파일에 바로 저장하면서 SHA-256 을 계산하는 방식(stream)의
+처리량(MB/s)과 Python 메모리 최대 사용량을 비교
+실행) python -m benchmarks.UploadBenchmark --file-size 16 --files 3
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from flask import request
+
+from app import app
+from app.utils import UploadStreamFactory, make_tmp_file_name
+
+BOUNDARY = 'benchmarkboundary'
+
+
+def _make_body(file_size, files):
+    """
+    multipart/form-data 요청 body 생성
+    :param file_size: 파일 하나의 크기(byte)
+    :param files: 파일 수
+    :return:
+    """
+    chunk = os.urandom(1024 * 1024)
+    body = io.BytesIO()
+    for idx in range(files):
+        body.write(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="file{idx}.bin"\r\n'
+                   f'Content-Type: application/octet-stream\r\n\r\n'.encode('utf-8'))
+        remain = file_size
+        while remain > 0:
+            body.write(chunk[:min(remain, len(chunk))])
+            remain -= len(chunk)
+        body.write(b'\r\n')
+    body.write(f'--{BOUNDARY}--\r\n'.encode('utf-8'))
+    return body.getvalue()
+
+
+def _upload_default(body, dir_path):
+    with app.test_request_context('/', method='POST', input_stream=io.BytesIO(body), content_length=len(body),
+                                  content_type=f'multipart/form-data; boundary={BOUNDARY}'):
+        for file_obj in request.files.getlist('file'):
+            file_obj.save(os.path.join(dir_path, make_tmp_file_name(file_obj.filename)))
+
+
+def _upload_stream(body, dir_path):
+    with app.test_request_context('/', method='POST', input_stream=io.BytesIO(body), content_length=len(body),
+                                  content_type=f'multipart/form-data; boundary={BOUNDARY}'):
+        request.file_stream_factory = UploadStreamFactory(dir_path)
+        for file_obj in request.files.getlist('file'):
+            file_obj.stream.close()
+
+
+def _measure(func, body, dir_path, repeat):
+    """
+    :return: 실행시간 목록(초), Python 메모리 최대 사용량(byte)
+    """
+    times = []
+    peak = 0
+    for _ in range(repeat):
+        os.makedirs(dir_path, exist_ok=True)
+        tracemalloc.start()
+        start = time.perf_counter()
+        func(body, dir_path)
+        times.append(time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        shutil.rmtree(dir_path)
+    return times, peak
+
+
+def run(file_size, files, repeat, work_dir):
+    """
+    방식별 업로드 저장 측정
+    :return:
+    """
+    body = _make_body(file_size * 1024 * 1024, files)
+    total_mb = file_size * files
+    report = {'file_size_mb': file_size, 'files': files, 'repeat': repeat, 'results': {}}
+    for name, func in (('default', _upload_default), ('stream', _upload_stream)):
+        times, peak = _measure(func, body, os.path.join(work_dir, f'upload_benchmark_{name}'), repeat)
+        report['results'][name] = {
+            'median_ms': round(statistics.median(times) * 1000, 2),
+            'throughput_mb_s': round(total_mb / statistics.median(times), 1),
+            'peak_memory_kb': round(peak / 1024, 1)
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='파일 업로드 default/stream 방식 비교')
+    parser.add_argument('--file-size', type=int, default=16, help='파일 하나의 크기(MB)')
+    parser.add_argument('--files', type=int, default=3, help='요청당 파일 수')
+    parser.add_argument('--repeat', type=int, default=5, help='반복 횟수')
+    parser.add_argument('--work-dir', default=tempfile.gettempdir(), help='파일 저장 디렉토리')
+    args = parser.parse_args()
+    report = run(args.file_size, args.files, args.repeat, args.work_dir)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+gunicorn 설정(pre-fork worker)
+- preload_app : master 에서 app 을 한번 생성(router 등록, Sqlite 테이블 확인)하고 worker 는 fork 로 공유
+- post_worker_init : worker 마다 로그 Handler, 지표, 백그라운드 Thread 를 새로 생성(app.init_worker)
+- 여러 worker 의 지표는 METRICS_MULTIPROC_DIR 에 기록 후 /metrics 에서 합산
+환경변수 : APP_ENV(기본 dev), BIND, WEB_CONCURRENCY(worker 수), THREADS(worker 당 Thread 수)
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('THREADS', 8))
+preload_app = True
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+# 메모리 증가 대비 worker 재시작(동시에 재시작되지 않도록 jitter 사용)
+max_requests = 10000
+max_requests_jitter = 1000
+# 접근로그는 app 에서 기록({PROJECT_ID}-access.log)
+accesslog = None
+# 여러 worker 의 지표 합산용 디렉토리 : app import(preload) 전에 설정해야 함
+os.environ.setdefault('METRICS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'flask-restx-test-metrics'))
+
+
+def on_starting(server):
+    """
+    master 시작 : 이전 실행에서 남은 지표 파일 삭제
+    """
+    for file_path in glob.glob(os.path.join(os.environ['METRICS_MULTIPROC_DIR'], '*.json')):
+        os.remove(file_path)
+
+
+def post_worker_init(worker):
+    """
+    fork 된 worker 초기화
+    """
+    from app import init_worker
+    init_worker()
+
+
+def worker_exit(server, worker):
+    """
+    worker 종료 : 진행중인 작업 Thread 종료 및 마지막 지표 기록
+    """
+    from app import stop_background
+    stop_background()
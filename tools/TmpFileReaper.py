@@ -0,0 +1,26 @@
+"""
+임시파일 정리 1회 실행
+app 을 실행하지 않고 정리하거나, --dry-run 으로 삭제 대상만 확인할 때 사용
+sample.db 가 있는 디렉토리에서 실행해야 함
+실행) python -m tools.TmpFileReaper --env local --dry-run
+"""
+import argparse
+import json
+import logging
+
+from app.services import TmpFileReaper
+
+
+def main():
+    parser = argparse.ArgumentParser(description='임시파일 정리')
+    parser.add_argument('--env', default='local', help='PathConfig 의 env')
+    parser.add_argument('--ttl', type=int, default=None, help='마지막으로 수정된 후 이 시간(초)이 지난 파일 삭제, 없으면 ReaperConfig 사용')
+    parser.add_argument('--dry-run', action='store_true', help='삭제하지 않고 대상만 확인')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='[%(levelname)s] [%(asctime)s] %(message)s')
+    metrics = TmpFileReaper(args.env, dry_run=args.dry_run, ttl=args.ttl).run_once()
+    print(json.dumps(metrics, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
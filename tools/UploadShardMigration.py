@@ -0,0 +1,144 @@
+"""
+첨부파일 저장 디렉토리를 UploadConfig['shard_depth'] 구조(예: upload/ab/cd/파일명)로 이관
+app 이 실행중인 상태에서 batch 단위로 나누어 처리하며, 처리 중에도 FILES.PATH 에 기록된 파일은 항상 존재함
+  1. 새 경로에 hard link 생성(다른 장치인 경우 복사)
+  2. 같은 파일을 참조하는 FILES.PATH 를 새 경로로 변경
+  3. 기존 파일은 JobService 삭제 작업으로 등록(참조하는 데이터가 없는 경우에만 삭제됨)
+이동 작업이 처리되지 않은 파일은 건너뛰며 다시 실행하면 이어서 처리됨
+sample.db 가 있는 디렉토리에서 실행해야 하며, 삭제 작업은 실행중인 app 의 JobWorker 가 처리함
+실행) python -m tools.UploadShardMigration --env local --batch-size 500 --sleep 0.5
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+
+from app.configs import PathConfig, UploadConfig
+from app.datasources import Sqlite3
+from app.services import JobService
+from app.utils import shard_path
+
+logger = logging.getLogger('tools.UploadShardMigration')
+
+
+def _full_path(base_path, rel_path):
+    return os.path.join(base_path, *rel_path.split('/'))
+
+
+def _link_file(src, dst):
+    """
+    src 를 dst 에 hard link, 다른 장치인 경우 복사
+    :param src:
+    :param dst:
+    :return:
+    """
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        tmp_dst = f'{dst}.copying'
+        shutil.copy2(src, tmp_dst)
+        os.replace(tmp_dst, dst)
+
+
+def migrate_file(base_path, old_path, file_name, new_path, report, dry_run=False):
+    """
+    파일 하나(같은 파일을 참조하는 모든 FILES 데이터)를 새 경로로 이관
+    :param base_path: file_upload_home
+    :param old_path: 현재 FILES.PATH
+    :param file_name: FILES.FNAME
+    :param new_path: 이관할 FILES.PATH
+    :param report: 처리 결과 통계
+    :param dry_run:
+    :return:
+    """
+    old_rel = f'{old_path}/{file_name}'
+    new_rel = f'{new_path}/{file_name}'
+    src = _full_path(base_path, old_rel)
+    dst = _full_path(base_path, new_rel)
+    if not os.path.exists(src) and not os.path.exists(dst):
+        # 이동 작업이 처리되기 전이거나 파일이 없는 경우
+        report['pending' if JobService.has_pending_move(old_rel) else 'missing'] += 1
+        return
+    if JobService.has_pending_move(old_rel):
+        report['pending'] += 1
+        return
+    if dry_run:
+        report['migrated'] += 1
+        return
+    is_linked = False
+    if not os.path.exists(dst):
+        _link_file(src, dst)
+        is_linked = True
+    updated = Sqlite3().cmd('UPDATE FILES SET PATH = ? WHERE PATH = ? AND FNAME = ?', (new_path, old_path, file_name))
+    job_service = JobService()
+    if updated == 0 and is_linked:
+        # 처리 중에 데이터가 삭제된 경우 새로 만든 파일도 삭제
+        job_service.enqueue_file_remove(new_rel)
+    job_service.enqueue_file_remove(old_rel)
+    report['migrated'] += 1
+    report['rows'] += updated
+
+
+def run(env, batch_size, sleep, dry_run=False, limit=None):
+    """
+    SEQ 순서로 batch_size 씩 확인하며 이관
+    :param env:
+    :param batch_size:
+    :param sleep: batch 사이 대기시간(초)
+    :param dry_run: 이관하지 않고 대상만 확인
+    :param limit: 최대 이관 파일 수
+    :return: 처리 결과 통계
+    """
+    base_path = PathConfig[env]['file_upload_home']
+    file_path = PathConfig[env]['file_path']
+    depth = UploadConfig['shard_depth']
+    report = {'scanned': 0, 'migrated': 0, 'rows': 0, 'pending': 0, 'missing': 0, 'errors': 0, 'dry_run': dry_run}
+    start = time.monotonic()
+    last_seq = 0
+    # dry_run 인 경우 FILES.PATH 가 변경되지 않으므로 이미 확인한 파일을 기록
+    checked = set()
+    while limit is None or report['migrated'] < limit:
+        rows = Sqlite3().execute('SELECT SEQ, PATH, FNAME FROM FILES WHERE SEQ > ? ORDER BY SEQ LIMIT ?', (last_seq, batch_size))
+        if not rows:
+            break
+        last_seq = rows[-1]['SEQ']
+        # 같은 파일을 참조하는 데이터는 한번에 처리
+        targets = []
+        for row in rows:
+            report['scanned'] += 1
+            new_path = shard_path(file_path, row['FNAME'], depth)
+            if row['PATH'] != new_path and (row['PATH'], row['FNAME']) not in targets and (row['PATH'], row['FNAME']) not in checked:
+                targets.append((row['PATH'], row['FNAME']))
+        if dry_run:
+            checked.update(targets)
+        for (old_path, file_name) in targets:
+            try:
+                migrate_file(base_path, old_path, file_name, shard_path(file_path, file_name, depth), report, dry_run)
+            except Exception as e:
+                report['errors'] += 1
+                logger.error(f'migrate error : {old_path}/{file_name} : {e}')
+        logger.info(f'SEQ {last_seq} : {report}')
+        if sleep > 0:
+            time.sleep(sleep)
+    report['seconds'] = round(time.monotonic() - start, 3)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='첨부파일 저장 디렉토리 이관')
+    parser.add_argument('--env', default='local', help='PathConfig 의 env')
+    parser.add_argument('--batch-size', type=int, default=500, help='한번에 확인하는 FILES 행 수')
+    parser.add_argument('--sleep', type=float, default=0.5, help='batch 사이 대기시간(초)')
+    parser.add_argument('--limit', type=int, default=None, help='최대 이관 파일 수')
+    parser.add_argument('--dry-run', action='store_true', help='이관하지 않고 대상만 확인')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='[%(levelname)s] [%(asctime)s] %(message)s')
+    report = run(args.env, args.batch_size, args.sleep, args.dry_run, args.limit)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,10 @@
+"""
+운영 서버(gunicorn) 실행 진입점
+gunicorn.conf.py 의 preload_app 으로 master 에서 한번 import 되며, 백그라운드 Thread 는 worker 마다 init_worker 에서 시작됨
+실행) gunicorn -c gunicorn.conf.py wsgi:application
+"""
+import os
+
+from app import create_app
+
+application = create_app(os.environ.get('APP_ENV', 'dev'), is_preload=True)